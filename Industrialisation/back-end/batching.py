@@ -0,0 +1,106 @@
+# batching.py
+"""
+Micro-batching des appels concurrents à /predict.
+
+Les requêtes arrivant en même temps sont placées dans une file ; un thread dédié
+les regroupe pendant au plus `max_wait_ms` millisecondes ou jusqu'à `max_batch_size`
+éléments, les traite en un seul appel `process_batch(items)` puis rend à chaque
+appelant son propre résultat.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    def __init__(self, process_batch, max_wait_ms: float = 5.0, max_batch_size: int = 32, window: int = 2048):
+        self.process_batch = process_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Statistiques (fenêtre glissante pour les percentiles)
+        self.n_batches = 0
+        self.n_items = 0
+        self._batch_sizes = deque(maxlen=window)
+        self._queue_waits = deque(maxlen=window)
+
+    def submit(self, item):
+        """Place un élément dans la file et attend son résultat (appel bloquant)."""
+        if self.max_batch_size == 1:
+            return self.process_batch([item])[0]
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result()
+
+    def _ensure_started(self):
+        # Démarrage paresseux : le thread est créé dans le processus qui sert les requêtes
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+                    self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.process_batch(items)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+
+            self.n_batches += 1
+            self.n_items += len(batch)
+            self._batch_sizes.append(len(batch))
+            self._queue_waits.extend(started - enqueued for _, _, enqueued in batch)
+
+    def stats(self) -> dict:
+        """Taille des lots et temps d'attente en file (ms) sur la fenêtre glissante."""
+        sizes = sorted(self._batch_sizes)
+        waits = sorted(self._queue_waits)
+
+        def percentile(values, q):
+            return values[min(len(values) - 1, int(q * len(values)))] if values else 0
+
+        return {
+            "max_wait_ms": self.max_wait * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.n_batches,
+            "requests": self.n_items,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": {
+                "mean": round(sum(sizes) / len(sizes), 2) if sizes else 0,
+                "p50": percentile(sizes, 0.50),
+                "max": sizes[-1] if sizes else 0,
+            },
+            "queue_wait_ms": {
+                "p50": round(percentile(waits, 0.50) * 1000, 3),
+                "p99": round(percentile(waits, 0.99) * 1000, 3),
+                "max": round(waits[-1] * 1000, 3) if waits else 0,
+            },
+        }
@@ -0,0 +1,44 @@
+"""
+Export du modèle picklé (dill) vers le format state_dict + config JSON
+-----------------------------------------------------------------------
+
+Pour convertir le modèle :
+    python export_model.py modele_epoch4001.pkl
+
+Produit modele_epoch4001.pt (poids) et modele_epoch4001.json (arguments de JobProfileTransformer),
+à déposer dans le bucket S3 puis à utiliser avec MODEL_KEY=modele_epoch4001.pt.
+"""
+
+import argparse
+import json
+
+import dill
+import torch
+
+from model import export_model, load_model_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertit un modèle dill en state_dict + config JSON")
+    parser.add_argument("pkl_path", help="Chemin du modèle picklé (ex: modele_epoch4001.pkl)")
+    parser.add_argument("--output", help="Préfixe des fichiers produits (par défaut: même nom que le .pkl)")
+    args = parser.parse_args()
+
+    name = args.output or args.pkl_path.rsplit(".", 1)[0]
+    with open(args.pkl_path, "rb") as f:
+        model = dill.load(f)
+    model.to("cpu").eval()
+
+    export_model(model, f"{name}.pt", f"{name}.json")
+
+    # Vérification : le modèle rechargé doit être identique à l'original
+    with open(f"{name}.json", encoding="utf-8") as f:
+        reloaded = load_model_state(json.load(f), f"{name}.pt")
+    for (key, expected), actual in zip(model.state_dict().items(), reloaded.state_dict().values()):
+        if not torch.equal(expected.cpu(), actual):
+            raise SystemExit(f"Différence sur {key} après export")
+    print(f"Modèle exporté: {name}.pt, {name}.json")
+
+
+if __name__ == "__main__":
+    main()
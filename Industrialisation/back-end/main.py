@@ -1,441 +1,779 @@
-"""
-JobProfile API
---------------
-
-Pour lancer l'application :
-    uvicorn main:app --reload
-
-Documentation :
-    http://127.0.0.1:8000/docs
-"""
-
-import io
-import os
-import tempfile
-from typing import List
-
-import boto3
-import dill
-import pandas as pd
-import torch
-from dotenv import load_dotenv
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from sqlalchemy import create_engine
-
-from model import JobProfileTransformer  # Assurez-vous que model.py est dans le même répertoire
-
-# ===========================
-# 1. Configuration & Globals
-# ===========================
-
-BUCKET_NAME = "dlhybride"
-DB_SCHEMA = "radarmetier"
-
-load_dotenv(".env")
-
-S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
-S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")
-S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
-S3_REGION = os.getenv("S3_REGION")
-S3_BUCKET = "dlhybride"
-
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-# ===========================
-# 2. Connexion S3
-# ===========================
-
-s3_client = boto3.client(
-    service_name="s3",
-    region_name=S3_REGION,
-    endpoint_url=S3_ENDPOINT_URL,
-    aws_access_key_id=S3_ACCESS_KEY_ID,
-    aws_secret_access_key=S3_SECRET_ACCESS_KEY,
-)
-
-# ===========================
-# 3. Chargement des données
-# ===========================
-
-def load_csv_from_s3(file_name: str, bucket_name: str = S3_BUCKET) -> pd.DataFrame:
-    """Charge un CSV depuis S3 en DataFrame pandas."""
-    response = s3_client.get_object(Bucket=bucket_name, Key=file_name)
-    return pd.read_csv(io.BytesIO(response["Body"].read()), dtype=str)
-
-df_jobs = load_csv_from_s3("df_competence_rome_eda_v2.csv")
-df_jobs["code_ogr_competence"] = df_jobs["code_ogr_competence"].astype(str)
-
-# Vocabulaire et mappings
-skills_vocab = {code: idx for idx, code in enumerate(df_jobs["code_ogr_competence"].unique())}
-skill_to_label = (
-    df_jobs.drop_duplicates("code_ogr_competence")
-    .set_index("code_ogr_competence")["libelle_competence"]
-    .to_dict()
-)
-jobs_vocab = {rome: idx for idx, rome in enumerate(df_jobs["code_rome"].unique())}
-job_labels = (
-    df_jobs.drop_duplicates("code_rome")
-    .set_index("code_rome")["libelle_rome"]
-    .to_dict()
-)
-job_to_skills = df_jobs.groupby("code_rome")["code_ogr_competence"].apply(set).to_dict()
-
-# ===========================
-# 4. Chargement du modèle
-# ===========================
-
-def load_model_from_s3_with_dill(key: str):
-    """Charge un modèle picklé (dill) depuis S3."""
-    obj = s3_client.get_object(Bucket=S3_BUCKET, Key=key)
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pkl") as tmp_file:
-        tmp_file.write(obj["Body"].read())
-        tmp_model_path = tmp_file.name
-
-    with open(tmp_model_path, "rb") as f:
-        model_loaded = dill.load(f)
-
-    model_loaded.to(device)
-    model_loaded.eval()
-    return model_loaded
-
-model_loaded = load_model_from_s3_with_dill("modele_epoch4001.pkl")
-
-# ===========================
-# 5. Connexion DB
-# ===========================
-
-def df_from_table(table_name: str) -> pd.DataFrame | None:
-    """Lit une table PostgreSQL et retourne un DataFrame."""
-    user = os.getenv("DB_USER")
-    password = os.getenv("DB_PASSWORD")
-    host = os.getenv("DB_HOST")
-    port = os.getenv("DB_PORT", "")
-    db_name = os.getenv("DB_NAME", "")
-
-    url = f"postgresql+psycopg2://{user}:{password}@{host}"
-    if port:
-        url += f":{port}"
-    if db_name:
-        url += f"/{db_name}"
-
-    if __debug__:
-        print("URL =", url)
-        print("DB table:", table_name)
-        print("DB schema:", DB_SCHEMA)
-
-    try:
-        engine = create_engine(url)
-        with engine.connect() as conn, conn.begin():
-            df = pd.read_sql_table(table_name, con=conn, schema=DB_SCHEMA)
-            print(f"Data read from DB: {df.shape}")
-            return df
-    except Exception as e:
-        print(f"Erreur DB: {e}")
-        return None
-
-def df_from_query(query):
-    url = f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}"
-    if len(os.getenv('DB_PORT')) > 0:
-        url += f":{os.getenv('DB_PORT')}"
-    if len(os.getenv("DB_NAME")) > 0:
-        url += f"/{os.getenv("DB_NAME")}"
-    if __debug__:
-        print("URL=", url)
-    try:
-        engine = create_engine(url)
-        with engine.connect() as conn, conn.begin():
-            data_frame = pd.read_sql_query(query, con= conn)
-            print(f"Data read from DB: {data_frame.shape}")
-            return data_frame
-    except Exception as e:
-        print(e)
-    return any
-
-df_competence = pd.DataFrame()
-
-def load_df_competence():
-    """Charge df_competence depuis la DB de façon sûre"""
-    global df_competence
-    query = "SELECT code_domaine_competence, domaine_competence, \
-            code_macro_competence, libelle_macro_competence, \
-            code_ogr_competence, libelle_competence, \
-            coh.code_rome, ref.libelle_rome \
-            FROM radarmetier.rome_arborescence_competences arb \
-            INNER JOIN radarmetier.rome_coherence_item coh ON (arb.code_ogr_competence = coh.code_ogr) \
-            INNER JOIN radarmetier.rome_referentiel_code_rome ref ON(coh.code_rome = ref.code_rome);"
-
-    df_competence = pd.DataFrame(df_from_query(query))
-    print(f"df_competence chargé: {df_competence.shape}")
-    #df_competence.to_csv("competences.csv", index=False, encoding="utf-8")
-
-
-# ===========================
-# 6. FastAPI App
-# ===========================
-
-app = FastAPI(title="JobProfile API", version="1.0")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-@app.on_event("startup")
-def startup_event():
-    load_df_competence()
-
-# ===========================
-# 7. Schémas Pydantic
-# ===========================
-
-class ProfileInput(BaseModel):
-    skills: List[str]
-
-class Competence(BaseModel):
-    competence: str | None = None
-    macro_competence: str | None = None
-    domaine_competence: str | None = None
-
-# ===========================
-# 8. Endpoints Init & Données
-# ===========================
-
-@app.get("/init")
-def init_data():
-    load_df_competence()
-    if df_competence.empty:
-        return {"status": "error", "message": "DataFrame vide"}
-    return {"status": "ready", "message": f"{df_competence.shape[0]} lignes chargées"}
-
-@app.post("/get_domaine_competence")
-def get_domaine_competence():
-    global df_competence
-    if df_competence.empty:
-        load_df_competence()
-    return {"status": "success", "liste_domaine": df_competence["domaine_competence"].sort_values().unique().tolist()}
-
-@app.post("/get_macro_competence")
-def get_macro_competence(competence: Competence):
-    global df_competence
-    if df_competence.empty:
-        return {"status": "error", "message": "Les données n'ont pas été initialisées. Faites d'abord /init."}
-    df_macro = df_competence[df_competence["domaine_competence"] == competence.domaine_competence]
-    if df_macro.empty:
-        return {"status": "error", "message": f"Aucune macro-compétence pour {competence.domaine_competence}"}
-    return {"status": "success", "liste_macro_competence": df_macro["libelle_macro_competence"].sort_values().unique().tolist()}
-
-@app.post("/get_competence")
-def get_competence(competence: Competence):
-    global df_competence
-    if df_competence.empty:
-        return {
-            "status": "error",
-            "message": "Les données n'ont pas été initialisées. Faites d'abord /init."
-        }
-    # Filtrer sur la macro compétence demandée
-    df_comp = (
-        df_competence.loc[
-            df_competence['libelle_macro_competence'] == competence.macro_competence,
-            [
-                'code_ogr_competence',
-                'libelle_competence',
-                'code_rome',
-                'libelle_rome'
-            ]
-        ]
-        .drop_duplicates(subset=["code_ogr_competence", "libelle_competence"])
-        .sort_values('libelle_competence')
-    )
-
-    df_comp['code_ogr_competence'] = df_comp['code_ogr_competence'].astype(int)
-    # Renommer pour un JSON plus propre
-    df_comp = df_comp.rename(columns={
-        'code_ogr_competence': 'code',
-        'libelle_competence': 'libelle',
-        'coh.code_rome': 'code_rome',
-        'ref.libelle_rome': 'libelle_rome'
-    })
-
-    print(f"Nb competence: {df_comp.shape}")
-
-    if df_comp.empty:
-        return {
-            "status": "error",
-            "message": f"Aucune compétence pour {competence.macro_competence}"
-        }
-
-    return {
-        "status": "success",
-        "liste_competence": df_comp[['code', 'libelle', 'code_rome', 'libelle_rome']].to_dict(orient='records')
-    }
-
-@app.get("/get_all_competences")
-def get_all_competences():
-    global df_competence
-    if df_competence.empty:
-        return {
-            "status": "error",
-            "message": "Les données n'ont pas été initialisées. Faites d'abord /init."
-        }
-
-    df_comp = (
-        df_competence[['code_ogr_competence', 'libelle_competence', 'code_rome', 'libelle_rome']]
-        .drop_duplicates(subset=["code_ogr_competence", "libelle_competence"])
-        .sort_values('libelle_competence')
-    )
-
-    df_comp['code_ogr_competence'] = df_comp['code_ogr_competence'].astype(int)
-
-    df_comp = df_comp.rename(columns={
-        'code_ogr_competence': 'code',
-        'libelle_competence': 'libelle',
-        'code_rome': 'code_rome',
-        'libelle_rome': 'libelle_rome'
-    })
-
-    return {
-        "status": "success",
-        "liste_competence": df_comp[['code', 'libelle', 'code_rome', 'libelle_rome']].to_dict(orient='records')
-    }
-
-@app.post("/get_rome_actuel_list")
-def get_rome_actuel_list():
-    """
-    Retourne la liste des codes ROME actuels (avec libellés),
-    classés par ordre alphabétique de code_rome.
-    """
-    global df_competence
-    if df_competence.empty:
-        load_df_competence()
-
-    df_rome_actuel = (
-        df_competence[['code_rome', 'libelle_rome']]
-        .drop_duplicates()
-        .sort_values('code_rome')   # Tri alphabétique
-    )
-
-    return {
-        "status": "success",
-        "liste_rome_actuel": df_rome_actuel.to_dict(orient="records")
-    }
-print("ok")
-
-@app.post("/get_rome_cible_list")
-def get_rome_cible_list():
-    """
-    Retourne la liste des codes ROME ciblés (avec libellés),
-    classés par ordre alphabétique de code_rome.
-    Si besoin d'une autre logique pour distinguer “ciblé”,
-       tu peux filtrer ici selon ta table ou ton mapping.
-    """
-    global df_competence
-    if df_competence.empty:
-        load_df_competence()
-
-    df_rome_cible = (
-        df_competence[['code_rome', 'libelle_rome']]
-        .drop_duplicates()
-        .sort_values('code_rome')   # Tri alphabétique
-    )
-
-    return {
-        "status": "success",
-        "liste_rome_cible": df_rome_cible.to_dict(orient="records")
-    }
-print("ok")
-
-from fastapi import Query
-@app.post("/get_competences_by_rome")
-def get_competences_by_rome(code_rome: str = Query(..., description="Code ROME actuel")):
-    """
-    Retourne la liste des compétences correspondant au code ROME actuel.
-    """
-    global df_competence
-    if df_competence.empty:
-        load_df_competence()
-
-    df_comp = df_competence[df_competence["code_rome"] == code_rome][
-        ["code_ogr_competence", "libelle_competence"]
-    ].drop_duplicates()
-
-    return {
-        "status": "success",
-        "competences": df_comp.to_dict(orient="records")
-    }
-print("ok")
-# ===========================
-# 9. Fonction de prédiction
-# ===========================
-
-def predict_hybrid(model,
-                    input_skills,
-                    skills_vocab,
-                    job_to_skills,
-                    jobs_vocab,
-                    job_labels,
-                    top_k: int = 5,
-                    seuil: float = 0.3,
-                    min_overlap: int = 2,):
-
-    ids = [skills_vocab[s] for s in input_skills if s in skills_vocab]
-    if not ids:
-        return {"status": "undefined", "reason": "aucune compétence reconnue", "predictions": []}
-
-    skills = torch.tensor(ids).unsqueeze(0).to(device)
-    weights = torch.tensor([1.0] * len(ids), dtype=torch.float).unsqueeze(0).to(device)
-
-    v_p = model.encode_profile(skills, weights)
-    all_jobs = torch.arange(len(jobs_vocab)).to(device)
-    v_j = model.encode_job(all_jobs)
-    scores_dl = (v_p @ v_j.T).squeeze(0)
-
-    input_set = set(input_skills)
-    overlap_scores = torch.tensor(
-        [len(input_set & set(job_to_skills.get(j, []))) for j in jobs_vocab.keys()],
-        device=device,
-    )
-
-    combined_scores = 0.3 * scores_dl + 0.7 * (overlap_scores / max(1, overlap_scores.max()))
-    filtered_indices = torch.arange(len(jobs_vocab), device=device)[overlap_scores >= min_overlap]
-    filtered_scores = combined_scores[overlap_scores >= min_overlap]
-
-    if len(filtered_scores) == 0:
-        return {"status": "empty", "reason": "aucun métier ne correspond aux compétences choisies", "predictions": []}
-
-    best_scores, best_idx = filtered_scores.topk(min(top_k, len(filtered_scores)))
-    best_jobs = [list(jobs_vocab.keys())[i] for i in filtered_indices[best_idx]]
-
-    predictions = [
-        {"rome": rome, 
-         "libelle": job_labels.get(rome, "?"), 
-         "score": round(float(s.detach().cpu()), 4)}
-        for rome, s in zip(best_jobs, best_scores)
-    ]
-
-    if best_scores[0] < seuil:
-        return {"status": "uncertain", "reason": "score sous le seuil", "predictions": predictions}
-
-    return {"status": "ok", "predictions": predictions}
-
-# ===========================
-# 10. Endpoints API
-# ===========================
-
-@app.get("/")
-def read_root():
-    return {"message": "API opérationnelle"}
-
-@app.post("/predict")
-def predict(profile: ProfileInput):
-    print(profile)
-    recognized_skills = [s for s in profile.skills if s in skills_vocab]
-    prediction = predict_hybrid(
-        model_loaded, recognized_skills, skills_vocab, job_to_skills, jobs_vocab, job_labels, top_k=5
-    )
-    print("return:", {"input_skills": profile.skills, "recognized_skills": recognized_skills, "result": prediction})
-    return {"input_skills": profile.skills, "recognized_skills": recognized_skills, "result": prediction}
+"""
+JobProfile API
+--------------
+
+Pour lancer l'application :
+    uvicorn main:app --reload
+
+Documentation :
+    http://127.0.0.1:8000/docs
+"""
+
+import gc
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import List
+
+import boto3
+import dill
+import pandas as pd
+import torch
+from dotenv import load_dotenv
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+from sqlalchemy import create_engine
+
+from artifacts import ArtifactCache
+from batching import MicroBatcher
+from logs import StructuredLogging, get_logger
+from metrics import Metrics
+from result_cache import ResultCache
+from singleflight import SingleFlightLoader
+from model import JobProfileTransformer, load_model_state  # Assurez-vous que model.py est dans le même répertoire
+
+# ===========================
+# 1. Configuration & Globals
+# ===========================
+
+BUCKET_NAME = "dlhybride"
+DB_SCHEMA = "radarmetier"
+
+load_dotenv(".env")
+
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
+S3_REGION = os.getenv("S3_REGION")
+S3_BUCKET = "dlhybride"
+# Cache local des artefacts S3 (voir artifacts.py) ; ARTIFACT_OFFLINE=1 démarre sur le cache sans appeler S3
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", os.path.expanduser("~/.cache/radar-metier"))
+ARTIFACT_OFFLINE = os.getenv("ARTIFACT_OFFLINE", "0") == "1"
+
+# Nombre maximal de profils encodés dans une même passe par /predict_batch
+PREDICT_BATCH_CHUNK = int(os.getenv("PREDICT_BATCH_CHUNK", "512"))
+# Micro-batching de /predict : attente maximale (ms) et taille maximale d'un lot (1 = désactivé)
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", "5"))
+PREDICT_MAX_BATCH = int(os.getenv("PREDICT_MAX_BATCH", "32"))
+# Cache des résultats de /predict : nombre d'ensembles de compétences conservés (0 = désactivé) et durée de vie (s, 0 = illimitée)
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "4096"))
+PREDICT_CACHE_TTL = float(os.getenv("PREDICT_CACHE_TTL", "0"))
+# Après un échec du chargement des compétences, délai (s) avant une nouvelle tentative à la demande, doublé à chaque échec
+COMPETENCE_RETRY_BACKOFF = float(os.getenv("COMPETENCE_RETRY_BACKOFF", "5"))
+COMPETENCE_RETRY_MAX_BACKOFF = float(os.getenv("COMPETENCE_RETRY_MAX_BACKOFF", "300"))
+# Durée (s) pendant laquelle le navigateur peut réutiliser une liste statique sans revalidation
+STATIC_CACHE_MAX_AGE = int(os.getenv("STATIC_CACHE_MAX_AGE", "60"))
+
+# Journalisation JSON écrite par un thread dédié, échantillonnée par endpoint (voir logs.py)
+structured_logging = StructuredLogging(
+    "dl-api",
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    sample_rates=os.getenv("LOG_SAMPLE_RATES", ""),
+    queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+)
+logger = get_logger("api")
+
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+# ===========================
+# 2. Connexion S3
+# ===========================
+
+s3_client = boto3.client(
+    service_name="s3",
+    region_name=S3_REGION,
+    endpoint_url=S3_ENDPOINT_URL,
+    aws_access_key_id=S3_ACCESS_KEY_ID,
+    aws_secret_access_key=S3_SECRET_ACCESS_KEY,
+)
+
+artifact_cache = ArtifactCache(s3_client, ARTIFACT_CACHE_DIR, offline=ARTIFACT_OFFLINE)
+
+# Histogrammes par étape, versions chargées et RSS, exposés par GET /metrics (voir metrics.py)
+metrics = Metrics()
+
+def fetch_artifact(key: str, bucket: str = S3_BUCKET) -> str:
+    """Chemin local d'un artefact S3 (voir artifacts.py) ; durée mesurée dans l'étape s3_fetch."""
+    with metrics.stage("s3_fetch"):
+        return artifact_cache.fetch(bucket, key)
+
+# ===========================
+# 3. Chargement des données
+# ===========================
+
+def load_csv_from_s3(file_name: str, bucket_name: str = S3_BUCKET) -> pd.DataFrame:
+    """Charge un CSV depuis S3 (via le cache local) en DataFrame pandas."""
+    return pd.read_csv(fetch_artifact(file_name, bucket_name), dtype=str)
+
+def build_job_skill_matrix(job_to_skills: dict, skills_vocab: dict, jobs_vocab: dict) -> torch.Tensor:
+    """Matrice d'incidence creuse (CSR) métiers x compétences, alignée sur jobs_vocab et skills_vocab."""
+    crow_indices, col_indices = [0], []
+    for code_rome in jobs_vocab:
+        col_indices.extend(sorted(skills_vocab[s] for s in job_to_skills.get(code_rome, ()) if s in skills_vocab))
+        crow_indices.append(len(col_indices))
+    return torch.sparse_csr_tensor(
+        torch.tensor(crow_indices, dtype=torch.int64),
+        torch.tensor(col_indices, dtype=torch.int64),
+        torch.ones(len(col_indices), dtype=torch.float),
+        size=(len(jobs_vocab), len(skills_vocab)),
+    ).to(device)
+
+# Vocabulaire et mappings, remplis par load_vocabularies() pendant le démarrage
+df_jobs = pd.DataFrame()
+skills_vocab = {}
+skill_to_label = {}
+jobs_vocab = {}
+job_labels = {}
+job_to_skills = {}
+job_codes = []  # index -> code ROME, aligné sur jobs_vocab
+job_skill_matrix = None
+
+def build_vocabularies(df_jobs: pd.DataFrame) -> dict:
+    """Vocabulaires, libellés et matrice métiers x compétences construits depuis df_competence_rome_eda_v2.csv."""
+    df_jobs["code_ogr_competence"] = df_jobs["code_ogr_competence"].astype(str)
+
+    skills_vocab = {code: idx for idx, code in enumerate(df_jobs["code_ogr_competence"].unique())}
+    jobs_vocab = {rome: idx for idx, rome in enumerate(df_jobs["code_rome"].unique())}
+    job_to_skills = df_jobs.groupby("code_rome")["code_ogr_competence"].apply(set).to_dict()
+    return {
+        "df_jobs": df_jobs,
+        "skills_vocab": skills_vocab,
+        "skill_to_label": (
+            df_jobs.drop_duplicates("code_ogr_competence")
+            .set_index("code_ogr_competence")["libelle_competence"]
+            .to_dict()
+        ),
+        "jobs_vocab": jobs_vocab,
+        "job_labels": (
+            df_jobs.drop_duplicates("code_rome")
+            .set_index("code_rome")["libelle_rome"]
+            .to_dict()
+        ),
+        "job_to_skills": job_to_skills,
+        "job_codes": list(jobs_vocab),
+        "job_skill_matrix": build_job_skill_matrix(job_to_skills, skills_vocab, jobs_vocab),
+    }
+
+def load_vocabularies():
+    global df_jobs, skills_vocab, skill_to_label, jobs_vocab, job_labels, job_to_skills, job_codes, job_skill_matrix
+
+    vocab = build_vocabularies(load_csv_from_s3("df_competence_rome_eda_v2.csv"))
+    df_jobs, skills_vocab, skill_to_label = vocab["df_jobs"], vocab["skills_vocab"], vocab["skill_to_label"]
+    jobs_vocab, job_labels, job_to_skills = vocab["jobs_vocab"], vocab["job_labels"], vocab["job_to_skills"]
+    job_codes, job_skill_matrix = vocab["job_codes"], vocab["job_skill_matrix"]
+    result_cache.invalidate("vocabulaires")
+    metrics.set_version("vocabulaires", f"{len(skills_vocab)} compétences, {len(jobs_vocab)} métiers")
+
+# ===========================
+# 4. Chargement du modèle
+# ===========================
+
+def load_model_from_s3_with_dill(key: str):
+    """Charge un modèle picklé (dill) depuis S3 (via le cache local)."""
+    with open(fetch_artifact(key), "rb") as f:
+        model_loaded = dill.load(f)
+
+    model_loaded.to(device)
+    model_loaded.eval()
+    return model_loaded
+
+def load_model_from_s3(key: str):
+    """
+    Charge un modèle exporté par export_model.py : `<nom>.json` (configuration) et `<nom>.pt` (state_dict).
+    Aucun pickle de code n'est exécuté (torch.load en weights_only) et les poids sont projetés
+    en mémoire depuis le cache local.
+    """
+    name = key.rsplit(".", 1)[0]
+    with open(fetch_artifact(f"{name}.json"), encoding="utf-8") as f:
+        config = json.load(f)
+    return load_model_state(config, fetch_artifact(f"{name}.pt"), device=device)
+
+def build_job_matrix(model, n_jobs: int) -> torch.Tensor:
+    """Calcule une seule fois les embeddings normalisés de tous les métiers (n_jobs x emb_dim)."""
+    with torch.no_grad(), metrics.stage("encode_job"):
+        all_jobs = torch.arange(n_jobs, device=device)
+        return model.encode_job(all_jobs).contiguous()
+
+# `.pt` : format state_dict + config JSON (export_model.py) ; `.pkl` : ancien modèle picklé avec dill
+MODEL_KEY = os.getenv("MODEL_KEY", "modele_epoch4001.pkl")
+model_loaded = None
+job_matrix = None
+
+def load_model(key: str = MODEL_KEY):
+    """(Re)charge le modèle et la matrice des métiers, puis les remplace ensemble."""
+    global model_loaded, job_matrix
+    model = load_model_from_s3_with_dill(key) if key.endswith(".pkl") else load_model_from_s3(key)
+    matrix = build_job_matrix(model, len(jobs_vocab))
+    model_loaded, job_matrix = model, matrix
+    result_cache.invalidate(f"modele {key}")
+    metrics.set_version("modele", key)
+    logger.info("Modèle chargé: %s, matrice métiers %s", key, tuple(job_matrix.shape))
+
+# ===========================
+# 5. Connexion DB
+# ===========================
+
+# Pool de connexions partagé par tous les appels à la DB du processus. Réglages adaptés au
+# pooler Supabase en mode transaction (port 6543) : peu de connexions, vérifiées avant usage
+# et renouvelées avant que le pooler ne les ferme.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+
+db_engine = None
+db_engine_lock = threading.Lock()
+
+def db_url() -> str:
+    url = f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}"
+    if os.getenv("DB_PORT"):
+        url += f":{os.getenv('DB_PORT')}"
+    if os.getenv("DB_NAME"):
+        url += f"/{os.getenv('DB_NAME')}"
+    return url
+
+def get_engine():
+    """Retourne le moteur SQLAlchemy du processus, créé au premier appel."""
+    global db_engine
+    if db_engine is None:
+        with db_engine_lock:
+            if db_engine is None:
+                db_engine = create_engine(
+                    db_url(),
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=True,
+                )
+    return db_engine
+
+def db_pool_stats() -> dict:
+    if db_engine is None:
+        return {"status": "not_created"}
+    pool = db_engine.pool
+    return {
+        "status": "created",
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+    }
+
+def df_from_table(table_name: str) -> pd.DataFrame | None:
+    """Lit une table PostgreSQL et retourne un DataFrame."""
+    logger.debug("Lecture de la table %s.%s", DB_SCHEMA, table_name)
+
+    try:
+        with metrics.stage("db_query"), get_engine().connect() as conn, conn.begin():
+            df = pd.read_sql_table(table_name, con=conn, schema=DB_SCHEMA)
+            logger.info("Data read from DB: %s", df.shape)
+            return df
+    except Exception as e:
+        logger.error("Erreur DB: %s", e)
+        return None
+
+def df_from_query(query) -> pd.DataFrame:
+    try:
+        with metrics.stage("db_query"), get_engine().connect() as conn, conn.begin():
+            data_frame = pd.read_sql_query(query, con= conn)
+            logger.info("Data read from DB: %s", data_frame.shape)
+            return data_frame
+    except Exception as e:
+        logger.error("Erreur DB: %s", e)
+    return pd.DataFrame()
+
+def build_competence_index(df: pd.DataFrame) -> dict:
+    """
+    Construit l'arborescence domaine -> macro-compétence -> compétence -> ROME sous forme
+    de dictionnaires de listes déjà triées et prêtes à sérialiser, publiés avec df_competence ("df").
+    """
+    index = {"df": df, "domaines": [], "macros_by_domaine": {}, "competences_by_macro": {}, "competences_by_rome": {},
+             "all_competences": [], "romes": []}
+    if df.empty:
+        index["responses"] = serialize_static_responses(index)
+        return index
+
+    index["domaines"] = df["domaine_competence"].sort_values().unique().tolist()
+    index["macros_by_domaine"] = {
+        domaine: macros.sort_values().unique().tolist()
+        for domaine, macros in df.groupby("domaine_competence")["libelle_macro_competence"]
+    }
+
+    df_comp = (
+        df[['libelle_macro_competence', 'code_ogr_competence', 'libelle_competence', 'code_rome', 'libelle_rome']]
+        .drop_duplicates(subset=["libelle_macro_competence", "code_ogr_competence", "libelle_competence"])
+        .sort_values('libelle_competence', kind="stable")
+        .rename(columns={'code_ogr_competence': 'code', 'libelle_competence': 'libelle'})
+    )
+    df_comp['code'] = df_comp['code'].astype(int)
+    index["competences_by_macro"] = {
+        macro: rows[['code', 'libelle', 'code_rome', 'libelle_rome']].to_dict(orient='records')
+        for macro, rows in df_comp.groupby("libelle_macro_competence", sort=False)
+    }
+
+    df_rome = df[["code_rome", "code_ogr_competence", "libelle_competence"]].drop_duplicates()
+    index["competences_by_rome"] = {
+        code_rome: rows[["code_ogr_competence", "libelle_competence"]].to_dict(orient="records")
+        for code_rome, rows in df_rome.groupby("code_rome", sort=False)
+    }
+
+    df_all = (
+        df[['code_ogr_competence', 'libelle_competence', 'code_rome', 'libelle_rome']]
+        .drop_duplicates(subset=["code_ogr_competence", "libelle_competence"])
+        .sort_values('libelle_competence', kind="stable")
+        .rename(columns={'code_ogr_competence': 'code', 'libelle_competence': 'libelle'})
+    )
+    df_all['code'] = df_all['code'].astype(int)
+    index["all_competences"] = df_all.to_dict(orient='records')
+    index["romes"] = (
+        df[['code_rome', 'libelle_rome']]
+        .drop_duplicates()
+        .sort_values('code_rome', kind="stable")   # Tri alphabétique
+        .to_dict(orient="records")
+    )
+
+    index["responses"] = serialize_static_responses(index)
+    return index
+
+def serialize_static_responses(index: dict) -> dict:
+    """Sérialise une fois par version des données les listes statiques : {nom: (corps JSON, ETag)}."""
+    payloads = {
+        "get_all_competences": {"status": "success", "liste_competence": index["all_competences"]},
+        "get_rome_actuel_list": {"status": "success", "liste_rome_actuel": index["romes"]},
+        "get_rome_cible_list": {"status": "success", "liste_rome_cible": index["romes"]},
+        "get_domaine_competence": {"status": "success", "liste_domaine": index["domaines"]},
+    }
+    responses = {}
+    for name, payload in payloads.items():
+        body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        responses[name] = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+    return responses
+
+def static_response(request: Request, index: dict, name: str) -> Response:
+    """
+    Renvoie une liste pré-sérialisée avec ETag, ou 304 si le client possède déjà cette version.
+    Les navigateurs ne mettent en cache et ne revalident (If-None-Match) que les GET : le front-end appelle ces
+    listes en GET, POST reste accepté pour les anciens clients.
+    """
+    body, etag = index["responses"][name]
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={STATIC_CACHE_MAX_AGE}, must-revalidate"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def load_df_competence() -> dict:
+    """Lit df_competence depuis la DB et construit ses index : version complète publiée par `competences`."""
+    query = "SELECT code_domaine_competence, domaine_competence, \
+            code_macro_competence, libelle_macro_competence, \
+            code_ogr_competence, libelle_competence, \
+            coh.code_rome, ref.libelle_rome \
+            FROM radarmetier.rome_arborescence_competences arb \
+            INNER JOIN radarmetier.rome_coherence_item coh ON (arb.code_ogr_competence = coh.code_ogr) \
+            INNER JOIN radarmetier.rome_referentiel_code_rome ref ON(coh.code_rome = ref.code_rome);"
+
+    df = pd.DataFrame(df_from_query(query))
+    #df_competence.to_csv("competences.csv", index=False, encoding="utf-8")
+    if df.empty:
+        raise RuntimeError("df_competence vide")
+    with metrics.stage("competence_index"):
+        return build_competence_index(df)
+
+def publish_competences(index: dict):
+    result_cache.invalidate("competences")
+    metrics.set_version("competences", f"{len(index['df'])} lignes, chargées le {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("df_competence chargé: %s", index["df"].shape)
+
+# Un seul chargement à la fois ; df_competence et ses index sont publiés ensemble (voir singleflight.py)
+competences = SingleFlightLoader(
+    load_df_competence,
+    build_competence_index(pd.DataFrame()),
+    name="competences",
+    on_publish=publish_competences,
+    backoff_seconds=COMPETENCE_RETRY_BACKOFF,
+    max_backoff_seconds=COMPETENCE_RETRY_MAX_BACKOFF,
+)
+
+
+# ===========================
+# 6. FastAPI App
+# ===========================
+
+app = FastAPI(title="JobProfile API", version="1.0")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Durée et code de retour de chaque requête, par route (gabarit de chemin, pas l'URL brute)."""
+    request.state.received = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", "<inconnue>")
+        metrics.observe_request(request.method, route, status_code, time.perf_counter() - request.state.received)
+
+# Démarrage non bloquant : le port s'ouvre tout de suite, les artefacts sont chargés en
+# arrière-plan. /ready indique l'avancement de chaque phase et sa durée.
+WARMUP_RETRY_AFTER = os.getenv("WARMUP_RETRY_AFTER", "5")
+warmup_status = {"status": "starting", "phases": {}}
+
+def run_warmup_phase(name: str, fn):
+    phase = warmup_status["phases"][name] = {"status": "running"}
+    start = time.perf_counter()
+    try:
+        fn()
+        phase["status"] = "done"
+    except Exception as e:
+        phase.update(status="error", error=str(e))
+        raise
+    finally:
+        phase["seconds"] = round(time.perf_counter() - start, 3)
+        logger.info("[WARMUP] %s: %s (%s s)", name, phase["status"], phase["seconds"])
+
+def warmup():
+    try:
+        run_warmup_phase("vocabulaires", load_vocabularies)
+        run_warmup_phase("modele", load_model)
+        warmup_status["status"] = "ready"
+        # Les compétences ne conditionnent pas la prédiction : un échec est rapporté dans /ready
+        # et les endpoints concernés rechargent les données à la demande.
+        run_warmup_phase("competences", competences.refresh)
+    except Exception as e:
+        if warmup_status["status"] != "ready":
+            warmup_status["status"] = "error"
+        logger.error("[WARMUP] échec: %s", e)
+
+def require_ready():
+    """Dépendance des endpoints de prédiction : 503 + Retry-After tant que le modèle n'est pas chargé."""
+    if warmup_status["status"] != "ready":
+        raise HTTPException(
+            status_code=503,
+            detail=f"Chargement en cours ({warmup_status['status']})",
+            headers={"Retry-After": WARMUP_RETRY_AFTER},
+        )
+
+@app.on_event("startup")
+def startup_event():
+    # Artefacts déjà chargés par le processus maître (préchargement, voir gunicorn.conf.py)
+    if warmup_status["status"] == "ready":
+        return
+    threading.Thread(target=warmup, name="warmup", daemon=True).start()
+
+def preload():
+    """Chargement dans le processus maître gunicorn, avant la création des workers."""
+    warmup()
+    # Les objets chargés sortent du suivi du ramasse-miettes : ses passages dans les workers
+    # n'écrivent plus dans leurs en-têtes, les pages restent partagées entre processus
+    gc.freeze()
+
+def after_fork():
+    """Dans chaque worker préchargé : les connexions DB ouvertes par le maître sont abandonnées sans être fermées."""
+    if db_engine is not None:
+        db_engine.dispose(close=False)
+
+# ===========================
+# 7. Schémas Pydantic
+# ===========================
+
+class ProfileInput(BaseModel):
+    skills: List[str]
+
+class BatchProfileInput(BaseModel):
+    profiles: List[ProfileInput]
+
+class Competence(BaseModel):
+    competence: str | None = None
+    macro_competence: str | None = None
+    domaine_competence: str | None = None
+
+# ===========================
+# 8. Endpoints Init & Données
+# ===========================
+
+@app.get("/init")
+def init_data():
+    try:
+        index = competences.refresh()
+    except Exception as e:
+        return {"status": "error", "message": f"Chargement impossible : {e}"}
+    return {"status": "ready", "message": f"{index['df'].shape[0]} lignes chargées"}
+
+@app.get("/competences_stats")
+def competences_stats():
+    return competences.stats()
+
+@app.get("/db_pool_stats")
+def get_db_pool_stats():
+    return db_pool_stats()
+
+@app.get("/reload_model", dependencies=[Depends(require_ready)])
+def reload_model():
+    load_model()
+    return {"status": "ready", "message": f"{job_matrix.shape[0]} métiers encodés"}
+
+@app.api_route("/get_domaine_competence", methods=["GET", "POST"])
+def get_domaine_competence(request: Request):
+    return static_response(request, competences.get(), "get_domaine_competence")
+
+@app.post("/get_macro_competence")
+def get_macro_competence(competence: Competence):
+    index = competences.value
+    if index["df"].empty:
+        return {"status": "error", "message": "Les données n'ont pas été initialisées. Faites d'abord /init."}
+    liste_macro = index["macros_by_domaine"].get(competence.domaine_competence)
+    if not liste_macro:
+        return {"status": "error", "message": f"Aucune macro-compétence pour {competence.domaine_competence}"}
+    return {"status": "success", "liste_macro_competence": liste_macro}
+
+@app.post("/get_competence")
+def get_competence(competence: Competence):
+    index = competences.value
+    if index["df"].empty:
+        return {
+            "status": "error",
+            "message": "Les données n'ont pas été initialisées. Faites d'abord /init."
+        }
+    # Compétences de la macro compétence demandée, pré-calculées par build_competence_index
+    liste_competence = index["competences_by_macro"].get(competence.macro_competence, [])
+
+    structured_logging.log_request("get_competence", "Nb competence", macro_competence=competence.macro_competence,
+                                   competences=len(liste_competence))
+
+    if not liste_competence:
+        return {
+            "status": "error",
+            "message": f"Aucune compétence pour {competence.macro_competence}"
+        }
+
+    return {
+        "status": "success",
+        "liste_competence": liste_competence
+    }
+
+@app.get("/get_all_competences")
+def get_all_competences(request: Request):
+    index = competences.value
+    if index["df"].empty:
+        return {
+            "status": "error",
+            "message": "Les données n'ont pas été initialisées. Faites d'abord /init."
+        }
+    return static_response(request, index, "get_all_competences")
+
+@app.api_route("/get_rome_actuel_list", methods=["GET", "POST"])
+def get_rome_actuel_list(request: Request):
+    """
+    Retourne la liste des codes ROME actuels (avec libellés),
+    classés par ordre alphabétique de code_rome.
+    """
+    return static_response(request, competences.get(), "get_rome_actuel_list")
+
+@app.api_route("/get_rome_cible_list", methods=["GET", "POST"])
+def get_rome_cible_list(request: Request):
+    """
+    Retourne la liste des codes ROME ciblés (avec libellés),
+    classés par ordre alphabétique de code_rome.
+    Si besoin d'une autre logique pour distinguer “ciblé”,
+       tu peux filtrer ici selon ta table ou ton mapping.
+    """
+    return static_response(request, competences.get(), "get_rome_cible_list")
+
+from fastapi import Query
+@app.post("/get_competences_by_rome")
+def get_competences_by_rome(code_rome: str = Query(..., description="Code ROME actuel")):
+    """
+    Retourne la liste des compétences correspondant au code ROME actuel.
+    """
+    return {
+        "status": "success",
+        "competences": competences.get()["competences_by_rome"].get(code_rome, [])
+    }
+# ===========================
+# 9. Fonction de prédiction
+# ===========================
+
+def encode_profiles(model, batch_ids):
+    """Encode un lot de profils (listes d'indices) complétés à une longueur commune en une seule passe."""
+    max_len = max(len(ids) for ids in batch_ids)
+    skills = torch.tensor([ids + [0] * (max_len - len(ids)) for ids in batch_ids], device=device)
+    weights = torch.tensor([[1.0] * len(ids) + [0.0] * (max_len - len(ids)) for ids in batch_ids], device=device)
+    lengths = torch.tensor([len(ids) for ids in batch_ids], device=device)
+    return model.encode_profile(skills, weights, lengths=lengths)
+
+def predict_hybrid_batch(model,
+                    job_matrix,
+                    batch_input_skills,
+                    skills_vocab,
+                    job_skill_matrix,
+                    job_codes,
+                    job_labels,
+                    top_k: int = 5,
+                    seuil: float = 0.3,
+                    min_overlap: int = 2,):
+    """Prédit les métiers pour un lot de profils : un seul encodage et un seul produit matriciel pour tout le lot."""
+    results = [{"status": "undefined", "reason": "aucune compétence reconnue", "predictions": []}
+               for _ in batch_input_skills]
+    # Une compétence saisie plusieurs fois ne compte qu'une fois (cohérent avec la clé du cache de résultats)
+    batch_ids = [list(dict.fromkeys(skills_vocab[s] for s in input_skills if s in skills_vocab))
+                 for input_skills in batch_input_skills]
+    rows = [i for i, ids in enumerate(batch_ids) if ids]
+    if not rows:
+        return results
+    batch_ids = [batch_ids[i] for i in rows]
+
+    # La matrice des métiers (job_matrix) est pré-calculée au chargement du modèle :
+    # seuls les profils sont encodés à chaque requête.
+    with torch.no_grad():
+        with metrics.stage("encode_profile"):
+            v_p = encode_profiles(model, batch_ids)
+        with metrics.stage("matmul"):
+            scores_dl = v_p @ job_matrix.T
+
+    # Recouvrement profil/métier pour tous les métiers : un seul produit matrice creuse x matrice
+    with metrics.stage("overlap"):
+        query = torch.zeros(job_skill_matrix.shape[1], len(batch_ids), device=device)
+        for col, ids in enumerate(batch_ids):
+            query[ids, col] = 1.0
+        overlap_scores = (job_skill_matrix @ query).T
+
+    with metrics.stage("topk"):
+        combined_scores = 0.3 * scores_dl + 0.7 * (overlap_scores / overlap_scores.amax(dim=1, keepdim=True).clamp(min=1))
+        keep = overlap_scores >= min_overlap
+        n_kept = keep.sum(dim=1).tolist()
+        best_scores, best_idx = combined_scores.masked_fill(~keep, float("-inf")).topk(min(top_k, len(job_codes)), dim=1)
+        best_scores, best_idx = best_scores.cpu().tolist(), best_idx.cpu().tolist()
+
+    for row, k, scores, indices in zip(rows, n_kept, best_scores, best_idx):
+        if k == 0:
+            results[row] = {"status": "empty", "reason": "aucun métier ne correspond aux compétences choisies", "predictions": []}
+            continue
+
+        predictions = [
+            {"rome": job_codes[i],
+             "libelle": job_labels.get(job_codes[i], "?"),
+             "score": round(score, 4)}
+            for i, score in zip(indices[:k], scores[:k])
+        ]
+
+        if scores[0] < seuil:
+            results[row] = {"status": "uncertain", "reason": "score sous le seuil", "predictions": predictions}
+        else:
+            results[row] = {"status": "ok", "predictions": predictions}
+
+    return results
+
+def predict_hybrid(model,
+                    job_matrix,
+                    input_skills,
+                    skills_vocab,
+                    job_skill_matrix,
+                    job_codes,
+                    job_labels,
+                    top_k: int = 5,
+                    seuil: float = 0.3,
+                    min_overlap: int = 2,):
+    return predict_hybrid_batch(model, job_matrix, [input_skills], skills_vocab, job_skill_matrix, job_codes,
+                                job_labels, top_k=top_k, seuil=seuil, min_overlap=min_overlap)[0]
+
+def _predict_micro_batch(batch_input_skills):
+    return predict_hybrid_batch(
+        model_loaded, job_matrix, batch_input_skills, skills_vocab, job_skill_matrix, job_codes, job_labels, top_k=5
+    )
+
+predict_batcher = MicroBatcher(_predict_micro_batch, max_wait_ms=PREDICT_MAX_WAIT_MS, max_batch_size=PREDICT_MAX_BATCH)
+
+# Résultats de /predict par liste canonique de compétences reconnues (voir result_cache.py)
+result_cache = ResultCache(max_size=PREDICT_CACHE_SIZE, ttl_seconds=PREDICT_CACHE_TTL)
+
+def canonical_skills(recognized_skills) -> tuple:
+    """
+    Codes reconnus sans doublon, dans l'ordre de saisie : entrée du modèle et clé du cache de résultats.
+    L'ordre n'est pas normalisé (tri) : les embeddings de position du transformer rendent le résultat
+    sensible à l'ordre, et /predict doit répondre comme /predict_batch pour le même profil.
+    """
+    return tuple(dict.fromkeys(recognized_skills))
+
+# ===========================
+# 10. Endpoints API
+# ===========================
+
+@app.get("/")
+def read_root():
+    return {"message": "API opérationnelle"}
+
+@app.get("/ready")
+def ready():
+    status_code = 200 if warmup_status["status"] == "ready" else 503
+    headers = {} if status_code == 200 else {"Retry-After": WARMUP_RETRY_AFTER}
+    phases = {name: dict(phase) for name, phase in list(warmup_status["phases"].items())}
+    return JSONResponse({"status": warmup_status["status"], "phases": phases, "pid": os.getpid()},
+                        status_code=status_code, headers=headers)
+
+@app.post("/predict", dependencies=[Depends(require_ready)])
+def predict(profile: ProfileInput, request: Request):
+    # Lecture du corps, validation pydantic et dépendances, depuis la réception de la requête
+    metrics.observe("validation", time.perf_counter() - request.state.received)
+    with metrics.stage("vocab_lookup"):
+        recognized_skills = [s for s in profile.skills if s in skills_vocab]
+    # Les appels concurrents sont regroupés en un seul encodage (voir batching.py) ;
+    # une liste de compétences déjà prédite est servie depuis le cache
+    key = canonical_skills(recognized_skills)
+    prediction = result_cache.get_or_compute(key, lambda: predict_batcher.submit(list(key)))
+    # Références seulement : la sérialisation du journal est faite par le thread d'écriture
+    structured_logging.log_request("predict", "return", input_skills=profile.skills,
+                                   recognized_skills=recognized_skills, result=prediction)
+    with metrics.stage("serialization"):
+        return JSONResponse({"input_skills": profile.skills, "recognized_skills": recognized_skills, "result": prediction})
+
+@app.post("/predict_batch", dependencies=[Depends(require_ready)])
+def predict_batch(batch: BatchProfileInput, request: Request):
+    """Prédit les métiers pour une cohorte de profils, traités par lots de PREDICT_BATCH_CHUNK."""
+    metrics.observe("validation", time.perf_counter() - request.state.received)
+    with metrics.stage("vocab_lookup"):
+        recognized = [[s for s in profile.skills if s in skills_vocab] for profile in batch.profiles]
+    predictions = []
+    for start in range(0, len(recognized), PREDICT_BATCH_CHUNK):
+        predictions += predict_hybrid_batch(
+            model_loaded, job_matrix, recognized[start:start + PREDICT_BATCH_CHUNK],
+            skills_vocab, job_skill_matrix, job_codes, job_labels, top_k=5
+        )
+    with metrics.stage("serialization"):
+        return JSONResponse({
+            "results": [
+                {"input_skills": profile.skills, "recognized_skills": skills, "result": prediction}
+                for profile, skills, prediction in zip(batch.profiles, recognized, predictions)
+            ]
+        })
+
+@app.get("/batching_stats")
+def batching_stats():
+    return predict_batcher.stats()
+
+@app.get("/predict_cache_stats")
+def predict_cache_stats():
+    return result_cache.stats()
+
+@app.get("/logging_stats")
+def logging_stats():
+    return structured_logging.stats()
+
+@app.get("/metrics")
+def get_metrics():
+    """Métriques au format texte Prometheus (voir metrics.py)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
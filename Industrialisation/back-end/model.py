@@ -1,9 +1,13 @@
 # model.py
+import json
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import math
 
+# Version du format d'export (state_dict + config JSON)
+MODEL_FORMAT_VERSION = 1
+
 class JobProfileTransformer(nn.Module):
     def __init__(self, n_skills, n_jobs, emb_dim=64, n_heads=4, n_layers=2, max_len=88):
         super().__init__()
@@ -15,17 +19,63 @@ class JobProfileTransformer(nn.Module):
         self.encoder = nn.TransformerEncoder(encoder_layer, num_layers=n_layers)
         self.job_emb = nn.Embedding(n_jobs, emb_dim)
 
-    def encode_profile(self, skills, weights=None):
+    def encode_profile(self, skills, weights=None, lengths=None):
         batch_size, seq_len = skills.shape
         pos_emb = self.pos_emb[:, :seq_len, :] if seq_len <= self.pos_emb.size(1) \
             else self.pos_emb.repeat(1, math.ceil(seq_len / self.pos_emb.size(1)), 1)[:, :seq_len, :]
         skills_emb = self.skill_emb(skills) + pos_emb
         if weights is not None:
             skills_emb = skills_emb * weights.unsqueeze(-1)
-        mask = (skills == 0)
-        v = self.encoder(skills_emb, src_key_padding_mask=mask)
-        return F.normalize(v.mean(dim=1), dim=1)
+        if lengths is None:
+            mask = (skills == 0)
+            v = self.encoder(skills_emb, src_key_padding_mask=mask)
+            return F.normalize(v.mean(dim=1), dim=1)
+        # Lot complété (padding) : le masque vient des longueurs et non de l'indice 0, qui est une vraie
+        # compétence (premier code du vocabulaire) ; moyenne sur les seules positions réelles de chaque
+        # profil, afin d'obtenir le même vecteur que le profil encodé seul.
+        keep = torch.arange(seq_len, device=skills.device).unsqueeze(0) < lengths.unsqueeze(1)
+        v = self.encoder(skills_emb, src_key_padding_mask=~keep)
+        v = v.masked_fill(~keep.unsqueeze(-1), 0.0).sum(dim=1) / lengths.unsqueeze(1).to(v.dtype)
+        return F.normalize(v, dim=1)
 
     def encode_job(self, job_ids):
         return F.normalize(self.job_emb(job_ids), dim=1)
 
+
+# ---------------------------
+# Export / import sans pickle
+# ---------------------------
+
+def model_config(model: JobProfileTransformer) -> dict:
+    """Arguments du constructeur, déduits des couches (fonctionne aussi pour un modèle chargé avec dill)."""
+    return {
+        "format_version": MODEL_FORMAT_VERSION,
+        "n_skills": model.skill_emb.num_embeddings,
+        "n_jobs": model.job_emb.num_embeddings,
+        "emb_dim": model.skill_emb.embedding_dim,
+        "n_heads": model.encoder.layers[0].self_attn.num_heads,
+        "n_layers": len(model.encoder.layers),
+        "max_len": model.pos_emb.size(1),
+    }
+
+def export_model(model: JobProfileTransformer, weights_path: str, config_path: str):
+    """Écrit les poids (state_dict, tenseurs uniquement) et la configuration JSON du modèle."""
+    state = {name: tensor.detach().cpu().contiguous() for name, tensor in model.state_dict().items()}
+    torch.save(state, weights_path)
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(model_config(model), f, indent=2)
+
+def load_model_state(config: dict, weights, device="cpu") -> JobProfileTransformer:
+    """
+    Reconstruit le modèle depuis sa configuration et ses poids.
+    `weights` est un chemin (fichier projeté en mémoire avec mmap) ou un objet fichier (ex: BytesIO).
+    """
+    if config.get("format_version", MODEL_FORMAT_VERSION) > MODEL_FORMAT_VERSION:
+        raise ValueError(f"Format de modèle non supporté: {config['format_version']}")
+    kwargs = {k: config[k] for k in ("n_skills", "n_jobs", "emb_dim", "n_heads", "n_layers", "max_len")}
+    # Construction sur le device "meta" : aucun poids n'est initialisé, ils sont remplacés par ceux du fichier
+    with torch.device("meta"):
+        model = JobProfileTransformer(**kwargs)
+    state = torch.load(weights, map_location="cpu", weights_only=True, mmap=isinstance(weights, str))
+    model.load_state_dict(state, assign=True)
+    return model.to(device).eval()
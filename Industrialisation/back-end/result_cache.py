@@ -0,0 +1,83 @@
+# result_cache.py
+"""
+Cache LRU (et TTL optionnel) des résultats de prédiction.
+
+La clé est la forme canonique des compétences reconnues, choisie par chaque back-end :
+codes triés et sans doublon pour l'API ML (score indépendant de l'ordre de saisie),
+codes sans doublon dans l'ordre de saisie pour l'API DL (le transformer tient compte
+de la position). Chaque entrée est aussi indexée par la version des données : un
+rechargement du modèle ou des référentiels appelle `invalidate()`, qui vide le cache
+et incrémente la version, si bien qu'un résultat calculé sur l'ancienne version
+pendant le rechargement n'est jamais servi.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    def __init__(self, max_size: int = 4096, ttl_seconds: float = 0.0):
+        self.max_size = max(0, max_size)
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()  # (version, clé) -> (résultat, instant d'insertion)
+        self._lock = threading.Lock()
+
+        self.version = 0
+        self.last_invalidation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_compute(self, key, compute):
+        """Retourne le résultat en cache pour `key`, ou le calcule avec `compute()` et le conserve."""
+        if self.max_size == 0:
+            return compute()
+
+        with self._lock:
+            version = self.version
+            entry = self._entries.get((version, key))
+            if entry is not None:
+                if self.ttl <= 0 or time.monotonic() - entry[1] < self.ttl:
+                    self._entries.move_to_end((version, key))
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[(version, key)]
+                self.expirations += 1
+            self.misses += 1
+
+        # Calcul hors verrou : les requêtes concurrentes ne s'attendent pas entre elles
+        result = compute()
+
+        with self._lock:
+            # Données rechargées pendant le calcul : le résultat n'est pas conservé
+            if version == self.version:
+                self._entries[(version, key)] = (result, time.monotonic())
+                self._entries.move_to_end((version, key))
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def invalidate(self, reason: str = ""):
+        """Vide le cache et passe à une nouvelle version des données (modèle ou référentiel rechargé)."""
+        with self._lock:
+            self._entries.clear()
+            self.version += 1
+            self.last_invalidation = reason
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "size": len(self._entries),
+            "version": self.version,
+            "last_invalidation": self.last_invalidation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -32,9 +32,8 @@ function populateSelect(selectEl, items, defaultText, getValue, getLabel) {
 // =============================
 async function loadDomaines() {
     try {
-        const res = await fetch(`${apiUrl}/get_domaine_competence`, { method: "POST" ,
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({})});
+        // GET : le navigateur met la liste en cache et la revalide (ETag, réponse 304)
+        const res = await fetch(`${apiUrl}/get_domaine_competence`, { method: "GET" });
         const data = await res.json();
         if (data.status === "success") {
             populateSelect(
@@ -98,7 +97,7 @@ async function loadCompetences(macro) {
 
 async function loadRomeList(endpoint, selectId) {
     try {
-        const res = await fetch(`${apiUrl}/${endpoint}`, { method: "POST" });
+        const res = await fetch(`${apiUrl}/${endpoint}`, { method: "GET" });
         const data = await res.json();
         if (data.status === "success") {
             const list = endpoint.includes("actuel") ? data.liste_rome_actuel : data.liste_rome_cible;
@@ -0,0 +1,178 @@
+# artifacts.py
+"""
+Cache local des artefacts téléchargés depuis S3.
+
+Chaque objet (bucket, clé) est conservé sur disque avec son ETag et son empreinte SHA-256 :
+    <cache_dir>/objects/<sha256>        contenu (adressé par son empreinte)
+    <cache_dir>/refs/<hash(bucket/key)>.json   bucket, clé, ETag, sha256, taille
+
+Au démarrage, un GET conditionnel (If-None-Match) évite de retélécharger un artefact inchangé ;
+un objet du cache dont l'empreinte ne correspond plus est retéléchargé.
+Si S3 est injoignable ou indisponible (erreur 5xx, limitation de débit), ou en mode hors ligne
+(ARTIFACT_OFFLINE=1), le cache est utilisé seul.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+CHUNK_SIZE = 1024 * 1024
+
+# Codes d'erreur S3 de limitation de débit : comme une erreur 5xx, S3 est momentanément indisponible
+THROTTLING_CODES = {"SlowDown", "Throttling", "ThrottlingException", "RequestLimitExceeded", "TooManyRequests",
+                    "TooManyRequestsException"}
+
+logger = logging.getLogger("radar_metier.artifacts")
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def is_unavailable(error: ClientError) -> bool:
+    """Erreur serveur ou limitation de débit (à la différence d'un accès refusé ou d'une clé absente)."""
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+    return status >= 500 or status == 429 or error.response.get("Error", {}).get("Code") in THROTTLING_CODES
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    def __init__(self, s3_client, cache_dir: str, offline: bool = False):
+        self.s3_client = s3_client
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.refs_dir = os.path.join(cache_dir, "refs")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.refs_dir, exist_ok=True)
+
+    # ---------------------------
+    # Références (bucket, clé) -> objet
+    # ---------------------------
+
+    def _ref_path(self, bucket: str, key: str) -> str:
+        name = hashlib.sha256(f"{bucket}/{key}".encode("utf-8")).hexdigest()
+        return os.path.join(self.refs_dir, f"{name}.json")
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256)
+
+    def _read_ref(self, bucket: str, key: str) -> dict | None:
+        try:
+            with open(self._ref_path(bucket, key), encoding="utf-8") as f:
+                ref = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._object_path(ref["sha256"])):
+            return None
+        return ref
+
+    def _write_ref(self, ref: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.refs_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(ref, f)
+        os.replace(tmp_path, self._ref_path(ref["bucket"], ref["key"]))
+
+    def _prune(self, sha256: str):
+        """Supprime un objet qui n'est plus référencé par aucune clé."""
+        for name in os.listdir(self.refs_dir):
+            try:
+                with open(os.path.join(self.refs_dir, name), encoding="utf-8") as f:
+                    if json.load(f).get("sha256") == sha256:
+                        return
+            except (OSError, ValueError):
+                continue
+        try:
+            os.remove(self._object_path(sha256))
+        except OSError:
+            pass
+
+    def _verified(self, ref: dict) -> str:
+        path = self._object_path(ref["sha256"])
+        if sha256_file(path) != ref["sha256"]:
+            raise ArtifactError(f"Empreinte invalide pour {ref['bucket']}/{ref['key']} dans le cache")
+        return path
+
+    # ---------------------------
+    # Téléchargement
+    # ---------------------------
+
+    def _download(self, response, bucket: str, key: str) -> dict:
+        """Écrit le corps de la réponse dans le cache en calculant son empreinte au fil de l'eau."""
+        sha256, md5, size = hashlib.sha256(), hashlib.md5(), 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response["Body"].iter_chunks(CHUNK_SIZE):
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    md5.update(chunk)
+                    size += len(chunk)
+
+            etag = response.get("ETag", "")
+            if "ContentLength" in response and response["ContentLength"] != size:
+                raise ArtifactError(f"Taille incohérente pour {bucket}/{key}: {size} / {response['ContentLength']}")
+            # Un ETag simple (hors upload multipart) est en général le MD5 du contenu, mais ni avec SSE-KMS
+            # ni pour tous les stockages compatibles S3 : un écart ne prouve pas une corruption
+            if etag and "-" not in etag and etag.strip('"') != md5.hexdigest():
+                logger.warning("%s: ETag %s différent du MD5 du contenu, contrôle d'intégrité indisponible", key, etag)
+
+            os.replace(tmp_path, self._object_path(sha256.hexdigest()))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {"bucket": bucket, "key": key, "etag": etag, "sha256": sha256.hexdigest(), "size": size}
+
+    def fetch(self, bucket: str, key: str) -> str:
+        """Retourne le chemin local de l'artefact, téléchargé seulement s'il a changé sur S3."""
+        ref = self._read_ref(bucket, key)
+        if self.offline:
+            if ref is None:
+                raise ArtifactError(f"{bucket}/{key} absent du cache (mode hors ligne)")
+            logger.info("%s: cache (hors ligne)", key)
+            return self._verified(ref)
+
+        kwargs = {"IfNoneMatch": ref["etag"]} if ref and ref.get("etag") else {}
+        try:
+            response = self.s3_client.get_object(Bucket=bucket, Key=key, **kwargs)
+        except ClientError as e:
+            if ref is not None and e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 304:
+                try:
+                    path = self._verified(ref)
+                except ArtifactError as error:
+                    # Objet du cache corrompu : nouveau téléchargement, sans condition
+                    logger.warning("%s, nouveau téléchargement", error)
+                    response = self.s3_client.get_object(Bucket=bucket, Key=key)
+                else:
+                    logger.info("%s: inchangé (%s)", key, ref["etag"])
+                    return path
+            elif ref is not None and is_unavailable(e):
+                logger.warning("%s: S3 indisponible (%s), utilisation du cache", key, e)
+                return self._verified(ref)
+            else:
+                raise
+        except BotoCoreError as e:
+            # S3 injoignable : démarrage sur la dernière version connue
+            if ref is None:
+                raise
+            logger.warning("%s: S3 indisponible (%s), utilisation du cache", key, e)
+            return self._verified(ref)
+
+        new_ref = self._download(response, bucket, key)
+        self._write_ref(new_ref)
+        if ref is not None and ref["sha256"] != new_ref["sha256"]:
+            self._prune(ref["sha256"])
+        logger.info("%s: téléchargé (%d octets)", key, new_ref["size"])
+        return self._object_path(new_ref["sha256"])
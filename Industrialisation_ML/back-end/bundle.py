@@ -0,0 +1,169 @@
+# bundle.py
+"""
+Format compact et projetable en mémoire (mmap) du bundle du modèle ML.
+
+Remplace metiers_comp.joblib (X float64 CSR et dictionnaires Python) par un répertoire
+(ou un préfixe S3) de fichiers .npy ouverts avec mmap_mode="r" : plusieurs workers
+uvicorn partagent alors les mêmes pages au lieu de garder chacun une copie privée.
+
+    manifest.json                               format, version, forme de X
+    X_data.npy, X_indices.npy, X_indptr.npy     X en CSC (float32, index int32 ou int64) : X.T est
+                                                directement le CSR utilisé par ScoringEngine, sans copie
+    roms_offsets.npy, roms_blob.npy             codes ROME (ligne i de X)
+    comp2j_keys_*.npy, comp2j_values.npy        code compétence -> colonne de X (clés triées)
+    rom_lbl_keys_*.npy, rom_lbl_values_*.npy    code ROME -> libellé
+    comp_lbl_keys_*.npy, comp_lbl_values_*.npy  code compétence -> libellé
+
+Une table de chaînes est un blob UTF-8 (uint8) et les positions de début de chaque chaîne (int64, n+1).
+"""
+
+import json
+import os
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+from scipy.sparse import csc_matrix
+
+BUNDLE_FORMAT = "radar-metier-ml-bundle"
+BUNDLE_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+class StringTable(Sequence):
+    """Liste de chaînes stockée en blob UTF-8 + offsets, décodées à la demande."""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+
+    def raw(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return self.raw(i).decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class StringDict(Mapping):
+    """Dictionnaire en lecture seule : clés triées (StringTable) et recherche dichotomique."""
+
+    def __init__(self, keys: StringTable, values):
+        self.keys_table = keys
+        self.values = values
+
+    def _find(self, key) -> int:
+        target = str(key).encode("utf-8")
+        lo, hi = 0, len(self.keys_table)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.keys_table.raw(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self.keys_table) and self.keys_table.raw(lo) == target else -1
+
+    def __getitem__(self, key):
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        value = self.values[i]
+        return int(value) if isinstance(value, np.integer) else value
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __iter__(self):
+        return iter(self.keys_table)
+
+    def __len__(self):
+        return len(self.keys_table)
+
+
+# ---------------------------
+# Conversion depuis metiers_comp.joblib
+# ---------------------------
+
+def _save_strings(out_dir: str, name: str, strings) -> dict:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    np.save(os.path.join(out_dir, f"{name}_offsets.npy"), offsets)
+    np.save(os.path.join(out_dir, f"{name}_blob.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    return {"offsets": f"{name}_offsets.npy", "blob": f"{name}_blob.npy"}
+
+def _save_mapping(out_dir: str, name: str, mapping: dict, strings_values: bool) -> dict:
+    items = sorted(((str(k).strip(), v) for k, v in mapping.items()), key=lambda kv: kv[0].encode("utf-8"))
+    entry = {"keys": _save_strings(out_dir, f"{name}_keys", [k for k, _ in items])}
+    if strings_values:
+        entry["values"] = _save_strings(out_dir, f"{name}_values", [str(v) for _, v in items])
+    else:
+        np.save(os.path.join(out_dir, f"{name}_values.npy"), np.array([v for _, v in items], dtype=np.int32))
+        entry["values"] = f"{name}_values.npy"
+    return entry
+
+def convert_bundle(bundle: dict, out_dir: str):
+    """Écrit le bundle joblib (X, roms, comp2j, rom_lbl, comp_lbl) au format mmap dans out_dir."""
+    os.makedirs(out_dir, exist_ok=True)
+    X = csc_matrix(bundle["X"], dtype=np.float32)
+    X.sum_duplicates()
+    X.sort_indices()
+    index_dtype = np.int32 if X.nnz < np.iinfo(np.int32).max else np.int64
+    np.save(os.path.join(out_dir, "X_data.npy"), X.data.astype(np.float32))
+    np.save(os.path.join(out_dir, "X_indices.npy"), X.indices.astype(index_dtype))
+    np.save(os.path.join(out_dir, "X_indptr.npy"), X.indptr.astype(index_dtype))
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "shape": list(X.shape),
+        "nnz": int(X.nnz),
+        "X": {"data": "X_data.npy", "indices": "X_indices.npy", "indptr": "X_indptr.npy", "layout": "csc"},
+        "roms": _save_strings(out_dir, "roms", [str(r) for r in bundle["roms"]]),
+        "comp2j": _save_mapping(out_dir, "comp2j", bundle["comp2j"], strings_values=False),
+        "rom_lbl": _save_mapping(out_dir, "rom_lbl", bundle.get("rom_lbl", {}), strings_values=True),
+        "comp_lbl": _save_mapping(out_dir, "comp_lbl", bundle.get("comp_lbl", {}), strings_values=True),
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# ---------------------------
+# Chargement
+# ---------------------------
+
+def load_bundle_mmap(resolve) -> dict:
+    """
+    Charge un bundle au format mmap. `resolve(nom_de_fichier)` retourne le chemin local du fichier
+    (répertoire local ou cache des artefacts S3). Retourne un dict aux mêmes clés que le bundle joblib.
+    """
+    with open(resolve(MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != BUNDLE_FORMAT or manifest.get("version", 0) > BUNDLE_VERSION:
+        raise ValueError(f"Bundle non supporté: {manifest.get('format')} v{manifest.get('version')}")
+
+    def array(name):
+        return np.load(resolve(name), mmap_mode="r")
+
+    def strings(entry):
+        return StringTable(array(entry["offsets"]), array(entry["blob"]))
+
+    def mapping(entry):
+        values = entry["values"]
+        return StringDict(strings(entry["keys"]), strings(values) if isinstance(values, dict) else array(values))
+
+    files = manifest["X"]
+    X = csc_matrix((array(files["data"]), array(files["indices"]), array(files["indptr"])), shape=tuple(manifest["shape"]))
+    return {
+        "X": X,
+        "roms": strings(manifest["roms"]),
+        "comp2j": mapping(manifest["comp2j"]),
+        "rom_lbl": mapping(manifest["rom_lbl"]),
+        "comp_lbl": mapping(manifest["comp_lbl"]),
+    }
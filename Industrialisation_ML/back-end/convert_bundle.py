@@ -0,0 +1,47 @@
+"""
+Conversion de metiers_comp.joblib vers le format mmap (bundle.py)
+------------------------------------------------------------------
+
+Pour convertir le bundle :
+    python convert_bundle.py metiers_comp.joblib metiers_comp_v1
+
+Déposer ensuite le contenu du répertoire produit dans le bucket S3 (ex: ML/metiers_comp_v1/)
+et définir ML_BUNDLE_KEY=metiers_comp_v1.
+"""
+
+import argparse
+import os
+
+import joblib
+import numpy as np
+
+from bundle import convert_bundle, load_bundle_mmap
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertit le bundle joblib du modèle ML au format mmap")
+    parser.add_argument("joblib_path", help="Chemin du bundle joblib (ex: metiers_comp.joblib)")
+    parser.add_argument("out_dir", help="Répertoire de sortie (ex: metiers_comp_v1)")
+    args = parser.parse_args()
+
+    bundle = joblib.load(args.joblib_path)
+    manifest = convert_bundle(bundle, args.out_dir)
+
+    # Vérification : le bundle relu doit correspondre à l'original (X en float32)
+    loaded = load_bundle_mmap(lambda name: os.path.join(args.out_dir, name))
+    if abs(loaded["X"] - bundle["X"]).max() > 1e-6:
+        raise SystemExit("X diffère après conversion")
+    if list(loaded["roms"]) != [str(r) for r in bundle["roms"]]:
+        raise SystemExit("roms diffère après conversion")
+    for name in ("comp2j", "rom_lbl", "comp_lbl"):
+        original = {str(k).strip(): v for k, v in bundle.get(name, {}).items()}
+        if dict(loaded[name].items()) != (original if name == "comp2j" else {k: str(v) for k, v in original.items()}):
+            raise SystemExit(f"{name} diffère après conversion")
+
+    size = sum(os.path.getsize(os.path.join(args.out_dir, f)) for f in os.listdir(args.out_dir))
+    print(f"Bundle converti: {args.out_dir} (X {tuple(manifest['shape'])}, nnz={manifest['nnz']}, {size / 1e6:.1f} Mo, "
+          f"dtype {np.dtype(loaded['X'].dtype).name})")
+
+
+if __name__ == "__main__":
+    main()
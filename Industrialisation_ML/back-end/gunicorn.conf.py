@@ -0,0 +1,31 @@
+# gunicorn.conf.py
+"""
+Lancement multi-workers : gunicorn -c gunicorn.conf.py main:app
+
+WEB_CONCURRENCY workers uvicorn (1 par défaut). Par défaut, chaque worker ouvre le port tout de
+suite et charge ses artefacts en arrière-plan : /ready répond 503 pendant le chargement.
+Avec PRELOAD=1, le processus maître charge les artefacts une seule fois (main.preload), puis
+crée les workers par fork : les tableaux, tenseurs et dictionnaires chargés sont partagés en
+copie à l'écriture au lieu d'être dupliqués par worker, mais rien ne répond (pas même /ready)
+tant que le maître charge. À réserver aux plateformes dont la sonde tolère ce délai.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = os.getenv("PRELOAD", "0") == "1"
+
+
+def when_ready(server):
+    # Appelé dans le maître, après l'import de l'application et avant la création des workers
+    if server.cfg.preload_app:
+        import main
+        main.preload()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        import main
+        main.after_fork()
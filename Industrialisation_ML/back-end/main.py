@@ -1,16 +1,23 @@
 # main.py
 import pandas as pd
 import joblib
-from fastapi import FastAPI
+import hashlib, json
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv, find_dotenv
-import os, io, boto3
+import gc, os, boto3, threading, time
 from sqlalchemy import create_engine
 from typing import List
-import numpy as np
-from scipy.sparse import csr_matrix
-from sklearn.preprocessing import normalize
+
+from artifacts import ArtifactCache
+from bundle import StringDict, load_bundle_mmap
+from logs import StructuredLogging, get_logger
+from metrics import Metrics
+from result_cache import ResultCache
+from scoring import ScoringEngine
+from singleflight import SingleFlightLoader
 
 
 
@@ -20,17 +27,30 @@ from sklearn.preprocessing import normalize
 load_dotenv(find_dotenv(".env"), override=True)
 DB_SCHEMA = 'radarmetier'
 
-S3_BUCKET = "ML"
-S3_KEY = "metiers_comp.joblib"
+S3_BUCKET = os.getenv("ML_BUNDLE_BUCKET", "ML")
+# `.joblib` : bundle historique ; sinon préfixe S3 d'un bundle au format mmap (voir bundle.py et convert_bundle.py)
+S3_KEY = os.getenv("ML_BUNDLE_KEY", "metiers_comp.joblib")
 S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
 S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")
 S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
 S3_REGION = os.getenv("S3_REGION")
+# Cache local des artefacts S3 (voir artifacts.py) ; ARTIFACT_OFFLINE=1 démarre sur le cache sans appeler S3
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", os.path.expanduser("~/.cache/radar-metier"))
+ARTIFACT_OFFLINE = os.getenv("ARTIFACT_OFFLINE", "0") == "1"
+
+# Journalisation JSON écrite par un thread dédié, échantillonnée par endpoint (voir logs.py)
+structured_logging = StructuredLogging(
+    "ml-api",
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    sample_rates=os.getenv("LOG_SAMPLE_RATES", ""),
+    queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+)
+logger = get_logger("api")
 
 # ---------------------------
 # Connexion S3 et chargement du modèle
 # ---------------------------
-print("Connexion S3…")
+logger.info("Connexion S3…")
 s3_client = boto3.client(
     service_name="s3",
     region_name=S3_REGION,
@@ -38,10 +58,37 @@ s3_client = boto3.client(
     aws_access_key_id=S3_ACCESS_KEY_ID,
     aws_secret_access_key=S3_SECRET_ACCESS_KEY,
 )
-
-obj = s3_client.get_object(Bucket=S3_BUCKET, Key=S3_KEY)
-file_stream = io.BytesIO(obj["Body"].read())
-bundle = joblib.load(file_stream)
+artifact_cache = ArtifactCache(s3_client, ARTIFACT_CACHE_DIR, offline=ARTIFACT_OFFLINE)
+
+# Histogrammes par étape, versions chargées et RSS, exposés par GET /metrics (voir metrics.py)
+metrics = Metrics()
+
+def fetch_artifact(key: str) -> str:
+    """Chemin local d'un artefact du bucket ML (voir artifacts.py) ; durée mesurée dans l'étape s3_fetch."""
+    with metrics.stage("s3_fetch"):
+        return artifact_cache.fetch(S3_BUCKET, key)
+
+def load_bundle():
+    """Télécharge le bundle du modèle et publie ses artefacts (appelé pendant le démarrage)."""
+    if S3_KEY.endswith(".joblib"):
+        bundle = joblib.load(fetch_artifact(S3_KEY))
+    else:
+        # Fichiers .npy projetés en mémoire depuis le cache local : pages partagées entre workers
+        bundle = load_bundle_mmap(lambda name: fetch_artifact(f"{S3_KEY}/{name}"))
+    publish_bundle(bundle, S3_KEY)
+
+def publish_bundle(bundle: dict, version: str):
+    """Publie les artefacts d'un bundle (joblib ou mmap) et le moteur de scoring construit sur X."""
+    global X, roms, comp2j, rom_lbl, comp_lbl, scoring_engine
+    X       = bundle["X"]
+    roms    = bundle["roms"]
+    comp2j  = bundle["comp2j"] if isinstance(bundle["comp2j"], StringDict) else {str(k): v for k, v in bundle["comp2j"].items()}
+    rom_lbl = bundle.get("rom_lbl", {})
+    comp_lbl= bundle.get("comp_lbl", {})
+    scoring_engine = ScoringEngine(X, pruning_min_roms=PRUNED_SCORING_MIN_ROMS)
+    result_cache.invalidate(f"bundle {version}")
+    metrics.set_version("modele", version)
+    logger.info("Bundle chargé: X %s, %d compétences", X.shape, len(comp2j))
 
 
 # ---------------------------
@@ -51,39 +98,147 @@ bundle = joblib.load(file_stream)
 MIN_SKILLS = 3
 THRESHOLD  = 0.30
 
-X       = bundle["X"]
-roms    = bundle["roms"]
-comp2j  = {str(k): v for k, v in bundle["comp2j"].items()}
-rom_lbl = bundle.get("rom_lbl", {})
-comp_lbl= bundle.get("comp_lbl", {})
+# Après un échec du chargement des compétences, délai (s) avant une nouvelle tentative à la demande, doublé à chaque échec
+COMPETENCE_RETRY_BACKOFF = float(os.getenv("COMPETENCE_RETRY_BACKOFF", "5"))
+COMPETENCE_RETRY_MAX_BACKOFF = float(os.getenv("COMPETENCE_RETRY_MAX_BACKOFF", "300"))
+# Durée (s) pendant laquelle le navigateur peut réutiliser une liste statique sans revalidation
+STATIC_CACHE_MAX_AGE = int(os.getenv("STATIC_CACHE_MAX_AGE", "60"))
+
+# Remplis par load_bundle()
+X       = None
+roms    = []
+comp2j  = {}
+rom_lbl = {}
+comp_lbl= {}
+scoring_engine = None
+
+# Nombre maximal de profils notés dans un même produit par /predict_batch
+PREDICT_BATCH_CHUNK = int(os.getenv("PREDICT_BATCH_CHUNK", "1024"))
+# Taille de X (nombre de ROME) à partir de laquelle /predict passe par l'index inversé élagué :
+# en deçà, le produit creux d'une requête isolée est plus rapide (benchmarks/bench_ml_scoring.py)
+PRUNED_SCORING_MIN_ROMS = int(os.getenv("PRUNED_SCORING_MIN_ROMS", "100000"))
+
+# Cache des résultats de /predict par ensemble canonique de compétences reconnues (voir result_cache.py) :
+# nombre d'entrées (0 = désactivé) et durée de vie (s, 0 = jusqu'au prochain rechargement)
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "4096"))
+PREDICT_CACHE_TTL = float(os.getenv("PREDICT_CACHE_TTL", "0"))
+result_cache = ResultCache(max_size=PREDICT_CACHE_SIZE, ttl_seconds=PREDICT_CACHE_TTL)
 
 # ---------------------------
 # Connexion DB
 # ---------------------------
-def df_from_query(query: str) -> pd.DataFrame:
+# Pool de connexions partagé par tous les appels à la DB du processus. Réglages adaptés au
+# pooler Supabase en mode transaction (port 6543) : peu de connexions, vérifiées avant usage
+# et renouvelées avant que le pooler ne les ferme.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+
+db_engine = None
+db_engine_lock = threading.Lock()
+
+def db_url() -> str:
     url = f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}"
     if os.getenv('DB_PORT'):
         url += f":{os.getenv('DB_PORT')}"
     if os.getenv("DB_NAME"):
         url += f"/{os.getenv('DB_NAME')}"
+    return url
+
+def get_engine():
+    """Retourne le moteur SQLAlchemy du processus, créé au premier appel."""
+    global db_engine
+    if db_engine is None:
+        with db_engine_lock:
+            if db_engine is None:
+                db_engine = create_engine(
+                    db_url(),
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=True,
+                )
+    return db_engine
+
+def db_pool_stats() -> dict:
+    if db_engine is None:
+        return {"status": "not_created"}
+    pool = db_engine.pool
+    return {
+        "status": "created",
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+    }
 
+def df_from_query(query: str) -> pd.DataFrame:
     try:
-        engine = create_engine(url)
-        with engine.connect() as conn, conn.begin():
+        with metrics.stage("db_query"), get_engine().connect() as conn, conn.begin():
             df = pd.read_sql_query(query, con=conn)
-            print(f"Data read from DB: {df.shape}")
+            logger.info("Data read from DB: %s", df.shape)
             return df
     except Exception as e:
-        print(f"Erreur SQL: {e}")
+        logger.error("Erreur SQL: %s", e)
         return pd.DataFrame()
 
 # ---------------------------
 # Chargement df_competence
 # ---------------------------
-df_competence = pd.DataFrame()
+def build_competence_index(df: pd.DataFrame) -> dict:
+    """Arborescence domaine -> macro -> compétences en listes triées, prêtes à sérialiser, publiées avec df_competence ("df")."""
+    index = {"df": df, "domaines": [], "macros_by_domaine": {}, "competences_by_macro": {}}
+    if df.empty:
+        index["responses"] = serialize_static_responses(index)
+        return index
+
+    index["domaines"] = sorted(df["domaine_competence"].unique())
+    index["macros_by_domaine"] = {
+        domaine: sorted(macros.unique())
+        for domaine, macros in df.groupby("domaine_competence")["libelle_macro_competence"]
+    }
+
+    df_comp = (
+        df[['libelle_macro_competence', 'code_ogr_competence', 'libelle_competence']]
+        .sort_values('libelle_competence', kind="stable")
+        .rename(columns={'code_ogr_competence': 'code', 'libelle_competence': 'libelle'})
+    )
+    index["competences_by_macro"] = {
+        macro: rows[['code', 'libelle']].to_dict(orient='records')
+        for macro, rows in df_comp.groupby("libelle_macro_competence", sort=False)
+    }
+    index["responses"] = serialize_static_responses(index)
+    return index
 
-def load_df_competence():
-    global df_competence
+def serialize_static_responses(index: dict) -> dict:
+    """Sérialise une fois par version des données les listes statiques : {nom: (corps JSON, ETag)}."""
+    payloads = {
+        "get_domaine_competence": {"status": "success", "liste_domaine": index["domaines"]},
+    }
+    responses = {}
+    for name, payload in payloads.items():
+        body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        responses[name] = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+    return responses
+
+def static_response(request: Request, index: dict, name: str) -> Response:
+    """
+    Renvoie une liste pré-sérialisée avec ETag, ou 304 si le client possède déjà cette version.
+    Les navigateurs ne mettent en cache et ne revalident (If-None-Match) que les GET : le front-end appelle ces
+    listes en GET, POST reste accepté pour les anciens clients.
+    """
+    body, etag = index["responses"][name]
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={STATIC_CACHE_MAX_AGE}, must-revalidate"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def load_df_competence() -> dict:
+    """Lit df_competence depuis la DB, le filtre sur le modèle et construit ses index : version publiée par `competences`."""
     query = """
     SELECT arb.code_domaine_competence,
            arb.domaine_competence,
@@ -100,6 +255,8 @@ def load_df_competence():
         ON coh.code_rome = ref.code_rome;
     """
     df = df_from_query(query)
+    if df.empty:
+        raise RuntimeError("df_competence vide")
 
     # Nettoyage : convertir en str, enlever .0 éventuels et espaces
     df['code_ogr_competence'] = (
@@ -111,12 +268,30 @@ def load_df_competence():
     )
 
     # Garder seulement les compétences présentes dans le modèle
-    df_competence = df[df['code_ogr_competence'].isin(comp2j.keys())].drop_duplicates(subset='code_ogr_competence')
+    df = df[df['code_ogr_competence'].isin(list(comp2j))].drop_duplicates(subset='code_ogr_competence')
 
-    print(f"df_competence chargé et filtré: {df_competence.shape}")
-    print("Exemple codes filtrés:", df_competence['code_ogr_competence'].tolist()[:10])
-    
-    return df_competence
+    if df.empty:
+        raise RuntimeError("aucune compétence de la DB n'est connue du modèle")
+
+    with metrics.stage("competence_index"):
+        return build_competence_index(df)
+
+def publish_competences(index: dict):
+    result_cache.invalidate("competences")
+    metrics.set_version("competences", f"{len(index['df'])} lignes, chargées le {time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    logger.info("df_competence chargé et filtré: %s", index["df"].shape)
+    logger.debug("Exemple codes filtrés: %s", index["df"]['code_ogr_competence'].tolist()[:10])
+
+# Un seul chargement à la fois ; df_competence et ses index sont publiés ensemble (voir singleflight.py)
+competences = SingleFlightLoader(
+    load_df_competence,
+    build_competence_index(pd.DataFrame()),
+    name="competences",
+    on_publish=publish_competences,
+    backoff_seconds=COMPETENCE_RETRY_BACKOFF,
+    max_backoff_seconds=COMPETENCE_RETRY_MAX_BACKOFF,
+)
 
 
 # ---------------------------
@@ -137,11 +312,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Durée et code de retour de chaque requête, par route (gabarit de chemin, pas l'URL brute)."""
+    request.state.received = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", "<inconnue>")
+        metrics.observe_request(request.method, route, status_code, time.perf_counter() - request.state.received)
+
+
 
+# Démarrage non bloquant : le port s'ouvre tout de suite, le bundle et les compétences sont
+# chargés en arrière-plan. /ready indique l'avancement de chaque phase et sa durée.
+WARMUP_RETRY_AFTER = os.getenv("WARMUP_RETRY_AFTER", "5")
+warmup_status = {"status": "starting", "phases": {}}
+
+def run_warmup_phase(name: str, fn):
+    phase = warmup_status["phases"][name] = {"status": "running"}
+    start = time.perf_counter()
+    try:
+        fn()
+        phase["status"] = "done"
+    except Exception as e:
+        phase.update(status="error", error=str(e))
+        raise
+    finally:
+        phase["seconds"] = round(time.perf_counter() - start, 3)
+        logger.info("[WARMUP] %s: %s (%s s)", name, phase["status"], phase["seconds"])
+
+def warmup():
+    try:
+        run_warmup_phase("modele", load_bundle)
+        warmup_status["status"] = "ready"
+        # Un échec DB est rapporté dans /ready ; les endpoints rechargent les compétences à la demande.
+        run_warmup_phase("competences", competences.refresh)
+    except Exception as e:
+        if warmup_status["status"] != "ready":
+            warmup_status["status"] = "error"
+        logger.error("[WARMUP] échec: %s", e)
+
+def require_ready():
+    """Dépendance des endpoints liés au modèle : 503 + Retry-After tant que le bundle n'est pas chargé."""
+    if warmup_status["status"] != "ready":
+        raise HTTPException(
+            status_code=503,
+            detail=f"Chargement en cours ({warmup_status['status']})",
+            headers={"Retry-After": WARMUP_RETRY_AFTER},
+        )
 
 @app.on_event("startup")
 def startup_event():
-    load_df_competence()
+    # Artefacts déjà chargés par le processus maître (préchargement, voir gunicorn.conf.py)
+    if warmup_status["status"] == "ready":
+        return
+    threading.Thread(target=warmup, name="warmup", daemon=True).start()
+
+def preload():
+    """Chargement dans le processus maître gunicorn, avant la création des workers."""
+    warmup()
+    # Les objets chargés sortent du suivi du ramasse-miettes : ses passages dans les workers
+    # n'écrivent plus dans leurs en-têtes, les pages restent partagées entre processus
+    gc.freeze()
+
+def after_fork():
+    """Dans chaque worker préchargé : les connexions DB ouvertes par le maître sont abandonnées sans être fermées."""
+    if db_engine is not None:
+        db_engine.dispose(close=False)
 
 # ---------------------------
 # Pydantic Models
@@ -154,76 +395,50 @@ class Competence(BaseModel):
 class SkillsRequest(BaseModel):
     skills: List[str]
 
+class BatchSkillsRequest(BaseModel):
+    profiles: List[SkillsRequest]
+
 # ---------------------------
 # Endpoints
 # ---------------------------
-@app.get("/init")
+@app.get("/init", dependencies=[Depends(require_ready)])
 def init_data():
-    load_df_competence()
-    if df_competence.empty:
-        return {"status": "error", "message": "DataFrame vide"}
-    return {"status": "ready", "message": f"{df_competence.shape[0]} lignes chargées"}
-
-@app.post("/get_domaine_competence")
-def get_domaine_competence():
-    if df_competence.empty:
-        load_df_competence()
-    return {"status": "success", "liste_domaine": sorted(df_competence["domaine_competence"].unique())}
-
-@app.post("/get_macro_competence")
-def get_macro_competence(competence: Competence):
-    if df_competence.empty:
-        load_df_competence()
-    df_macro = df_competence[df_competence["domaine_competence"] == competence.domaine_competence]
-    return {"status": "success", "liste_macro_competence": sorted(df_macro["libelle_macro_competence"].unique())}
+    try:
+        index = competences.refresh()
+    except Exception as e:
+        return {"status": "error", "message": f"Chargement impossible : {e}"}
+    return {"status": "ready", "message": f"{index['df'].shape[0]} lignes chargées"}
 
-@app.post("/get_competence")
-def get_competence(competence: Competence):
-    # 1. Filtrer par macro-compétence
-    df_comp = df_competence.loc[
-        df_competence['libelle_macro_competence'] == competence.macro_competence,
-        ['libelle_competence', 'code_ogr_competence']
-    ].copy()
-
-    # 2. Nettoyer les codes pour correspondre au modèle
-    df_comp['code_ogr_competence'] = (
-        df_comp['code_ogr_competence']
-        .astype(str)
-        .str.replace('.0', '', regex=False)
-        .str.strip()
-    )
+@app.get("/competences_stats")
+def competences_stats():
+    return competences.stats()
 
-    # 3. Garder uniquement celles présentes dans le modèle ML
-    df_comp = df_comp[df_comp['code_ogr_competence'].isin(comp2j.keys())]
+@app.get("/db_pool_stats")
+def get_db_pool_stats():
+    return db_pool_stats()
 
-    # 4. Supprimer les doublons et trier
-    df_comp = df_comp.drop_duplicates(subset='code_ogr_competence').sort_values('libelle_competence')
+@app.api_route("/get_domaine_competence", methods=["GET", "POST"], dependencies=[Depends(require_ready)])
+def get_domaine_competence(request: Request):
+    return static_response(request, competences.get(), "get_domaine_competence")
 
-    # 5. Transformer pour le front
-    liste_competences = [
-        {"code": row['code_ogr_competence'], "libelle": row['libelle_competence']}
-        for _, row in df_comp.iterrows()
-    ]
+@app.post("/get_macro_competence", dependencies=[Depends(require_ready)])
+def get_macro_competence(competence: Competence):
+    return {"status": "success", "liste_macro_competence": competences.get()["macros_by_domaine"].get(competence.domaine_competence, [])}
 
-    print(f"[GET_COMPETENCE] Macro: {competence.macro_competence} -> {len(liste_competences)} compétences valides")
+@app.post("/get_competence", dependencies=[Depends(require_ready)])
+def get_competence(competence: Competence):
+    # Compétences de la macro-compétence, déjà nettoyées, filtrées sur le modèle, dédoublonnées et triées au chargement
+    liste_competences = competences.value["competences_by_macro"].get(competence.macro_competence, [])
+
+    structured_logging.log_request("get_competence", "compétences valides", macro_competence=competence.macro_competence,
+                                   competences=len(liste_competences))
     return {"liste_competence": liste_competences}
 
 
 # ---------------------------
 # Endpoint /predict
 # ---------------------------
-def infer_simple_api(codes_comp, topk=3):
-    codes_comp = [str(c).strip() for c in codes_comp]
-    if len(codes_comp) < MIN_SKILLS:
-        return {"status":"needs_more_skills","min_required":MIN_SKILLS,"topk":[]}
-    cols = [comp2j[c] for c in codes_comp if c in comp2j]
-    if not cols:
-        return {"status":"no_known_skills","topk":[]}
-    q = csr_matrix((np.ones(len(cols)), ([0]*len(cols), cols)), shape=(1, X.shape[1]))
-    q = normalize(q, norm="l2", axis=1)
-    s = (q @ X.T).toarray().ravel()
-    order = np.argsort(-s)[:topk]
-    preds = [(roms[i], float(s[i])) for i in order]
+def format_prediction(preds):
     top1 = preds[0]
     return {
         "status":"ok" if top1[1] >= THRESHOLD else "indecis",
@@ -232,12 +447,74 @@ def infer_simple_api(codes_comp, topk=3):
         "topk":[{"code":code,"label":rom_lbl.get(code,code),"score":score} for code,score in preds]
     }
 
-@app.post("/predict")
-def predict(req: SkillsRequest):
-    input_skills = [{"code": c, "label": comp_lbl.get(str(c).strip(), str(c).strip())} for c in req.skills]
-    result = infer_simple_api(req.skills, topk=3)
-    result["input_skills"] = input_skills
-    return result
+def recognized_codes(codes_comp) -> tuple:
+    """Codes reconnus par le modèle, triés et sans doublon : ensemble canonique noté et clé du cache de résultats."""
+    return tuple(sorted({c for c in (str(c).strip() for c in codes_comp) if c in comp2j}))
+
+def score_recognized(batch_known, topk=3):
+    """Note des ensembles canoniques non vides en un seul produit creux (voir scoring.py)."""
+    with metrics.stage("vocab_lookup"):
+        batch_cols = [[comp2j[c] for c in known] for known in batch_known]
+    # Produit creux et top-k (ou parcours de l'index inversé pour une requête isolée)
+    with metrics.stage("scoring"):
+        best_idx, best_scores = scoring_engine.topk(batch_cols, topk)
+    with metrics.stage("format"):
+        return [format_prediction([(roms[i], score) for i, score in zip(idx, scores)])
+                for idx, scores in zip(best_idx.tolist(), best_scores.tolist())]
+
+def infer_batch_api(batch_codes, topk=3):
+    """Prédit un lot de profils : les profils valides sont notés en un seul produit creux."""
+    results = [None] * len(batch_codes)
+    rows, batch_known = [], []
+    for row, codes_comp in enumerate(batch_codes):
+        if len(codes_comp) < MIN_SKILLS:
+            results[row] = {"status":"needs_more_skills","min_required":MIN_SKILLS,"topk":[]}
+            continue
+        known = recognized_codes(codes_comp)
+        if not known:
+            results[row] = {"status":"no_known_skills","topk":[]}
+            continue
+        rows.append(row)
+        batch_known.append(known)
+
+    if batch_known:
+        for row, result in zip(rows, score_recognized(batch_known, topk)):
+            results[row] = result
+    return results
+
+def infer_simple_api(codes_comp, topk=3):
+    """Prédit un profil ; un ensemble de compétences déjà noté est servi depuis le cache de résultats."""
+    with metrics.stage("vocab_lookup"):
+        known = recognized_codes(codes_comp)
+    if len(codes_comp) < MIN_SKILLS or not known:
+        return infer_batch_api([codes_comp], topk=topk)[0]
+    return result_cache.get_or_compute((known, topk), lambda: score_recognized([known], topk)[0])
+
+def input_skills_labels(skills):
+    return [{"code": c, "label": comp_lbl.get(str(c).strip(), str(c).strip())} for c in skills]
+
+@app.post("/predict", dependencies=[Depends(require_ready)])
+def predict(req: SkillsRequest, request: Request):
+    # Lecture du corps, validation pydantic et dépendances, depuis la réception de la requête
+    metrics.observe("validation", time.perf_counter() - request.state.received)
+    input_skills = input_skills_labels(req.skills)
+    # Copie : le résultat peut être partagé avec le cache
+    result = {**infer_simple_api(req.skills, topk=3), "input_skills": input_skills}
+    with metrics.stage("serialization"):
+        return JSONResponse(result)
+
+@app.post("/predict_batch", dependencies=[Depends(require_ready)])
+def predict_batch(req: BatchSkillsRequest, request: Request):
+    """Prédit les métiers d'une cohorte de profils, par lots de PREDICT_BATCH_CHUNK."""
+    metrics.observe("validation", time.perf_counter() - request.state.received)
+    batch_codes = [profile.skills for profile in req.profiles]
+    results = []
+    for start in range(0, len(batch_codes), PREDICT_BATCH_CHUNK):
+        results += infer_batch_api(batch_codes[start:start + PREDICT_BATCH_CHUNK], topk=3)
+    for profile, result in zip(req.profiles, results):
+        result["input_skills"] = input_skills_labels(profile.skills)
+    with metrics.stage("serialization"):
+        return JSONResponse({"results": results})
 
 # ---------------------------
 # Root
@@ -246,6 +523,27 @@ def predict(req: SkillsRequest):
 def read_root():
     return {"message": "API opérationnelle"}
 
+@app.get("/predict_cache_stats")
+def predict_cache_stats():
+    return result_cache.stats()
+
+@app.get("/logging_stats")
+def logging_stats():
+    return structured_logging.stats()
+
+@app.get("/metrics")
+def get_metrics():
+    """Métriques au format texte Prometheus (voir metrics.py)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+def ready():
+    status_code = 200 if warmup_status["status"] == "ready" else 503
+    headers = {} if status_code == 200 else {"Retry-After": WARMUP_RETRY_AFTER}
+    phases = {name: dict(phase) for name, phase in list(warmup_status["phases"].items())}
+    return JSONResponse({"status": warmup_status["status"], "phases": phases, "pid": os.getpid()},
+                        status_code=status_code, headers=headers)
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))  # Render fournira automatiquement PORT
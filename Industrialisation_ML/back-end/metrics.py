@@ -0,0 +1,134 @@
+# metrics.py
+"""
+Instrumentation légère des API, exposée au format texte Prometheus (GET /metrics).
+
+    radar_metier_stage_seconds{stage}                  histogramme de durée de chaque étape
+                                                       (validation, encode_profile, db_query, s3_fetch...)
+    radar_metier_request_seconds{method,path}          histogramme de durée des requêtes HTTP, par route
+    radar_metier_requests_total{method,path,status}    nombre de requêtes par code de retour
+    radar_metier_version_info{component,version}       version chargée du modèle et des données (valeur 1)
+    process_resident_memory_bytes                      mémoire résidente (RSS) du processus
+
+Les mesures sont propres à chaque processus (un /metrics par worker uvicorn).
+"""
+
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # valeurs des labels -> [compte par bucket..., somme, nombre]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labelvalues, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {values[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {values[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in sorted(values.items())]
+        return lines
+
+
+def resident_memory_bytes() -> int:
+    """RSS courant (Linux : /proc/self/statm), à défaut le pic de RSS du processus."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Metrics:
+    def __init__(self, prefix: str = "radar_metier"):
+        self.stages = Histogram(f"{prefix}_stage_seconds", "Durée de chaque étape de traitement (s)", ("stage",))
+        self.requests = Histogram(f"{prefix}_request_seconds", "Durée des requêtes HTTP (s)", ("method", "path"))
+        self.responses = Counter(f"{prefix}_requests_total", "Nombre de requêtes HTTP", ("method", "path", "status"))
+        self.version_name = f"{prefix}_version_info"
+        self.versions = {}  # composant -> version chargée
+
+    def observe(self, stage: str, seconds: float):
+        self.stages.observe(seconds, stage)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Mesure la durée du bloc : `with metrics.stage("encode_profile"): ...`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.observe(time.perf_counter() - start, name)
+
+    def observe_request(self, method: str, path: str, status: int, seconds: float):
+        self.requests.observe(seconds, method, path)
+        self.responses.inc(method, path, str(status))
+
+    def set_version(self, component: str, version: str):
+        self.versions[component] = version
+
+    def render(self) -> str:
+        lines = self.stages.render() + self.requests.render() + self.responses.render()
+        lines += [f"# HELP {self.version_name} Version chargée du modèle et des données",
+                  f"# TYPE {self.version_name} gauge"]
+        lines += [f"{self.version_name}{_labels(('component', 'version'), item)} 1"
+                  for item in sorted(self.versions.items())]
+        lines += ["# HELP process_resident_memory_bytes Mémoire résidente du processus (octets)",
+                  "# TYPE process_resident_memory_bytes gauge",
+                  f"process_resident_memory_bytes {resident_memory_bytes()}"]
+        return "\n".join(lines) + "\n"
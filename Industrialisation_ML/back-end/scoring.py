@@ -0,0 +1,141 @@
+# scoring.py
+"""
+Moteur de scoring cosinus du modèle ML.
+
+X (ROME x compétences, lignes normalisées L2) est conservé transposé en CSR
+(compétences x ROME) : le produit d'une requête creuse par XT ne parcourt que
+les lignes des compétences de la requête. Les profils d'un lot sont empilés dans
+une seule matrice de requêtes et notés en un seul produit ; le top-k est extrait
+avec np.argpartition au lieu d'un tri complet.
+
+XT est aussi l'index inversé du modèle : la ligne d'une compétence est la liste
+(posting list) des ROME qui la contiennent, avec leur poids. Pour une requête
+isolée sur un grand X, topk_pruned n'accumule que ces postings, en élaguant à la
+manière de MaxScore les ROME qui ne peuvent plus entrer dans le top-k ; le
+résultat reste exact.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class ScoringEngine:
+    def __init__(self, X, pruning_min_roms: int = 0):
+        self.n_roms, self.n_skills = X.shape
+        # X en CSC (bundle mmap) : X.T est déjà un CSR qui partage ses tableaux, sans copie
+        self.XT = X.T if X.format == "csc" else csr_matrix(X.T)
+        if not self.XT.has_sorted_indices:
+            self.XT = self.XT.sorted_indices()
+        # Index inversé : borne supérieure du poids de chaque compétence (posting list)
+        self.max_weight = self.XT.max(axis=1).toarray().ravel()
+        # Requêtes isolées par l'index inversé à partir de pruning_min_roms ROME.
+        # L'élagage suppose des poids positifs (cosinus sur X >= 0).
+        self.pruning = self.n_roms >= pruning_min_roms and (self.XT.nnz == 0 or self.XT.data.min() >= 0)
+
+    def query_matrix(self, batch_cols) -> csr_matrix:
+        """Une ligne par profil (indices de colonnes de X), normalisée L2 comme dans infer_simple_api."""
+        # Mêmes types d'index et de valeurs que XT (float32 dans le bundle mmap) : scipy n'a pas à
+        # convertir (copier) les index ou les valeurs de XT à chaque produit
+        index_dtype = self.XT.indices.dtype
+        indptr = np.zeros(len(batch_cols) + 1, dtype=index_dtype)
+        indptr[1:] = np.cumsum([len(cols) for cols in batch_cols])
+        indices = np.fromiter((c for cols in batch_cols for c in cols), dtype=index_dtype, count=indptr[-1])
+        q = csr_matrix((np.ones(len(indices), dtype=self.XT.dtype), indices, indptr), shape=(len(batch_cols), self.n_skills))
+        q.sum_duplicates()
+        # Normalisation L2 en float64 puis poids ramenés au type de XT : même calcul que query_weights
+        counts = q.data.astype(np.float64)
+        rows = np.repeat(np.arange(q.shape[0]), np.diff(q.indptr))
+        norms = np.sqrt(np.bincount(rows, weights=counts ** 2, minlength=q.shape[0]))
+        q.data = (counts / norms[rows]).astype(self.XT.dtype)
+        return q
+
+    def query_weights(self, cols) -> tuple:
+        """Compétences distinctes d'une requête (croissantes) et leurs poids normalisés L2, identiques à query_matrix."""
+        terms, counts = np.unique(np.asarray(cols, dtype=np.int64), return_counts=True)
+        counts = counts.astype(np.float64)
+        return terms, (counts / np.sqrt((counts ** 2).sum())).astype(self.XT.dtype)
+
+    def scores(self, batch_cols) -> np.ndarray:
+        """Scores cosinus (lot x ROME) en un seul produit creux."""
+        return (self.query_matrix(batch_cols) @ self.XT).toarray()
+
+    def topk(self, batch_cols, k: int):
+        """Indices et scores des k meilleurs ROME de chaque profil, triés par score décroissant."""
+        if self.pruning and len(batch_cols) == 1:
+            idx, scores = self.topk_pruned(batch_cols[0], k)
+            return idx[np.newaxis, :], scores[np.newaxis, :]
+        s = self.scores(batch_cols)
+        k = min(k, self.n_roms)
+        if k < self.n_roms:
+            idx = np.argpartition(-s, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.tile(np.arange(self.n_roms), (s.shape[0], 1))
+        top = np.take_along_axis(s, idx, axis=1)
+        order = np.argsort(-top, axis=1, kind="stable")
+        return np.take_along_axis(idx, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def topk_pruned(self, cols, k: int):
+        """
+        Top-k exact d'une requête en parcourant l'index inversé (MaxScore).
+
+        Les compétences sont traitées par borne supérieure décroissante. Dès que la somme des
+        bornes restantes ne dépasse plus le k-ième meilleur score partiel, aucun ROME non encore
+        vu ne peut entrer dans le top-k : les postings restants ne servent plus qu'à compléter
+        le score des candidats déjà vus. Les scores renvoyés sont ensuite recalculés par exact_scores,
+        à l'identique de topk sur un lot.
+        """
+        k = min(k, self.n_roms)
+        terms, q_weights = self.query_weights(cols)
+        bounds = q_weights.astype(np.float64) * self.max_weight[terms]
+        order = np.argsort(-bounds, kind="stable")
+        remaining = np.cumsum(bounds[order][::-1])[::-1]  # somme des bornes des termes restants
+
+        cand_idx = np.empty(0, dtype=self.XT.indices.dtype)
+        cand_scores = np.empty(0, dtype=np.float64)
+        theta = 0.0
+        for t, term_pos in enumerate(order):
+            term = terms[term_pos]
+            start, end = self.XT.indptr[term], self.XT.indptr[term + 1]
+            idx = self.XT.indices[start:end]
+            weights = self.XT.data[start:end].astype(np.float64) * q_weights[term_pos]
+
+            if len(cand_idx) >= k and remaining[t] <= theta:
+                # Terme non essentiel : mise à jour des seuls candidats présents dans la posting list
+                pos = np.searchsorted(idx, cand_idx)
+                hit = pos < len(idx)
+                hit[hit] = idx[pos[hit]] == cand_idx[hit]
+                cand_scores[hit] += weights[pos[hit]]
+            else:
+                merged, inverse = np.unique(np.concatenate([cand_idx, idx]), return_inverse=True)
+                cand_scores = np.bincount(inverse, weights=np.concatenate([cand_scores, weights]), minlength=len(merged))
+                cand_idx = merged
+            if len(cand_idx) >= k:
+                theta = np.partition(cand_scores, len(cand_scores) - k)[len(cand_scores) - k]
+
+        if len(cand_idx) < k:
+            # Moins de k ROME partagent une compétence : on complète avec des ROME de score nul
+            others = np.setdiff1d(np.arange(self.n_roms), cand_idx, assume_unique=True)[:k - len(cand_idx)]
+            cand_idx = np.concatenate([cand_idx, others])
+            cand_scores = np.concatenate([cand_scores, np.zeros(len(others))])
+
+        top = np.argpartition(-cand_scores, k - 1)[:k] if k < len(cand_scores) else np.arange(len(cand_scores))
+        idx = cand_idx[top]
+        scores = self.exact_scores(terms, q_weights, idx)
+        order = np.argsort(-scores, kind="stable")
+        return idx[order].astype(np.int64), scores[order]
+
+    def exact_scores(self, terms, q_weights, idx) -> np.ndarray:
+        """
+        Scores d'une requête pour quelques ROME, calculés comme par le produit creux de scores() : mêmes
+        poids (type de XT) accumulés dans le même ordre (compétences croissantes), si bien qu'une requête
+        isolée et la même requête dans un lot reçoivent exactement les mêmes scores.
+        """
+        scores = np.zeros(len(idx), dtype=self.XT.dtype)
+        for term, weight in zip(terms, q_weights):
+            start, end = self.XT.indptr[term], self.XT.indptr[term + 1]
+            postings = self.XT.indices[start:end]
+            pos = np.searchsorted(postings, idx)
+            hit = pos < len(postings)
+            hit[hit] = postings[pos[hit]] == idx[hit]
+            scores[hit] += weight * self.XT.data[start:end][pos[hit]]
+        return scores
@@ -0,0 +1,127 @@
+# singleflight.py
+"""
+Chargement coordonné d'un jeu de données partagé par les endpoints (une seule version publiée à la fois).
+
+    loader = SingleFlightLoader(charger, vide, on_publish=...)
+    loader.value        version publiée, sans chargement
+    loader.get()        version publiée ; charge la première si aucune ne l'est encore
+    loader.refresh()    charge une nouvelle version (/init, démarrage) ; lève l'erreur du chargement
+
+Un seul chargement est en cours par processus : les appels concurrents attendent sa fin et
+reçoivent la même version au lieu de lancer chacun la même requête. `charger()` construit la
+version complète (données et index dérivés) ; elle est publiée en une seule affectation, un
+endpoint voit donc l'ancienne ou la nouvelle version, jamais un mélange. En cas d'échec
+(exception), la version précédente est conservée et les chargements implicites de `get()` sont
+suspendus pendant un délai qui double à chaque échec consécutif (backoff_seconds, plafonné à
+max_backoff_seconds) ; `refresh()` n'attend pas la fin de ce délai.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger("radar_metier.singleflight")
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class SingleFlightLoader:
+    def __init__(self, load, empty, name: str = "données", on_publish=None, backoff_seconds: float = 5.0,
+                 max_backoff_seconds: float = 300.0):
+        self.load = load
+        self.value = empty
+        self.name = name
+        self.on_publish = on_publish
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._flight = None
+
+        self.loads = 0
+        self.joined = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.skipped_backoff = 0
+        self.retry_at = 0.0
+        self.last_error = None
+        self.last_load_seconds = None
+
+    def get(self):
+        """Version publiée ; la première est chargée à la demande, sauf pendant le délai qui suit un échec."""
+        if self.loaded:
+            return self.value
+        return self._run(force=False)
+
+    def refresh(self):
+        """Charge et publie une nouvelle version (ou attend celle en cours) ; retourne la version publiée ou lève son erreur."""
+        return self._run(force=True)
+
+    def _run(self, force: bool):
+        with self._lock:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                if not force and time.monotonic() < self.retry_at:
+                    self.skipped_backoff += 1
+                    return self.value
+                flight = self._flight = Flight()
+            else:
+                self.joined += 1
+
+        if not leader:
+            flight.done.wait()
+            if force and flight.error is not None:
+                raise flight.error
+            return self.value
+
+        start = time.perf_counter()
+        try:
+            value = self.load()
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                self.consecutive_failures += 1
+                delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (self.consecutive_failures - 1))
+                self.retry_at = time.monotonic() + delay
+                self.last_error = str(e)
+                self._flight = None
+            flight.error = e
+            logger.error("Chargement %s en échec (%s consécutif(s)), prochain essai implicite dans %s s: %s",
+                         self.name, self.consecutive_failures, delay, e)
+            if force:
+                raise
+        else:
+            # Publication en une seule affectation, avant de libérer les appelants en attente
+            self.value = value
+            self.loaded = True
+            with self._lock:
+                self.loads += 1
+                self.consecutive_failures = 0
+                self.retry_at = 0.0
+                self.last_load_seconds = round(time.perf_counter() - start, 3)
+                self._flight = None
+            if self.on_publish is not None:
+                self.on_publish(value)
+        finally:
+            flight.done.set()
+        return self.value
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "in_flight": self._flight is not None,
+            "loads": self.loads,
+            "joined": self.joined,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "skipped_backoff": self.skipped_backoff,
+            "retry_in_seconds": round(max(0.0, self.retry_at - time.monotonic()), 1),
+            "last_error": self.last_error,
+            "last_load_seconds": self.last_load_seconds,
+        }
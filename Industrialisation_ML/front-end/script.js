@@ -60,7 +60,8 @@ function populateCompetences(selectEl, items, defaultText) {
 // ---------------------------
 async function loadDomaines() {
     try {
-        const res = await fetch(`${API_BASE}/get_domaine_competence`, { method: "POST" });
+        // GET : le navigateur met la liste en cache et la revalide (ETag, réponse 304)
+        const res = await fetch(`${API_BASE}/get_domaine_competence`, { method: "GET" });
         const data = await res.json();
         populateSelect(document.getElementById("select_domaineCompetence"), data.liste_domaine || [], "Sélectionnez votre domaine");
     } catch (err) {
@@ -0,0 +1,92 @@
+"""
+Benchmark : matrice des métiers pré-calculée vs ré-encodage à chaque /predict
+------------------------------------------------------------------------------
+
+Compare, sur CPU, la partie "modèle" de predict_hybrid :
+    - ancien chemin : encode_profile + encode_job(torch.arange(n_jobs)) à chaque appel
+    - nouveau chemin : encode_profile + un seul produit matriciel avec job_matrix
+
+Le modèle est un JobProfileTransformer aux poids aléatoires, dimensionné comme le référentiel ROME.
+
+Lancement :
+    python benchmarks/bench_job_matrix.py --n-jobs 1600 --n-skills 5000 --runs 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Industrialisation", "back-end"))
+from model import JobProfileTransformer  # noqa: E402
+
+
+def percentiles(timings):
+    t = np.asarray(timings) * 1000
+    return np.percentile(t, 50), np.percentile(t, 99)
+
+
+def run(fn, profiles, runs, warmup=50):
+    for i in range(warmup):
+        fn(profiles[i % len(profiles)])
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(profiles[i % len(profiles)])
+        timings.append(time.perf_counter() - start)
+    return percentiles(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-jobs", type=int, default=1600)
+    parser.add_argument("--n-skills", type=int, default=5000)
+    parser.add_argument("--profile-len", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    torch.set_num_threads(args.threads)
+    model = JobProfileTransformer(args.n_skills, args.n_jobs).eval()
+
+    rng = np.random.default_rng(0)
+    profiles = []
+    for _ in range(256):
+        ids = rng.choice(np.arange(1, args.n_skills), size=args.profile_len, replace=False)
+        skills = torch.tensor(ids).unsqueeze(0)
+        profiles.append((skills, torch.ones_like(skills, dtype=torch.float)))
+
+    all_jobs = torch.arange(args.n_jobs)
+
+    def before(profile):
+        with torch.no_grad():
+            v_p = model.encode_profile(*profile)
+            v_j = model.encode_job(all_jobs)
+            return (v_p @ v_j.T).squeeze(0)
+
+    with torch.no_grad():
+        job_matrix = model.encode_job(all_jobs).contiguous()
+
+    def after(profile):
+        with torch.no_grad():
+            v_p = model.encode_profile(*profile)
+            return (v_p @ job_matrix.T).squeeze(0)
+
+    assert torch.allclose(before(profiles[0]), after(profiles[0]))
+
+    p50_b, p99_b = run(before, profiles, args.runs)
+    p50_a, p99_a = run(after, profiles, args.runs)
+
+    print(f"n_jobs={args.n_jobs} n_skills={args.n_skills} threads={args.threads} runs={args.runs}")
+    print(f"{'chemin':<22}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    print(f"{'encode_job par appel':<22}{p50_b:>10.3f}{p99_b:>10.3f}")
+    print(f"{'job_matrix en cache':<22}{p50_a:>10.3f}{p99_a:>10.3f}")
+    print(f"gain p50 x{p50_b / p50_a:.2f}, gain p99 x{p99_b / p99_a:.2f}")
+
+
+if __name__ == "__main__":
+    main()
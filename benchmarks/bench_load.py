@@ -0,0 +1,397 @@
+"""
+Test de charge de bout en bout des deux API (DL et ML)
+-------------------------------------------------------
+
+Démarre chaque back-end dans un processus uvicorn, face à :
+    - un S3 local (moto) contenant des artefacts synthétiques cohérents avec le référentiel
+      (CSV des vocabulaires et modèle .pt/.json de l'API DL, bundle metiers_comp.joblib de l'API ML)
+    - une copie SQLite des tables rome_* (ou une base Postgres locale avec --pg-url)
+
+puis envoie un trafic concurrent mélangé sur tous les endpoints (--concurrency clients en boucle
+fermée) et rapporte, par endpoint, le débit et les latences p50/p95/p99. Le résultat est écrit en
+JSON (--output) avec le commit courant pour comparer deux versions (--baseline).
+
+Le référentiel est synthétique (synthetic.py, --scale 1 = taille du ROME actuel) ou copié
+d'une vraie base avec --copy-from (tables rome_* du schéma radarmetier).
+
+Lancement :
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_load.py --duration 30 --concurrency 16 --output load.json
+    python benchmarks/bench_load.py --backends ml --baseline load.json
+
+Attention : les back-ends lisent leur fichier .env (load_dotenv) ; sans .env dans
+Industrialisation*/back-end ni à la racine du dépôt, seule la configuration locale ci-dessus est utilisée.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import boto3
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+
+import synthetic
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_SCHEMA = "radarmetier"
+DL_MODEL_NAME = "modele_bench"
+ML_BUCKET = "ml-bench"  # le S3 local refuse les noms de bucket de moins de 3 caractères ("ML")
+
+
+# ---------------------------
+# Référentiel et base locale
+# ---------------------------
+
+def copy_rome_tables(source_url: str) -> dict:
+    """Lit toutes les tables rome_* du schéma radarmetier d'une base existante."""
+    engine = create_engine(source_url)
+    names = [name for name in inspect(engine).get_table_names(schema=DB_SCHEMA) if name.startswith("rome_")]
+    with engine.connect() as conn:
+        return {name: pd.read_sql_table(name, conn, schema=DB_SCHEMA) for name in names}
+
+
+def write_sqlite(tables: dict, path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for name, df in tables.items():
+            df.to_sql(name, conn, if_exists="replace", index=False)
+    engine.dispose()
+
+
+def write_postgres(tables: dict, url: str):
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {DB_SCHEMA}"))
+        for name, df in tables.items():
+            df.to_sql(name, conn, schema=DB_SCHEMA, if_exists="replace", index=False)
+    engine.dispose()
+
+
+def postgres_env(url: str) -> dict:
+    """Variables DB_* lues par db_url() des back-ends."""
+    url = make_url(url)
+    env = {"DB_USER": url.username or "", "DB_PASSWORD": url.password or "", "DB_HOST": url.host or "localhost",
+           "DB_NAME": url.database or ""}
+    if url.port:
+        env["DB_PORT"] = str(url.port)
+    return env
+
+
+# ---------------------------
+# S3 local
+# ---------------------------
+
+def start_s3(artifacts: dict) -> tuple:
+    """Démarre un S3 moto sur un port libre et y dépose {bucket: {clé: chemin}}."""
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # pas de ligne par requête S3
+    port = free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    endpoint = f"http://127.0.0.1:{port}"
+    s3 = boto3.client("s3", endpoint_url=endpoint, region_name="us-east-1",
+                      aws_access_key_id="bench", aws_secret_access_key="bench")
+    for bucket, objects in artifacts.items():
+        s3.create_bucket(Bucket=bucket)
+        for key, path in objects.items():
+            s3.upload_file(path, bucket, key)
+    return server, endpoint
+
+
+# ---------------------------
+# Back-ends
+# ---------------------------
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(name: str, env: dict, sqlite_path: str | None, work_dir: str, timeout: float):
+    port = free_port()
+    cmd = [sys.executable, os.path.join(BENCH_DIR, "serve_backend.py"), name, "--port", str(port)]
+    if sqlite_path:
+        cmd += ["--sqlite", sqlite_path]
+    log = open(os.path.join(work_dir, f"{name}.log"), "w")
+    # Répertoire de travail neutre : pas de .env local chargé par l'API DL
+    process = subprocess.Popen(cmd, env={**os.environ, **env}, cwd=work_dir, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Le back-end {name} s'est arrêté (voir {log.name})")
+        try:
+            status, body = request("127.0.0.1", port, "GET", "/ready")
+            phases = json.loads(body).get("phases", {})
+            if status == 200 and phases and all(p.get("status") in ("done", "error") for p in phases.values()):
+                return process, port, phases
+        except (OSError, ValueError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Le back-end {name} n'est pas prêt après {timeout} s (voir {log.name})")
+
+
+def request(host, port, method, path, body=None):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        conn.request(method, path, body=None if body is None else json.dumps(body),
+                     headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+# ---------------------------
+# Scénario de trafic
+# ---------------------------
+
+def endpoint_mix(backend: str, tables: dict, profiles: list) -> list:
+    """(nom, poids, méthode, fonction rng -> (chemin, corps)) ; poids proches du parcours d'un utilisateur du front."""
+    arborescence = tables["rome_arborescence_competences"]
+    domaines = sorted(arborescence["domaine_competence"].unique())
+    macros = sorted(arborescence["libelle_macro_competence"].unique())
+    romes = sorted(tables["rome_referentiel_code_rome"]["code_rome"].unique())
+
+    mix = [
+        ("/predict", 40, "POST", lambda rng: ("/predict", {"skills": rng.choice(profiles)})),
+        ("/predict_batch", 2, "POST",
+         lambda rng: ("/predict_batch", {"profiles": [{"skills": rng.choice(profiles)} for _ in range(32)]})),
+        ("/get_domaine_competence", 5, "GET", lambda rng: ("/get_domaine_competence", None)),
+        ("/get_macro_competence", 10, "POST",
+         lambda rng: ("/get_macro_competence", {"domaine_competence": rng.choice(domaines)})),
+        ("/get_competence", 15, "POST", lambda rng: ("/get_competence", {"macro_competence": rng.choice(macros)})),
+        ("/init", 1, "GET", lambda rng: ("/init", None)),
+    ]
+    if backend == "dl":
+        mix += [
+            ("/get_all_competences", 5, "GET", lambda rng: ("/get_all_competences", None)),
+            ("/get_rome_actuel_list", 4, "GET", lambda rng: ("/get_rome_actuel_list", None)),
+            ("/get_rome_cible_list", 4, "GET", lambda rng: ("/get_rome_cible_list", None)),
+            ("/get_competences_by_rome", 8, "POST",
+             lambda rng: (f"/get_competences_by_rome?code_rome={rng.choice(romes)}", None)),
+        ]
+    return mix
+
+
+def run_load(port: int, mix: list, concurrency: int, duration: float, warmup: float, think_ms: float, seed: int):
+    """Clients en boucle fermée ; retourne {endpoint: [(latence s, statut), ...]} hors période d'échauffement."""
+    names = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    start = time.monotonic()
+    measure_from, stop_at = start + warmup, start + warmup + duration
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+
+    def client(index):
+        rng = random.Random(seed + index)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local = {name: [] for name in names}
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            i = rng.choices(range(len(mix)), weights=weights)[0]
+            name, _, method, build = mix[i]
+            path, body = build(rng)
+            payload = None if body is None else json.dumps(body)
+            t0 = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                status = 0
+            elapsed = time.perf_counter() - t0
+            if now >= measure_from:
+                local[name].append((elapsed, status))
+            if think_ms:
+                time.sleep(rng.expovariate(1000 / think_ms))
+        conn.close()
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(samples: dict, duration: float) -> dict:
+    def stats(values):
+        latencies = sorted(v[0] * 1000 for v in values)
+        errors = sum(1 for _, status in values if not 200 <= status < 400)
+        return {
+            "requests": len(values),
+            "errors": errors,
+            "throughput_rps": round(len(values) / duration, 2),
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+                "p50": round(percentile(latencies, 0.50), 3) if latencies else None,
+                "p95": round(percentile(latencies, 0.95), 3) if latencies else None,
+                "p99": round(percentile(latencies, 0.99), 3) if latencies else None,
+                "max": round(latencies[-1], 3) if latencies else None,
+            },
+        }
+
+    endpoints = {name: stats(values) for name, values in samples.items()}
+    return {"endpoints": endpoints, "total": stats([v for values in samples.values() for v in values])}
+
+
+STAGE_LINE = re.compile(r'^radar_metier_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+def stage_breakdown(port: int) -> dict:
+    """Durée moyenne de chaque étape d'après GET /metrics du back-end."""
+    status, body = request("127.0.0.1", port, "GET", "/metrics")
+    if status != 200:
+        return {}
+    totals = {}
+    for line in body.decode("utf-8").splitlines():
+        match = STAGE_LINE.match(line)
+        if match:
+            totals.setdefault(match.group(2), {})[match.group(1)] = float(match.group(3))
+    return {stage: {"count": int(v.get("count", 0)), "mean_ms": round(1000 * v["sum"] / v["count"], 3)}
+            for stage, v in sorted(totals.items()) if v.get("count")}
+
+
+# ---------------------------
+# Rapport
+# ---------------------------
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=BENCH_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def print_report(results: dict, baseline: dict | None):
+    for backend, result in results["backends"].items():
+        print(f"\n[{backend}] {result['total']['requests']} requêtes, {result['total']['throughput_rps']} req/s, "
+              f"{result['total']['errors']} erreurs")
+        print(f"{'endpoint':<28}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err':>6}"
+              + (f"{'p95 vs base':>13}" if baseline else ""))
+        base = (baseline or {}).get("backends", {}).get(backend, {}).get("endpoints", {})
+        for name, stats in sorted(result["endpoints"].items()):
+            latency = stats["latency_ms"]
+            line = (f"{name:<28}{stats['throughput_rps']:>9.1f}{latency['p50'] or 0:>9.2f}{latency['p95'] or 0:>9.2f}"
+                    f"{latency['p99'] or 0:>9.2f}{stats['errors']:>6}")
+            before = base.get(name, {}).get("latency_ms", {}).get("p95")
+            if baseline and before and latency["p95"]:
+                line += f"{100 * (latency['p95'] - before) / before:>+12.1f}%"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=["dl", "ml"], default=["dl", "ml"])
+    parser.add_argument("--duration", type=float, default=30, help="Durée mesurée (s) par back-end")
+    parser.add_argument("--warmup", type=float, default=5, help="Échauffement (s) exclu des mesures")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients simultanés")
+    parser.add_argument("--think-ms", type=float, default=0, help="Temps de réflexion moyen (ms) entre deux requêtes d'un client")
+    parser.add_argument("--scale", type=float, default=1.0, help="Taille du référentiel synthétique (1 = ROME actuel)")
+    parser.add_argument("--n-profiles", type=int, default=2000, help="Profils distincts tirés pour /predict")
+    parser.add_argument("--copy-from", help="URL SQLAlchemy d'une base dont copier les tables rome_*")
+    parser.add_argument("--pg-url", help="Base Postgres locale à utiliser au lieu de SQLite (tables écrites dans radarmetier)")
+    parser.add_argument("--env", action="append", default=[], metavar="CLE=VALEUR",
+                        help="Variable d'environnement passée aux back-ends (ex: PREDICT_CACHE_SIZE=0)")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    parser.add_argument("--baseline", help="Résultats JSON d'une exécution précédente à comparer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_load_") as work_dir:
+        tables = copy_rome_tables(args.copy_from) if args.copy_from else synthetic.scaled_referential(args.scale, seed=args.seed)
+        profiles = synthetic.sample_profiles(tables, args.n_profiles, seed=args.seed)
+
+        sqlite_path, db_env = None, {}
+        if args.pg_url:
+            write_postgres(tables, args.pg_url)
+            db_env = postgres_env(args.pg_url)
+        else:
+            sqlite_path = os.path.join(work_dir, "rome.sqlite")
+            write_sqlite(tables, sqlite_path)
+
+        artifacts = {}
+        if "dl" in args.backends:
+            artifacts["dlhybride"] = synthetic.write_dl_artifacts(tables, os.path.join(work_dir, "dl"), DL_MODEL_NAME)
+        if "ml" in args.backends:
+            artifacts[ML_BUCKET] = synthetic.write_ml_artifacts(tables, os.path.join(work_dir, "ml"))
+        s3_server, s3_endpoint = start_s3(artifacts)
+
+        results = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **git_revision(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "copy_from", "pg_url")},
+            "referential": {name: len(df) for name, df in tables.items()},
+            "backends": {},
+        }
+        try:
+            for backend in args.backends:
+                env = {
+                    "S3_ENDPOINT_URL": s3_endpoint, "S3_ACCESS_KEY_ID": "bench", "S3_SECRET_ACCESS_KEY": "bench",
+                    "S3_REGION": "us-east-1", "ARTIFACT_CACHE_DIR": os.path.join(work_dir, f"cache_{backend}"),
+                    "MODEL_KEY": f"{DL_MODEL_NAME}.pt", "ML_BUNDLE_BUCKET": ML_BUCKET, "LOG_LEVEL": "WARNING", **db_env,
+                    **dict(item.split("=", 1) for item in args.env),
+                }
+                process, port, phases = start_backend(backend, env, sqlite_path, work_dir, args.startup_timeout)
+                try:
+                    print(f"[{backend}] prêt sur le port {port} : "
+                          + ", ".join(f"{name} {p.get('seconds')} s" for name, p in phases.items()))
+                    samples = run_load(port, endpoint_mix(backend, tables, profiles), args.concurrency,
+                                       args.duration, args.warmup, args.think_ms, args.seed)
+                    results["backends"][backend] = {
+                        "startup_phases": phases,
+                        **summarize(samples, args.duration),
+                        "stages": stage_breakdown(port),
+                    }
+                finally:
+                    process.terminate()
+                    process.wait(timeout=30)
+        finally:
+            s3_server.stop()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
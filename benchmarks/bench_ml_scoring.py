@@ -0,0 +1,102 @@
+"""
+Benchmark : moteur de scoring de l'API ML (scoring.py) vs ancien infer_simple_api
+----------------------------------------------------------------------------------
+
+Mesure le débit (profils/s) du scoring cosinus sur un X synthétique de la taille du
+référentiel ROME, pour des lots de 1, 64 et 1024 profils :
+    - ancien : une requête csr 1 x n_skills par profil, q @ X.T, densification et np.argsort complet
+    - moteur : requêtes empilées, un seul produit avec X transposé en CSR, top-k par np.argpartition
+
+Compare aussi, pour une requête isolée, le produit dense et le parcours élagué de l'index
+inversé (ScoringEngine.topk_pruned) lorsque le nombre de ROME augmente (--pruning-roms).
+
+Lancement :
+    python benchmarks/bench_ml_scoring.py --n-roms 1600 --n-skills 15000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix, random as sparse_random
+from sklearn.preprocessing import normalize
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Industrialisation_ML", "back-end"))
+from scoring import ScoringEngine  # noqa: E402
+
+
+def old_topk(X, cols, topk):
+    q = csr_matrix((np.ones(len(cols)), ([0] * len(cols), cols)), shape=(1, X.shape[1]))
+    q = normalize(q, norm="l2", axis=1)
+    s = (q @ X.T).toarray().ravel()
+    order = np.argsort(-s)[:topk]
+    return order, s[order]
+
+
+def synthetic_referential(rng, n_roms, n_skills, skills_per_rom):
+    """X normalisé dont les compétences suivent une loi de Zipf (quelques compétences très partagées)."""
+    cols = rng.zipf(1.3, size=n_roms * skills_per_rom) % n_skills
+    indptr = np.arange(0, n_roms * skills_per_rom + 1, skills_per_rom)
+    X = csr_matrix((rng.random(len(cols)), cols, indptr), shape=(n_roms, n_skills))
+    X.sum_duplicates()
+    return normalize(X, norm="l2")
+
+
+def throughput(fn, n_profiles, min_seconds=1.0):
+    fn()  # échauffement
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        fn()
+        count += 1
+    return count * n_profiles / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-roms", type=int, default=1600)
+    parser.add_argument("--n-skills", type=int, default=15000)
+    parser.add_argument("--density", type=float, default=0.003)
+    parser.add_argument("--profile-len", type=int, default=8)
+    parser.add_argument("--topk", type=int, default=3)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--pruning-roms", type=int, nargs="+", default=[1600, 16000, 80000])
+    parser.add_argument("--skills-per-rom", type=int, default=45)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = normalize(sparse_random(args.n_roms, args.n_skills, density=args.density, format="csr", random_state=0), norm="l2")
+    engine = ScoringEngine(X, pruning_min_roms=sys.maxsize)
+
+    profiles = [rng.choice(args.n_skills, size=args.profile_len, replace=False).tolist() for _ in range(max(args.batch_sizes))]
+    idx, _ = engine.topk(profiles[:16], args.topk)
+    for p, row in zip(profiles[:16], idx):
+        old_idx, old_scores = old_topk(X, p, args.topk)
+        assert np.allclose(old_scores, engine.scores([p])[0][row])
+
+    print(f"X {args.n_roms} x {args.n_skills}, nnz={X.nnz}, profils de {args.profile_len} compétences, top-{args.topk}")
+    print(f"{'lot':>6}{'ancien (profils/s)':>22}{'moteur (profils/s)':>22}{'gain':>8}")
+    for size in args.batch_sizes:
+        batch = profiles[:size]
+        before = throughput(lambda: [old_topk(X, p, args.topk) for p in batch], size)
+        after = throughput(lambda: engine.topk(batch, args.topk), size)
+        print(f"{size:>6}{before:>22,.0f}{after:>22,.0f}{after / before:>7.1f}x")
+
+    # Requête isolée : produit dense vs index inversé élagué, sur des X de plus en plus grands
+    print(f"\nRequête isolée, {args.skills_per_rom} compétences par ROME (popularité des compétences en loi de Zipf)")
+    print(f"{'ROME':>8}{'dense (req/s)':>16}{'élagué (req/s)':>16}{'gain':>8}")
+    for n_roms in args.pruning_roms:
+        X = synthetic_referential(rng, n_roms, args.n_skills, args.skills_per_rom)
+        engine = ScoringEngine(X, pruning_min_roms=sys.maxsize)
+        for p in profiles[:16]:
+            # Mêmes scores, au bit près, qu'une requête isolée passe ou non par l'index inversé
+            assert np.array_equal(engine.topk([p], args.topk)[1][0], engine.topk_pruned(p, args.topk)[1])
+        queries = profiles[:256]
+        dense = throughput(lambda: [engine.topk([p], args.topk) for p in queries], len(queries))
+        pruned = throughput(lambda: [engine.topk_pruned(p, args.topk) for p in queries], len(queries))
+        print(f"{n_roms:>8}{dense:>16,.0f}{pruned:>16,.0f}{pruned / dense:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
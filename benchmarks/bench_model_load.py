@@ -0,0 +1,104 @@
+"""
+Benchmark : chargement à froid du modèle DL, dill vs state_dict
+----------------------------------------------------------------
+
+Compare le temps de chargement et le pic de mémoire (RSS) de JobProfileTransformer selon :
+    - dill      : ancien chemin (octets S3 -> fichier temporaire -> dill.load)
+    - state     : state_dict + config JSON depuis des octets en mémoire (chemin S3 actuel)
+    - state_mmap: state_dict + config JSON projetés en mémoire depuis un fichier local
+
+Chaque chargement est fait dans un processus neuf pour mesurer un démarrage à froid.
+
+Lancement :
+    python benchmarks/bench_model_load.py --n-skills 15000 --n-jobs 1600 --runs 5
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Industrialisation", "back-end")
+sys.path.insert(0, BACKEND_DIR)
+
+MODES = ("dill", "state", "state_mmap")
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, prefix):
+    import dill
+    from model import load_model_state  # importe aussi torch, hors de la mesure
+
+    rss_before = max_rss_mb()
+    start = time.perf_counter()
+    if mode == "dill":
+        with open(f"{prefix}.pkl", "rb") as f:
+            body = f.read()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pkl") as tmp_file:
+            tmp_file.write(body)
+            tmp_path = tmp_file.name
+        with open(tmp_path, "rb") as f:
+            model = dill.load(f)
+        os.remove(tmp_path)
+    else:
+        with open(f"{prefix}.json", encoding="utf-8") as f:
+            config = json.load(f)
+        if mode == "state":
+            with open(f"{prefix}.pt", "rb") as f:
+                weights = io.BytesIO(f.read())
+        else:
+            weights = f"{prefix}.pt"
+        model = load_model_state(config, weights)
+    model.eval()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "rss_delta_mb": max_rss_mb() - rss_before}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-skills", type=int, default=15000)
+    parser.add_argument("--n-jobs", type=int, default=1600)
+    parser.add_argument("--emb-dim", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PREFIX"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    import dill
+    from model import JobProfileTransformer, export_model
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prefix = os.path.join(tmp_dir, "modele")
+        model = JobProfileTransformer(args.n_skills, args.n_jobs, emb_dim=args.emb_dim).eval()
+        with open(f"{prefix}.pkl", "wb") as f:
+            dill.dump(model, f)
+        export_model(model, f"{prefix}.pt", f"{prefix}.json")
+        sizes = {ext: os.path.getsize(f"{prefix}.{ext}") / 1e6 for ext in ("pkl", "pt")}
+
+        print(f"n_skills={args.n_skills} n_jobs={args.n_jobs} emb_dim={args.emb_dim} "
+              f"(pkl {sizes['pkl']:.1f} Mo, pt {sizes['pt']:.1f} Mo), {args.runs} chargements à froid par mode")
+        print(f"{'mode':<12}{'médiane (ms)':>14}{'max (ms)':>10}{'pic RSS (Mo)':>14}")
+        for mode in MODES:
+            results = []
+            for _ in range(args.runs):
+                out = subprocess.run([sys.executable, __file__, "--child", mode, prefix],
+                                     check=True, capture_output=True, text=True).stdout
+                results.append(json.loads(out.strip().splitlines()[-1]))
+            times = sorted(r["seconds"] * 1000 for r in results)
+            rss = max(r["rss_delta_mb"] for r in results)
+            print(f"{mode:<12}{times[len(times) // 2]:>14.1f}{times[-1]:>10.1f}{rss:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
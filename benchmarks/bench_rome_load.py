@@ -0,0 +1,89 @@
+"""
+Benchmark : chargement des tables ROME dans PostgreSQL, DataFrame.to_sql vs COPY ... FROM STDIN
+------------------------------------------------------------------------------------------------
+
+Charge des tables ROME synthétiques (synthetic.py, lues en str comme par extract) avec les deux
+méthodes d'insert_db_data (script/import_rome/import_rome.py) et rapporte, par table, la durée
+médiane et le débit de chacune. Les tables chargées par les deux méthodes sont ensuite comparées
+ligne à ligne (EXCEPT) dans la base.
+
+La connexion utilise les variables DB_* habituelles (DB_HOST, DB_PORT, DB_NAME, DB_USER,
+DB_PASSWORD) : pointer vers une base Postgres locale. Les tables sont écrites dans un schéma
+dédié (--schema, supprimé à la fin).
+
+Lancement :
+    DB_HOST=localhost DB_NAME=postgres DB_USER=postgres DB_PASSWORD=... python benchmarks/bench_rome_load.py --scale 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import synthetic
+
+sys.path.insert(0, os.path.join(synthetic.ROOT_DIR, "script", "import_rome"))
+import import_rome  # noqa: E402
+
+METHODS = ["to_sql", "copy"]
+
+
+def rome_tables(scale: float, seed: int) -> dict:
+    """Tables de la forme des fichiers ROME (colonnes str), dont une table de textes longs comme rome_texte."""
+    tables = synthetic.scaled_referential(scale, seed=seed)
+    referentiel = tables["rome_referentiel_code_rome"]
+    tables["rome_texte"] = referentiel[["code_rome"]].loc[np.repeat(referentiel.index, 10)].assign(
+        libelle_type_texte="definition",
+        libelle_texte='Descriptif du métier ; accès "après un bac+2", conditions d\'exercice, environnement. ' * 6,
+    ).reset_index(drop=True)
+    return {name: df.astype(str) for name, df in tables.items()}
+
+
+def same_content(cursor, schema: str, table_a: str, table_b: str) -> bool:
+    cursor.execute(f'SELECT count(*) FROM ((TABLE "{schema}"."{table_a}" EXCEPT ALL TABLE "{schema}"."{table_b}") '
+                   f'UNION ALL (TABLE "{schema}"."{table_b}" EXCEPT ALL TABLE "{schema}"."{table_a}")) AS diff')
+    return cursor.fetchone()[0] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="Taille du référentiel synthétique (1 = ROME actuel)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--schema", default="bench_rome_load")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tables = rome_tables(args.scale, args.seed)
+    import_rome.db_schema = args.schema
+    connection = import_rome.connect_db()
+    with connection, connection.cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE; CREATE SCHEMA "{args.schema}"')
+
+    print(f"{'Table':<32} {'Lignes':>9} " + " ".join(f"{m + ' (s)':>11}" for m in METHODS) + f" {'Gain':>6}  Identiques")
+    try:
+        for name, df in tables.items():
+            timings = {}
+            for method in METHODS:
+                runs = []
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    if not import_rome.insert_db_data(f"{name}_{method}", df, method=method):
+                        raise RuntimeError(f"Échec du chargement de {name} ({method})")
+                    runs.append(time.perf_counter() - start)
+                timings[method] = statistics.median(runs)
+            with connection, connection.cursor() as cursor:
+                identical = same_content(cursor, args.schema, f"{name}_to_sql", f"{name}_copy")
+            print(f"{name:<32} {len(df):>9} " + " ".join(f"{timings[m]:>11.3f}" for m in METHODS)
+                  + f" {timings['to_sql'] / timings['copy']:>5.1f}x  {'oui' if identical else 'NON'}")
+    finally:
+        with connection, connection.cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE')
+        connection.close()
+        import_rome.init_engine().dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Benchmark : passage à l'échelle des deux recommandeurs sur des référentiels synthétiques agrandis
+--------------------------------------------------------------------------------------------------
+
+Pour chaque facteur d'échelle (1x = taille actuelle du ROME, --scales 1 10 100), génère un référentiel
+synthétique (synthetic.py) puis, dans un processus neuf :
+    - API DL : vocabulaires et matrice métiers x compétences (build_vocabularies), JobProfileTransformer
+      aux poids aléatoires, matrice des métiers (build_job_matrix), puis predict_hybrid_batch
+    - API ML : bundle X / comp2j (publish_bundle), puis infer_simple_api (produit dense puis index
+      inversé élagué) et infer_batch_api ; le cache de résultats est désactivé
+
+et mesure le temps de préparation, la mémoire (RSS après préparation, pic de RSS, taille des
+structures du modèle), la latence p50/p99 d'une requête isolée et le débit par lots.
+
+Lancement :
+    python benchmarks/bench_scalability.py --scales 1 10 100 --output scalability.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import synthetic
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return max_rss_mb()
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def latency(fn, items, runs: int, warmup: int = 20) -> dict:
+    for i in range(warmup):
+        fn(items[i % len(items)])
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(items[i % len(items)])
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": round(float(np.percentile(timings, 50)), 3), "p99_ms": round(float(np.percentile(timings, 99)), 3)}
+
+
+def throughput(fn, batches, min_seconds: float = 2.0) -> float:
+    fn(batches[0])  # échauffement
+    count, start, i = 0, time.perf_counter(), 0
+    while time.perf_counter() - start < min_seconds:
+        count += len(batches[i % len(batches)])
+        fn(batches[i % len(batches)])
+        i += 1
+    return round(count / (time.perf_counter() - start), 1)
+
+
+# ---------------------------
+# Mesures dans un processus neuf
+# ---------------------------
+
+def child_dl(tables, profiles, args) -> dict:
+    import torch
+    sys.path.insert(0, synthetic.DL_BACKEND_DIR)
+    import main
+
+    torch.set_num_threads(args.threads)
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    vocab = main.build_vocabularies(synthetic.dl_vocab_csv(tables))
+    model = synthetic.dl_model(vocab["df_jobs"], seed=args.seed)
+    job_matrix = main.build_job_matrix(model, len(vocab["jobs_vocab"]))
+    setup_s = time.perf_counter() - start
+
+    def predict(batch):
+        return main.predict_hybrid_batch(model, job_matrix, batch, vocab["skills_vocab"], vocab["job_skill_matrix"],
+                                         vocab["job_codes"], vocab["job_labels"], top_k=5)
+
+    sizes = {
+        "model_mb": sum(p.numel() * p.element_size() for p in model.parameters()) / 1e6,
+        "job_matrix_mb": job_matrix.numel() * job_matrix.element_size() / 1e6,
+        "job_skill_matrix_mb": sum(t.numel() * t.element_size() for t in (
+            vocab["job_skill_matrix"].crow_indices(), vocab["job_skill_matrix"].col_indices(),
+            vocab["job_skill_matrix"].values())) / 1e6,
+    }
+    rss_setup = rss_mb() - rss_before
+    batches = [profiles[i:i + args.batch_size] for i in range(0, len(profiles), args.batch_size)]
+    return {
+        "n_skills": len(vocab["skills_vocab"]),
+        "n_jobs": len(vocab["jobs_vocab"]),
+        "nnz": int(vocab["job_skill_matrix"].values().numel()),
+        "setup_s": round(setup_s, 3),
+        "rss_setup_mb": round(rss_setup, 1),
+        **{k: round(v, 1) for k, v in sizes.items()},
+        "single": latency(lambda p: predict([p]), profiles, args.runs),
+        f"batch{args.batch_size}_profiles_per_s": throughput(predict, batches),
+        "peak_rss_mb": round(max_rss_mb(), 1),
+    }
+
+
+def child_ml(tables, profiles, args) -> dict:
+    sys.path.insert(0, synthetic.ML_BACKEND_DIR)
+    import main
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    bundle = synthetic.ml_bundle(tables, seed=args.seed)
+    main.publish_bundle(bundle, f"synthetique x{args.child[1]}")
+    setup_s = time.perf_counter() - start
+
+    engine = main.scoring_engine
+    X = engine.XT
+    rss_setup = rss_mb() - rss_before
+    result = {
+        "n_skills": engine.n_skills,
+        "n_jobs": engine.n_roms,
+        "nnz": int(X.nnz),
+        "setup_s": round(setup_s, 3),
+        "rss_setup_mb": round(rss_setup, 1),
+        "X_mb": round((X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1e6, 1),
+    }
+    engine.pruning = False
+    result["single_dense"] = latency(main.infer_simple_api, profiles, args.runs)
+    engine.pruning = True
+    result["single_pruned"] = latency(main.infer_simple_api, profiles, args.runs)
+    batches = [profiles[i:i + args.ml_batch_size] for i in range(0, len(profiles), args.ml_batch_size)]
+    result[f"batch{args.ml_batch_size}_profiles_per_s"] = throughput(main.infer_batch_api, batches)
+    result["peak_rss_mb"] = round(max_rss_mb(), 1)
+    return result
+
+
+def child(args):
+    backend, scale = args.child[0], float(args.child[1])
+    tables = synthetic.scaled_referential(scale, seed=args.seed, skills_per_job=args.skills_per_job)
+    profiles = synthetic.sample_profiles(tables, args.n_profiles, seed=args.seed)
+    result = (child_dl if backend == "dl" else child_ml)(tables, profiles, args)
+    # Dernière ligne de la sortie standard : résultat lu par le processus parent
+    print(json.dumps({"backend": backend, "scale": scale, **result}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--backends", nargs="+", choices=["dl", "ml"], default=["dl", "ml"])
+    parser.add_argument("--skills-per-job", type=int, default=45)
+    parser.add_argument("--n-profiles", type=int, default=1024)
+    parser.add_argument("--runs", type=int, default=200, help="Requêtes isolées mesurées")
+    parser.add_argument("--batch-size", type=int, default=64, help="Taille des lots de l'API DL")
+    parser.add_argument("--ml-batch-size", type=int, default=1024, help="Taille des lots de l'API ML")
+    parser.add_argument("--threads", type=int, default=1, help="Threads torch (API DL)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    parser.add_argument("--child", nargs=2, metavar=("BACKEND", "SCALE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_scalability_") as cache_dir:
+        env = {**os.environ, "ARTIFACT_CACHE_DIR": cache_dir, "ARTIFACT_OFFLINE": "1", "LOG_LEVEL": "WARNING",
+               "PREDICT_CACHE_SIZE": "0"}
+        for backend in args.backends:
+            print(f"\n[{backend}]")
+            for scale in args.scales:
+                cmd = [sys.executable, os.path.abspath(__file__), "--child", backend, str(scale),
+                       "--skills-per-job", str(args.skills_per_job), "--n-profiles", str(args.n_profiles),
+                       "--runs", str(args.runs), "--batch-size", str(args.batch_size),
+                       "--ml-batch-size", str(args.ml_batch_size), "--threads", str(args.threads),
+                       "--seed", str(args.seed)]
+                process = subprocess.run(cmd, env=env, cwd=cache_dir, capture_output=True, text=True)
+                if process.returncode != 0:
+                    # Mémoire insuffisante ou autre échec : c'est aussi un résultat de passage à l'échelle
+                    print(f"  x{scale:g} : échec (code {process.returncode}) {process.stderr.strip().splitlines()[-1:]}")
+                    results.append({"backend": backend, "scale": scale, "error": process.returncode})
+                    continue
+                result = json.loads(process.stdout.strip().splitlines()[-1])
+                results.append(result)
+                single = result.get("single") or result.get("single_dense")
+                line = (f"  x{scale:g} : {result['n_skills']} compétences, {result['n_jobs']} métiers, "
+                        f"préparation {result['setup_s']} s, RSS +{result['rss_setup_mb']} Mo (pic {result['peak_rss_mb']} Mo), "
+                        f"requête p50 {single['p50_ms']} ms / p99 {single['p99_ms']} ms")
+                if "single_pruned" in result:
+                    line += f" (élaguée p50 {result['single_pruned']['p50_ms']} ms)"
+                batch_key = next(k for k in result if k.endswith("_profiles_per_s"))
+                print(line + f", {batch_key.split('_')[0]} {result[batch_key]} profils/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k not in ("output", "child")},
+                       "results": results}, f, indent=2)
+        print(f"\nRésultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark : mémoire des back-ends servis par plusieurs workers gunicorn
+------------------------------------------------------------------------
+
+Pour 1, 4 et 8 workers (--workers), lance chaque back-end sous gunicorn (serve_backend.py --workers,
+même S3 local et même copie SQLite que bench_load.py) de deux façons :
+    - preload  : le maître charge les artefacts une seule fois, les workers les partagent (copie à l'écriture)
+    - worker   : chaque worker charge ses propres artefacts (--no-preload)
+
+attend que chaque worker réponde prêt sur /ready, envoie quelques requêtes /predict (les pages
+touchées par le service comptent aussi), puis relève pour le maître et ses workers, dans
+/proc/<pid>/smaps_rollup :
+    RSS  mémoire résidente, qui compte une page partagée dans chaque processus
+    PSS  part proportionnelle (une page partagée par N processus compte pour 1/N) : la somme
+         sur les processus est l'empreinte réelle du service
+
+Lancement (Linux) :
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_workers.py --workers 1 4 8 --output workers.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic
+from bench_load import (BENCH_DIR, DL_MODEL_NAME, ML_BUCKET, free_port, request, start_s3,
+                        write_sqlite)
+
+MODES = {"preload": [], "worker": ["--no-preload"]}
+
+
+def memory_kb(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name.lower()] = int(rest.split()[0])
+    return values
+
+
+def children(pid: int) -> list:
+    pids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # Le nom du processus (2e champ) peut contenir des espaces : ppid après la dernière parenthèse
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return pids
+
+
+def start_workers(backend: str, workers: int, mode: str, env: dict, sqlite_path: str, work_dir: str, timeout: float):
+    """Démarre gunicorn et attend que chacun des `workers` processus ait répondu prêt sur /ready."""
+    port = free_port()
+    cmd = [sys.executable, os.path.join(BENCH_DIR, "serve_backend.py"), backend, "--port", str(port),
+           "--sqlite", sqlite_path, "--workers", str(workers)] + MODES[mode]
+    log = open(os.path.join(work_dir, f"{backend}_{mode}_{workers}.log"), "w")
+    process = subprocess.Popen(cmd, env={**os.environ, **env}, cwd=work_dir, stdout=log, stderr=subprocess.STDOUT)
+
+    ready_pids, start = set(), time.monotonic()
+    while time.monotonic() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn s'est arrêté (voir {log.name})")
+        try:
+            # Une connexion par appel : le noyau répartit les connexions entre les workers
+            status, body = request("127.0.0.1", port, "GET", "/ready")
+            ready = json.loads(body)
+            if status == 200 and all(p.get("status") in ("done", "error") for p in ready["phases"].values()):
+                ready_pids.add(ready["pid"])
+                if len(ready_pids) >= workers:
+                    return process, port, time.monotonic() - start
+        except (OSError, ValueError, KeyError, http.client.HTTPException):
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{len(ready_pids)}/{workers} workers prêts après {timeout} s (voir {log.name})")
+
+
+def measure(backend: str, workers: int, mode: str, env: dict, sqlite_path: str, profiles: list, work_dir: str,
+            timeout: float) -> dict:
+    process, port, ready_s = start_workers(backend, workers, mode, env, sqlite_path, work_dir, timeout)
+    try:
+        errors = sum(request("127.0.0.1", port, "POST", "/predict", {"skills": profile})[0] != 200
+                     for profile in profiles)
+        worker_pids = children(process.pid)
+        master, per_worker = memory_kb(process.pid), [memory_kb(pid) for pid in worker_pids]
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    return {
+        "backend": backend,
+        "mode": mode,
+        "workers": len(worker_pids),
+        "ready_s": round(ready_s, 2),
+        "predict_errors": errors,
+        "master_rss_mb": round(master["rss"] / 1024, 1),
+        "workers_rss_mb": round(sum(m["rss"] for m in per_worker) / 1024, 1),
+        "total_pss_mb": round((master["pss"] + sum(m["pss"] for m in per_worker)) / 1024, 1),
+        "worker_pss_mb": round(sum(m["pss"] for m in per_worker) / 1024 / max(1, len(per_worker)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=["dl", "ml"], default=["dl", "ml"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=["preload", "worker"])
+    parser.add_argument("--scale", type=float, default=1.0, help="Taille du référentiel synthétique (1 = ROME actuel)")
+    parser.add_argument("--requests", type=int, default=200, help="Requêtes /predict envoyées avant la mesure")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_workers_") as work_dir:
+        tables = synthetic.scaled_referential(args.scale, seed=args.seed)
+        profiles = synthetic.sample_profiles(tables, args.requests, seed=args.seed)
+        sqlite_path = os.path.join(work_dir, "rome.sqlite")
+        write_sqlite(tables, sqlite_path)
+        artifacts = {}
+        if "dl" in args.backends:
+            artifacts["dlhybride"] = synthetic.write_dl_artifacts(tables, os.path.join(work_dir, "dl"), DL_MODEL_NAME)
+        if "ml" in args.backends:
+            artifacts[ML_BUCKET] = synthetic.write_ml_artifacts(tables, os.path.join(work_dir, "ml"))
+        s3_server, s3_endpoint = start_s3(artifacts)
+
+        try:
+            for backend in args.backends:
+                env = {
+                    "S3_ENDPOINT_URL": s3_endpoint, "S3_ACCESS_KEY_ID": "bench", "S3_SECRET_ACCESS_KEY": "bench",
+                    "S3_REGION": "us-east-1", "ARTIFACT_CACHE_DIR": os.path.join(work_dir, f"cache_{backend}"),
+                    "MODEL_KEY": f"{DL_MODEL_NAME}.pt", "ML_BUNDLE_BUCKET": ML_BUCKET, "LOG_LEVEL": "WARNING",
+                }
+                print(f"\n[{backend}]  {'workers':>7}  {'mode':<8}  {'prêt (s)':>8}  {'RSS maître':>10}  "
+                      f"{'RSS workers':>11}  {'PSS total':>9}  {'PSS/worker':>10}  (Mo)")
+                for workers in args.workers:
+                    for mode in args.modes:
+                        result = measure(backend, workers, mode, env, sqlite_path, profiles, work_dir,
+                                         args.startup_timeout)
+                        results.append(result)
+                        print(f"      {result['workers']:>7}  {mode:<8}  {result['ready_s']:>8}  {result['master_rss_mb']:>10}  "
+                              f"{result['workers_rss_mb']:>11}  {result['total_pss_mb']:>9}  {result['worker_pss_mb']:>10}")
+        finally:
+            s3_server.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k != "output"},
+                       "referential": {name: len(df) for name, df in tables.items()},
+                       "results": results}, f, indent=2)
+        print(f"\nRésultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Contrôle : cache local des artefacts S3 (artifacts.py)
+------------------------------------------------------
+
+Avec un client S3 simulé (botocore Stubber, sans réseau ni bucket), vérifie les chemins de ArtifactCache.fetch :
+    - téléchargement : premier appel, contenu écrit dans le cache
+    - 304 : ETag inchangé, version en cache servie sans nouveau téléchargement
+    - ETag différent du MD5 (SSE-KMS, stockage compatible S3) : téléchargement conservé ; taille incohérente : échec
+    - S3 indisponible : erreur 5xx, limitation de débit ou S3 injoignable, version en cache servie ; accès refusé ou
+      cache vide : l'erreur est propagée
+    - hors ligne : version en cache servie sans appel à S3, échec si l'artefact n'est pas en cache
+    - cache corrompu : retéléchargé après un 304, échec hors ligne
+
+Le module est identique dans les deux back-ends (voir check_shared_modules.py) : celui de l'API DL est contrôlé.
+Sort avec un code d'erreur si un contrôle échoue.
+
+Lancement :
+    python benchmarks/check_artifacts.py
+"""
+
+import hashlib
+import io
+import os
+import sys
+import tempfile
+
+import boto3
+from botocore.exceptions import ClientError, EndpointConnectionError
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Industrialisation", "back-end"))
+from artifacts import ArtifactCache, ArtifactError  # noqa: E402
+
+BUCKET = "artefacts"
+CONTENT = b"contenu de l'artefact " * 1000
+
+
+def md5_etag(data: bytes) -> str:
+    return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+def object_response(data: bytes, etag: str = None, content_length: int = None) -> dict:
+    return {"Body": StreamingBody(io.BytesIO(data), len(data)), "ETag": etag or md5_etag(data),
+            "ContentLength": len(data) if content_length is None else content_length}
+
+
+class UnreachableS3:
+    """Client dont chaque appel échoue comme un endpoint injoignable."""
+
+    def get_object(self, **kwargs):
+        raise EndpointConnectionError(endpoint_url="http://s3.invalid")
+
+
+def new_cache(offline: bool = False) -> tuple:
+    client = boto3.client("s3", region_name="us-east-1", aws_access_key_id="x", aws_secret_access_key="x")
+    stubber = Stubber(client)
+    stubber.activate()
+    return ArtifactCache(client, tempfile.mkdtemp(prefix="check_artifacts_"), offline=offline), stubber
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def serves(cache: ArtifactCache, key: str) -> bool:
+    """fetch renvoie bien le contenu attendu (une exception fait échouer le contrôle)."""
+    try:
+        return read(cache.fetch(BUCKET, key)) == CONTENT
+    except Exception as e:
+        print(f"{key}: {type(e).__name__}: {e}")
+        return False
+
+
+def consumed(stubber: Stubber) -> bool:
+    """Toutes les réponses prévues ont été demandées (aucun appel S3 en moins)."""
+    return fails(stubber.assert_no_pending_responses, AssertionError) is False
+
+
+def fails(function, error=Exception) -> bool:
+    try:
+        function()
+    except error:
+        return True
+    return False
+
+
+def cached(key: str = "modele.pt") -> tuple:
+    """Cache contenant déjà `key` (premier téléchargement), et son Stubber pour les appels suivants."""
+    cache, stubber = new_cache()
+    stubber.add_response("get_object", object_response(CONTENT), {"Bucket": BUCKET, "Key": key})
+    cache.fetch(BUCKET, key)
+    return cache, stubber
+
+
+def main():
+    checks = {}
+    key = "modele.pt"
+    conditional = {"Bucket": BUCKET, "Key": key, "IfNoneMatch": md5_etag(CONTENT)}
+
+    cache, stubber = new_cache()
+    stubber.add_response("get_object", object_response(CONTENT), {"Bucket": BUCKET, "Key": key})
+    checks["téléchargement"] = serves(cache, key)
+
+    stubber.add_client_error("get_object", "304", "Not Modified", 304, expected_params=conditional)
+    checks["304 : version en cache"] = serves(cache, key) and consumed(stubber)
+
+    cache, stubber = new_cache()
+    stubber.add_response("get_object", object_response(CONTENT, etag='"0123456789abcdef0123456789abcdef"'),
+                         {"Bucket": BUCKET, "Key": key})
+    checks["ETag différent du MD5 : téléchargement conservé"] = serves(cache, key)
+
+    cache, stubber = new_cache()
+    stubber.add_response("get_object", object_response(CONTENT, content_length=len(CONTENT) + 1),
+                         {"Bucket": BUCKET, "Key": key})
+    checks["taille incohérente : échec"] = fails(lambda: cache.fetch(BUCKET, key), ArtifactError)
+
+    for code, status in [("InternalError", 500), ("ServiceUnavailable", 503), ("SlowDown", 503),
+                         ("TooManyRequests", 429)]:
+        cache, stubber = cached(key)
+        stubber.add_client_error("get_object", code, code, status, expected_params=conditional)
+        checks[f"{code} ({status}) : version en cache"] = serves(cache, key)
+
+    cache, stubber = cached(key)
+    stubber.add_client_error("get_object", "AccessDenied", "Access Denied", 403, expected_params=conditional)
+    checks["accès refusé : erreur propagée"] = fails(lambda: cache.fetch(BUCKET, key), ClientError)
+
+    cache, stubber = new_cache()
+    stubber.add_client_error("get_object", "ServiceUnavailable", "Unavailable", 503,
+                             expected_params={"Bucket": BUCKET, "Key": key})
+    checks["erreur 5xx sans cache : erreur propagée"] = fails(lambda: cache.fetch(BUCKET, key), ClientError)
+
+    cache, stubber = cached(key)
+    cache.s3_client = UnreachableS3()
+    checks["S3 injoignable : version en cache"] = serves(cache, key)
+
+    cache, stubber = cached(key)
+    offline = ArtifactCache(None, cache.cache_dir, offline=True)
+    checks["hors ligne : version en cache"] = serves(offline, key)
+    checks["hors ligne, absent du cache : échec"] = fails(lambda: offline.fetch(BUCKET, "autre.pt"), ArtifactError)
+
+    cache, stubber = cached(key)
+    path = cache._object_path(hashlib.sha256(CONTENT).hexdigest())
+    with open(path, "r+b") as f:
+        f.write(b"corrompu")
+    checks["cache corrompu, hors ligne : échec"] = fails(
+        lambda: ArtifactCache(None, cache.cache_dir, offline=True).fetch(BUCKET, key), ArtifactError)
+    stubber.add_client_error("get_object", "304", "Not Modified", 304, expected_params=conditional)
+    stubber.add_response("get_object", object_response(CONTENT), {"Bucket": BUCKET, "Key": key})
+    checks["cache corrompu : retéléchargé après un 304"] = (serves(cache, key) and consumed(stubber)
+                                                           and read(path) == CONTENT)
+
+    for name, ok in checks.items():
+        print(f"{name} : {'ok' if ok else 'ÉCHEC'}")
+    if not all(checks.values()):
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Contrôle : prédictions de l'API DL identiques quel que soit le regroupement des profils
+----------------------------------------------------------------------------------------
+
+Sur un référentiel synthétique (synthetic.py) et un JobProfileTransformer aux poids aléatoires, vérifie que :
+    - encodage : un profil encodé seul et le même profil complété (padding) dans un lot donnent le même
+      vecteur et le même top-5, y compris quand il contient la compétence d'indice 0 du vocabulaire, qui
+      sert aussi de valeur de remplissage (le masque vient des longueurs des profils, pas de cet indice) ;
+      c'est ce que supposent /predict_batch et le micro-batching de /predict
+    - micro-batching : des appels concurrents regroupés par MicroBatcher (PREDICT_MAX_BATCH par défaut)
+      reçoivent chacun la même réponse que s'ils étaient traités seuls
+    - endpoints : /predict (cache de résultats et micro-batching compris) et /predict_batch répondent de la même
+      façon pour le même profil, saisi dans un ordre quelconque et avec des doublons
+
+Sort avec un code d'erreur si un écart est trouvé.
+
+Lancement :
+    python benchmarks/check_dl_predict.py --profiles 600
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import synthetic
+
+
+def top5(result: dict) -> list:
+    return [prediction["rome"] for prediction in result["predictions"]]
+
+
+def check_encoding(main, model, job_matrix, vocab, profiles, batch_size: int) -> int:
+    """Profils seuls vs complétés dans des lots de batch_size : nombre de profils dont le vecteur ou le top-5 diffère."""
+    import torch
+
+    def predict(batch):
+        return main.predict_hybrid_batch(model, job_matrix, batch, vocab["skills_vocab"], vocab["job_skill_matrix"],
+                                         vocab["job_codes"], vocab["job_labels"], top_k=5)
+
+    alone = [predict([profile])[0] for profile in profiles]
+    batched = []
+    for start in range(0, len(profiles), batch_size):
+        batched += predict(profiles[start:start + batch_size])
+
+    ids = [list(dict.fromkeys(vocab["skills_vocab"][s] for s in profile)) for profile in profiles]
+    with torch.no_grad():
+        v_alone = torch.cat([main.encode_profiles(model, [profile_ids]) for profile_ids in ids])
+        v_batched = torch.cat([main.encode_profiles(model, ids[start:start + batch_size])
+                               for start in range(0, len(ids), batch_size)])
+    close = torch.isclose(v_alone, v_batched, atol=1e-5).all(dim=1).tolist()
+    return sum(top5(a) != top5(b) or not ok for a, b, ok in zip(alone, batched, close))
+
+
+def check_micro_batching(main, model, job_matrix, vocab, profiles, max_batch: int) -> tuple:
+    """Appels concurrents via MicroBatcher vs profils traités seuls : (profils différents, taille moyenne des lots)."""
+    from batching import MicroBatcher
+
+    def predict(batch):
+        return main.predict_hybrid_batch(model, job_matrix, batch, vocab["skills_vocab"], vocab["job_skill_matrix"],
+                                         vocab["job_codes"], vocab["job_labels"], top_k=5)
+
+    alone = [predict([profile])[0] for profile in profiles]
+    batcher = MicroBatcher(predict, max_wait_ms=20, max_batch_size=max_batch)
+    with ThreadPoolExecutor(max_batch) as pool:
+        batched = list(pool.map(batcher.submit, profiles))
+    mismatches = sum(top5(a) != top5(b) for a, b in zip(alone, batched))
+    return mismatches, batcher.n_items / max(1, batcher.n_batches)
+
+
+def check_endpoints(main, model, job_matrix, vocab, profiles) -> int:
+    """Fonctions des endpoints /predict et /predict_batch appelées directement : nombre de profils dont le résultat diffère."""
+    main.model_loaded, main.job_matrix = model, job_matrix
+    for name in ("skills_vocab", "job_skill_matrix", "job_codes", "job_labels"):
+        setattr(main, name, vocab[name])
+    main.result_cache.invalidate("check_dl_predict")
+
+    def request():
+        return SimpleNamespace(state=SimpleNamespace(received=time.perf_counter()))
+
+    def body(response):
+        return json.loads(response.body)
+
+    with ThreadPoolExecutor(main.PREDICT_MAX_BATCH) as pool:
+        single = list(pool.map(lambda profile: body(main.predict(main.ProfileInput(skills=profile), request())),
+                               profiles))
+    batch = main.BatchProfileInput(profiles=[main.ProfileInput(skills=profile) for profile in profiles])
+    batched = body(main.predict_batch(batch, request()))["results"]
+    return sum(a != b for a, b in zip(single, batched))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=0.2, help="Taille du référentiel synthétique (1 = ROME actuel)")
+    parser.add_argument("--profiles", type=int, default=600)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("ARTIFACT_CACHE_DIR", tempfile.mkdtemp(prefix="check_dl_predict_"))
+    os.environ.setdefault("ARTIFACT_OFFLINE", "1")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, synthetic.DL_BACKEND_DIR)
+    import main as dl_main
+
+    tables = synthetic.scaled_referential(args.scale, seed=args.seed)
+    vocab = dl_main.build_vocabularies(synthetic.dl_vocab_csv(tables))
+    model = synthetic.dl_model(vocab["df_jobs"], seed=args.seed)
+    job_matrix = dl_main.build_job_matrix(model, len(vocab["jobs_vocab"]))
+
+    # La moitié des profils contient la compétence d'indice 0, à une position quelconque
+    rng = np.random.default_rng(args.seed)
+    first_skill = next(code for code, index in vocab["skills_vocab"].items() if index == 0)
+    profiles = [[code for code in profile if code in vocab["skills_vocab"]]
+                for profile in synthetic.sample_profiles(tables, args.profiles, seed=args.seed)]
+    profiles = [profile for profile in profiles if profile]
+    for profile in profiles[::2]:
+        if first_skill not in profile:
+            profile.insert(int(rng.integers(0, len(profile) + 1)), first_skill)
+    # Un profil sur trois répète une de ses compétences (dédoublonnage par /predict et /predict_batch)
+    for profile in profiles[::3]:
+        profile.append(profile[int(rng.integers(0, len(profile)))])
+
+    failures = 0
+    mismatches = check_encoding(dl_main, model, job_matrix, vocab, profiles, args.batch_size)
+    print(f"encodage seul / en lot de {args.batch_size} : {mismatches} profil(s) sur {len(profiles)} différent(s)")
+    failures += mismatches
+
+    mismatches, mean_batch = check_micro_batching(dl_main, model, job_matrix, vocab, profiles, dl_main.PREDICT_MAX_BATCH)
+    print(f"micro-batching (PREDICT_MAX_BATCH={dl_main.PREDICT_MAX_BATCH}, lots de {mean_batch:.1f} en moyenne) : "
+          f"{mismatches} profil(s) sur {len(profiles)} différent(s)")
+    failures += mismatches
+
+    mismatches = check_endpoints(dl_main, model, job_matrix, vocab, profiles)
+    print(f"/predict vs /predict_batch : {mismatches} profil(s) sur {len(profiles)} différent(s)")
+    failures += mismatches
+
+    if failures:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
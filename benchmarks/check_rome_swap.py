@@ -0,0 +1,141 @@
+"""
+Contrôle : bascule des tables ROME par import_rome.py
+-----------------------------------------------------
+
+Dans une base Postgres locale, sur une table rome_grand_domaine et les instructions de sql/transform_rome.sql
+qui la concernent, vérifie que :
+    - schéma de chargement : DB_STAGING_SCHEMA égal au schéma en service est refusé, et un schéma existant qui
+      n'a pas été créé par l'import (sans manifeste) n'est pas supprimé par prepare_staging
+    - transformation en erreur : un doublon de clé primaire fait échouer ALTER TABLE ... ADD PRIMARY KEY, la
+      bascule est annulée, la table en service est inchangée et le schéma de chargement est conservé
+    - bascule : sans erreur, la nouvelle table (avec sa clé primaire) remplace la table en service et le schéma
+      de chargement est supprimé
+
+La connexion utilise les variables DB_* habituelles (DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD) : pointer
+vers une base Postgres locale. Les tables sont écrites dans un schéma dédié (--schema, supprimé à la fin) et son
+schéma de chargement. Sort avec un code d'erreur si un contrôle échoue.
+
+Lancement :
+    DB_HOST=localhost DB_NAME=postgres DB_USER=postgres DB_PASSWORD=... python benchmarks/check_rome_swap.py
+"""
+
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+import synthetic
+
+sys.path.insert(0, os.path.join(synthetic.ROOT_DIR, "script", "import_rome"))
+import import_rome  # noqa: E402
+from psycopg2 import sql  # noqa: E402
+
+TABLE = "rome_grand_domaine"
+
+
+def grand_domaine(libelle: str, duplicate: bool = False) -> pd.DataFrame:
+    codes = list("ABCDEFGHIJKLMN") + (["A"] if duplicate else [])
+    return pd.DataFrame({"code_grand_domaine": codes, "libelle_grand_domaine": [f"{libelle} {code}" for code in codes]})
+
+
+def query(statement, params=None):
+    connection = import_rome.connect_db()
+    try:
+        with connection, connection.cursor() as cursor:
+            cursor.execute(statement, params)
+            return cursor.fetchall() if cursor.description else None
+    finally:
+        connection.close()
+
+
+def schema_exists(schema: str) -> bool:
+    return query("SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = %s)", (schema,))[0][0]
+
+
+def live_libelles(schema: str) -> set:
+    return {row[0].split()[0] for row in query(sql.SQL("SELECT libelle_grand_domaine FROM {}").format(
+        sql.Identifier(schema, TABLE)))}
+
+
+def build_staging(staging: str, data_frame: pd.DataFrame) -> list:
+    """Schéma de chargement avec la table à basculer ; retourne les mesures attendues par publish_tables."""
+    connection = import_rome.connect_db()
+    try:
+        with connection, connection.cursor() as cursor:
+            import_rome.prepare_staging(cursor, staging)
+    finally:
+        connection.close()
+    if not import_rome.insert_db_data(TABLE, data_frame, method="copy", schema=staging):
+        raise RuntimeError(f"Échec du chargement de {TABLE}")
+    return [{"table": TABLE, "status": "ok"}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schema", default="check_rome_swap")
+    args = parser.parse_args()
+
+    import_rome.db_schema = args.schema
+    import_rome.STAGING_SCHEMA = None
+    staging = import_rome.staging_schema()
+    # Seules les instructions de transform_rome.sql portant sur la table contrôlée (clé primaire comprise)
+    statements = [statement for statement in import_rome.transform_statements()
+                  if statement.split()[:3] == ["ALTER", "TABLE", TABLE]]
+    import_rome.transform_statements = lambda: statements
+
+    for schema in (staging, args.schema):
+        query(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(schema)))
+    query(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(args.schema)))
+    connection = import_rome.connect_db()
+    with connection, connection.cursor() as cursor:
+        import_rome.read_manifest(cursor)
+    connection.close()
+    import_rome.insert_db_data(TABLE, grand_domaine("ancien"), method="copy")
+
+    checks = {}
+    try:
+        import_rome.STAGING_SCHEMA = args.schema
+        try:
+            import_rome.staging_schema()
+            checks["DB_STAGING_SCHEMA = schéma en service refusé"] = False
+        except ValueError:
+            checks["DB_STAGING_SCHEMA = schéma en service refusé"] = True
+        import_rome.STAGING_SCHEMA = None
+
+        query(sql.SQL("CREATE SCHEMA {}; CREATE TABLE {} (x int)").format(
+            sql.Identifier(staging), sql.Identifier(staging, "autre")))
+        try:
+            build_staging(staging, grand_domaine("nouveau"))
+            checks["schéma existant sans manifeste conservé"] = False
+        except RuntimeError:
+            checks["schéma existant sans manifeste conservé"] = bool(query(
+                "SELECT to_regclass(%s) IS NOT NULL", (f'"{staging}".autre',))[0][0])
+        query(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(staging)))
+
+        timings = build_staging(staging, grand_domaine("nouveau", duplicate=True))
+        published = import_rome.publish_tables(timings, staging)
+        checks["doublon de clé primaire : bascule annulée"] = (
+            not published and live_libelles(args.schema) == {"ancien"} and schema_exists(staging))
+
+        timings = build_staging(staging, grand_domaine("nouveau"))
+        published = import_rome.publish_tables(timings, staging)
+        has_pkey = query("SELECT count(*) FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+                         (f'"{args.schema}".{TABLE}',))[0][0] == 1
+        checks["sans erreur : table basculée avec sa clé primaire"] = (
+            published and live_libelles(args.schema) == {"nouveau"} and has_pkey and not schema_exists(staging))
+    finally:
+        for schema in (staging, args.schema):
+            query(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(schema)))
+        import_rome.init_engine().dispose()
+
+    print()
+    for name, ok in checks.items():
+        print(f"{name} : {'ok' if ok else 'ÉCHEC'}")
+    if not all(checks.values()) or len(checks) < 4:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Contrôle : modules communs aux deux back-ends
+---------------------------------------------
+
+Chaque back-end est construit par Docker depuis son propre répertoire (contexte de build Render) : les modules
+ci-dessous y sont donc copiés à l'identique plutôt que partagés. Ce script vérifie que les deux copies n'ont pas
+divergé et affiche les différences sinon. Toute modification de l'un de ces fichiers doit être reportée dans l'autre
+back-end.
+
+Sort avec un code d'erreur si une copie diffère ou manque.
+
+Lancement :
+    python benchmarks/check_shared_modules.py
+"""
+
+import difflib
+import os
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DL_BACKEND_DIR = os.path.join(ROOT_DIR, "Industrialisation", "back-end")
+ML_BACKEND_DIR = os.path.join(ROOT_DIR, "Industrialisation_ML", "back-end")
+
+SHARED_MODULES = [
+    "artifacts.py",
+    "gunicorn.conf.py",
+    "logs.py",
+    "metrics.py",
+    "result_cache.py",
+    "singleflight.py",
+]
+
+
+def read(path: str):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def main():
+    failures = 0
+    for name in SHARED_MODULES:
+        dl_path = os.path.join(DL_BACKEND_DIR, name)
+        ml_path = os.path.join(ML_BACKEND_DIR, name)
+        dl, ml = read(dl_path), read(ml_path)
+        if dl is None or ml is None:
+            print(f"{name} : absent de {'Industrialisation' if dl is None else 'Industrialisation_ML'}/back-end")
+            failures += 1
+        elif dl != ml:
+            print(f"{name} : les deux copies diffèrent")
+            sys.stdout.writelines(difflib.unified_diff(
+                dl.decode("utf-8").splitlines(keepends=True), ml.decode("utf-8").splitlines(keepends=True),
+                fromfile=f"Industrialisation/back-end/{name}", tofile=f"Industrialisation_ML/back-end/{name}"))
+            failures += 1
+
+    if failures:
+        sys.exit(1)
+    print(f"ok ({len(SHARED_MODULES)} modules identiques)")
+
+
+if __name__ == "__main__":
+    main()
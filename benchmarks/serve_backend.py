@@ -0,0 +1,86 @@
+"""
+Lance un back-end (API DL ou API ML) pour bench_load.py
+--------------------------------------------------------
+
+    python benchmarks/serve_backend.py dl --port 8101 --sqlite /tmp/rome.sqlite
+
+La configuration S3 et DB passe par les variables d'environnement habituelles du back-end
+(S3_ENDPOINT_URL, DB_HOST...). Avec --sqlite, le pool de connexions du back-end est créé
+d'avance sur une copie SQLite des tables rome_*, attachée sous le nom du schéma (radarmetier) :
+les requêtes du back-end s'exécutent sans modification.
+
+Avec --workers N, le back-end est servi par gunicorn selon son gunicorn.conf.py (N workers
+uvicorn, artefacts préchargés dans le maître sauf avec --no-preload).
+"""
+
+import argparse
+import os
+import runpy
+import sys
+
+import uvicorn
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+BACKEND_DIRS = {
+    "dl": os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Industrialisation", "back-end"),
+    "ml": os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Industrialisation_ML", "back-end"),
+}
+
+
+def sqlite_engine(path: str, schema: str, pool_size: int):
+    engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=pool_size,
+                           connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def attach(dbapi_connection, _):
+        dbapi_connection.execute(f"ATTACH DATABASE '{path}' AS {schema}")
+
+    return engine
+
+
+def run_gunicorn(app, backend_dir: str, host: str, port: int, workers: int, preload: bool):
+    from gunicorn.app.base import BaseApplication
+
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    os.environ["PRELOAD"] = "1" if preload else "0"
+    settings = runpy.run_path(os.path.join(backend_dir, "gunicorn.conf.py"))
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for name, value in settings.items():
+                if name in self.cfg.settings:
+                    self.cfg.set(name, value)
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("loglevel", "warning")
+
+        def load(self):
+            return app
+
+    Server().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("backend", choices=sorted(BACKEND_DIRS))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--sqlite", help="Base SQLite contenant les tables rome_*")
+    parser.add_argument("--workers", type=int, help="Nombre de workers gunicorn (sinon un seul processus uvicorn)")
+    parser.add_argument("--no-preload", action="store_true", help="Avec --workers : chaque worker charge ses artefacts")
+    args = parser.parse_args()
+
+    backend_dir = os.path.abspath(BACKEND_DIRS[args.backend])
+    sys.path.insert(0, backend_dir)
+    import main as backend
+
+    if args.sqlite:
+        backend.db_engine = sqlite_engine(os.path.abspath(args.sqlite), backend.DB_SCHEMA, backend.DB_POOL_SIZE)
+    if args.workers:
+        run_gunicorn(backend.app, backend_dir, args.host, args.port, args.workers, preload=not args.no_preload)
+        return
+    uvicorn.run(backend.app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Référentiel ROME synthétique et artefacts associés pour les benchmarks
+-----------------------------------------------------------------------
+
+Génère des tables de la forme des tables `rome_*` utilisées par les back-ends :
+    rome_arborescence_competences   domaine -> macro-compétence -> compétence (code_ogr)
+    rome_referentiel_code_rome      codes ROME et libellés
+    rome_coherence_item             couples (code_rome, code_ogr) ; popularité des compétences en loi de Zipf
+
+puis, à partir de ces tables (synthétiques ou copiées d'une vraie base), les artefacts S3 des deux API :
+    - API DL : df_competence_rome_eda_v2.csv et un JobProfileTransformer aux poids aléatoires (.pt + .json)
+    - API ML : bundle metiers_comp.joblib (X ROME x compétences normalisé, roms, comp2j, libellés)
+"""
+
+import os
+import string
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DL_BACKEND_DIR = os.path.join(ROOT_DIR, "Industrialisation", "back-end")
+ML_BACKEND_DIR = os.path.join(ROOT_DIR, "Industrialisation_ML", "back-end")
+
+# Ordre de grandeur du référentiel ROME actuel (1x)
+BASE_N_SKILLS = 15000
+BASE_N_JOBS = 1600
+
+DL_VOCAB_CSV = "df_competence_rome_eda_v2.csv"
+
+
+def rome_code(i: int) -> str:
+    """A0000, A0001, ... Z9999, puis AA0000... au-delà de 260 000 métiers."""
+    letters = ""
+    n = i // 10000
+    while True:
+        letters = string.ascii_uppercase[n % 26] + letters
+        n = n // 26 - 1
+        if n < 0:
+            break
+    return f"{letters}{i % 10000:04d}"
+
+
+def generate_referential(n_skills: int = BASE_N_SKILLS, n_jobs: int = BASE_N_JOBS, skills_per_job: int = 45,
+                         n_domaines: int = 14, macros_per_domaine: int = 12, seed: int = 0) -> dict:
+    """Tables rome_* synthétiques : {nom de table: DataFrame}."""
+    rng = np.random.default_rng(seed)
+    codes_ogr = np.arange(100000, 100000 + n_skills)
+
+    n_macros = n_domaines * macros_per_domaine
+    macro_of_skill = rng.integers(0, n_macros, size=n_skills)
+    arborescence = pd.DataFrame({
+        "code_domaine_competence": (macro_of_skill // macros_per_domaine + 1).astype(str),
+        "domaine_competence": [f"Domaine {m // macros_per_domaine + 1:02d}" for m in macro_of_skill],
+        "code_macro_competence": (macro_of_skill + 1).astype(str),
+        "libelle_macro_competence": [f"Macro-compétence {m + 1:04d}" for m in macro_of_skill],
+        "code_ogr_competence": codes_ogr.astype(str),
+        "libelle_competence": [f"Compétence {c}" for c in codes_ogr],
+    })
+
+    referentiel = pd.DataFrame({
+        "code_rome": [rome_code(i) for i in range(n_jobs)],
+        "libelle_rome": [f"Métier {i:06d}" for i in range(n_jobs)],
+    })
+
+    # Quelques compétences transverses très partagées, une longue traîne de compétences rares
+    skills = rng.zipf(1.3, size=n_jobs * skills_per_job) % n_skills
+    coherence = pd.DataFrame({
+        "code_rome": np.repeat(referentiel["code_rome"].to_numpy(), skills_per_job),
+        "code_ogr": codes_ogr[skills].astype(str),
+    }).drop_duplicates(ignore_index=True)
+
+    return {
+        "rome_arborescence_competences": arborescence,
+        "rome_referentiel_code_rome": referentiel,
+        "rome_coherence_item": coherence,
+    }
+
+
+def scaled_referential(scale: float, seed: int = 0, **kwargs) -> dict:
+    """Référentiel de `scale` fois la taille actuelle (compétences et métiers)."""
+    return generate_referential(int(BASE_N_SKILLS * scale), int(BASE_N_JOBS * scale), seed=seed, **kwargs)
+
+
+def competence_rome(tables: dict) -> pd.DataFrame:
+    """Jointure arborescence x cohérence x référentiel, comme la requête de load_df_competence."""
+    return (
+        tables["rome_arborescence_competences"]
+        .merge(tables["rome_coherence_item"], left_on="code_ogr_competence", right_on="code_ogr")
+        .merge(tables["rome_referentiel_code_rome"], on="code_rome")
+        .drop(columns="code_ogr")
+    )
+
+
+# ---------------------------
+# Artefacts de l'API DL
+# ---------------------------
+
+def dl_vocab_csv(tables: dict) -> pd.DataFrame:
+    """Contenu de df_competence_rome_eda_v2.csv (une ligne par couple compétence / ROME)."""
+    return competence_rome(tables)[["code_ogr_competence", "libelle_competence", "code_rome", "libelle_rome"]]
+
+
+def dl_model(vocab: pd.DataFrame, emb_dim: int = 64, seed: int = 0):
+    """JobProfileTransformer aux poids aléatoires, aux dimensions des vocabulaires construits par load_vocabularies."""
+    import torch
+    sys.path.insert(0, DL_BACKEND_DIR)
+    from model import JobProfileTransformer
+
+    torch.manual_seed(seed)
+    n_skills = vocab["code_ogr_competence"].nunique()
+    n_jobs = vocab["code_rome"].nunique()
+    return JobProfileTransformer(n_skills, n_jobs, emb_dim=emb_dim).eval()
+
+
+def write_dl_artifacts(tables: dict, out_dir: str, model_name: str = "modele_bench", emb_dim: int = 64) -> dict:
+    """Écrit le CSV des vocabulaires et le modèle exporté (state_dict + config) ; retourne {clé S3: chemin}."""
+    sys.path.insert(0, DL_BACKEND_DIR)
+    from model import export_model
+
+    os.makedirs(out_dir, exist_ok=True)
+    vocab = dl_vocab_csv(tables)
+    paths = {DL_VOCAB_CSV: os.path.join(out_dir, DL_VOCAB_CSV),
+             f"{model_name}.pt": os.path.join(out_dir, f"{model_name}.pt"),
+             f"{model_name}.json": os.path.join(out_dir, f"{model_name}.json")}
+    vocab.to_csv(paths[DL_VOCAB_CSV], index=False)
+    export_model(dl_model(vocab, emb_dim=emb_dim), paths[f"{model_name}.pt"], paths[f"{model_name}.json"])
+    return paths
+
+
+# ---------------------------
+# Artefacts de l'API ML
+# ---------------------------
+
+def ml_bundle(tables: dict, seed: int = 0) -> dict:
+    """Bundle au format de metiers_comp.joblib : X (ROME x compétences, lignes normalisées L2) et dictionnaires."""
+    rng = np.random.default_rng(seed)
+    arborescence = tables["rome_arborescence_competences"]
+    referentiel = tables["rome_referentiel_code_rome"]
+    coherence = tables["rome_coherence_item"]
+
+    roms = referentiel["code_rome"].tolist()
+    comp2j = {code: j for j, code in enumerate(arborescence["code_ogr_competence"])}
+    rows = coherence["code_rome"].map({code: i for i, code in enumerate(roms)}).to_numpy()
+    cols = coherence["code_ogr"].map(comp2j).to_numpy()
+    X = csr_matrix((rng.random(len(rows)) + 0.1, (rows, cols)), shape=(len(roms), len(comp2j)))
+    return {
+        "X": normalize(X, norm="l2"),
+        "roms": roms,
+        "comp2j": comp2j,
+        "rom_lbl": dict(zip(referentiel["code_rome"], referentiel["libelle_rome"])),
+        "comp_lbl": dict(zip(arborescence["code_ogr_competence"], arborescence["libelle_competence"])),
+    }
+
+
+def write_ml_artifacts(tables: dict, out_dir: str, key: str = "metiers_comp.joblib") -> dict:
+    import joblib
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, key)
+    joblib.dump(ml_bundle(tables), path)
+    return {key: path}
+
+
+# ---------------------------
+# Profils de requêtes
+# ---------------------------
+
+def sample_profiles(tables: dict, n: int, min_skills: int = 3, max_skills: int = 10, seed: int = 0) -> list:
+    """
+    Profils réalistes : l'utilisateur choisit un domaine puis une macro-compétence et coche quelques
+    compétences, avec une préférence pour les plus fréquentes (les mêmes combinaisons reviennent).
+    """
+    rng = np.random.default_rng(seed)
+    arborescence = tables["rome_arborescence_competences"]
+    by_macro = arborescence.groupby("libelle_macro_competence")["code_ogr_competence"].apply(list)
+    macros = by_macro.index.to_numpy()
+    macro_weights = 1.0 / np.arange(1, len(macros) + 1)
+    macro_weights /= macro_weights.sum()
+
+    profiles = []
+    for _ in range(n):
+        codes = by_macro[macros[rng.choice(len(macros), p=macro_weights)]]
+        size = int(rng.integers(min_skills, max_skills + 1))
+        weights = 1.0 / np.arange(1, len(codes) + 1)
+        picks = rng.choice(len(codes), size=min(size, len(codes)), replace=False, p=weights / weights.sum())
+        profiles.append([codes[i] for i in sorted(picks)])
+    return profiles
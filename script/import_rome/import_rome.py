@@ -68,10 +68,18 @@ def read_csv_from_s3(file_path: str, bucket_name: str = S3_BUCKET) -> pd.DataFra
 
 
 import psycopg2
+from psycopg2 import sql
 from dotenv import load_dotenv
 import pandas as pd
+import codecs
+import hashlib
 import io
+import itertools
 import os, fnmatch
+import re
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import boto3
 from sqlalchemy import create_engine
 
@@ -96,6 +104,43 @@ S3_BUCKET = "raw-data"
 
 S3_ROME_FOLDER = "CodeROME/RefRomeCsv"
 
+# Nombre de fichiers téléchargés et lus en parallèle, et de tables chargées en parallèle (une connexion DB chacune)
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", "4"))
+# Chargement des tables : 'copy' (COPY ... FROM STDIN) ou 'to_sql' (INSERT paramétrés de pandas, ancienne méthode)
+LOAD_METHOD = os.getenv("LOAD_METHOD", "copy")
+# Lignes envoyées par commande COPY : seul le CSV d'un bloc est construit en mémoire
+COPY_CHUNK_ROWS = int(os.getenv("COPY_CHUNK_ROWS", "100000"))
+# Lecture en flux des fichiers S3 : lignes parsées par bloc (un seul bloc en mémoire par fichier en cours),
+# octets lus en tête de fichier pour détecter l'encodage, taille des lectures réseau
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "50000"))
+ENCODING_SNIFF_BYTES = int(os.getenv("ENCODING_SNIFF_BYTES", str(1024 * 1024)))
+STREAM_BUFFER_BYTES = 1024 * 1024
+
+# Import incrémental : table du manifeste (dernier fichier chargé dans chaque table, version, ETag, empreinte du contenu)
+MANIFEST_TABLE = "rome_import_manifest"
+# Clés primaires des tables ROME (sql/transform_rome.sql) : les fichiers modifiés sont appliqués par clé
+# (suppression, mise à jour et insertion des lignes modifiées) ; sans clé, le contenu de la table est remplacé
+ROME_PRIMARY_KEYS = {
+    'grand_domaine': ['code_grand_domaine'],
+    'domaine_professionnel': ['code_domaine_professionnel'],
+    'referentiel_appellation': ['code_ogr'],
+    'referentiel_code_rome': ['code_rome'],
+    'item': ['code_ogr'],
+    'centre_interet': ['code_centre_interet'],
+    'descriptif_rubrique': ['code_rubrique'],
+    'referentiel_competence': ['code_ogr']}
+# Schéma de chargement : les tables y sont chargées et transformées (sql/transform_rome.sql) puis basculées dans
+# DB_SCHEMA en une courte transaction (DB_SCHEMA + '_staging' par défaut). La bascule attend au plus
+# SWAP_LOCK_TIMEOUT la fin des requêtes en cours sur les tables (API) et est retentée SWAP_RETRIES fois.
+STAGING_SCHEMA = os.getenv("DB_STAGING_SCHEMA")
+SWAP_LOCK_TIMEOUT = os.getenv("SWAP_LOCK_TIMEOUT", "5s")
+SWAP_RETRIES = int(os.getenv("SWAP_RETRIES", "5"))
+TRANSFORM_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql", "transform_rome.sql")
+# Colonnes ajoutées par sql/transform_rome.sql, recalculées pour les lignes insérées ou mises à jour
+ROME_DERIVED_COLUMNS = {
+    'domaine_professionnel': {'code_grand_domaine': "LEFT(s.code_domaine_professionnel, 1)"},
+    'referentiel_appellation': {'code_domaine_professionnel': "LEFT(s.code_rome, 3)"}}
+
 # Check settings (for debug session only)
 if __debug__:
     print('Debug ON')
@@ -129,25 +174,96 @@ s3_client = boto3.client(
 # 3. Déclaration des fonctions d'accès au S3
 # =================================================================================
 
-def read_csv_from_s3(file_path: str, bucket_name: str = S3_BUCKET, encoding:str ='utf-8') -> pd.DataFrame:
-    """Charge un CSV depuis un bucket S3 dans un DataFrame pandas."""
-    response = s3_client.get_object(Bucket=bucket_name, Key=file_path)
-    return pd.read_csv(io.BytesIO(response["Body"].read()), dtype=str, encoding=encoding)
-    # try:
-    #     return pd.read_csv(io.BytesIO(response["Body"].read()), dtype=str, encoding=encoding)
-    # except Exception:
-    #     return pd.DataFrame()
-
-def list_bucket_file(Bucket: str, Folder: str, Ext:str = None) -> list: 
+class S3BodyReader(io.RawIOBase):
+    """Flux binaire sur le corps d'un objet S3 : rejoue d'abord les octets déjà lus (détection de l'encodage)."""
+
+    def __init__(self, head: bytes, body, digest=None):
+        self.head = head
+        self.body = body
+        # Empreinte du contenu (hashlib), calculée au fil de la lecture
+        self.digest = digest
+        if digest is not None:
+            digest.update(head)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.head:
+            size = min(len(buffer), len(self.head))
+            buffer[:size] = self.head[:size]
+            self.head = self.head[size:]
+            return size
+        data = self.body.read(len(buffer))
+        buffer[:len(data)] = data
+        if self.digest is not None:
+            self.digest.update(data)
+        return len(data)
+
+    def close(self):
+        self.body.close()
+        super().close()
+
+def detect_encoding(head: bytes) -> str:
+    """UTF-8 si le début du fichier est de l'UTF-8 valide (un caractère coupé en fin de bloc est toléré), sinon ANSI."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "windows-1252"
+
+def open_csv_from_s3(file_path: str, bucket_name: str = S3_BUCKET, encoding: str = None, digest=None):
+    """Ouvre l'objet S3 en flux (un seul téléchargement) ; retourne le flux et son encodage, détecté sur le premier bloc."""
+    body = s3_client.get_object(Bucket=bucket_name, Key=file_path)["Body"]
+    head = body.read(ENCODING_SNIFF_BYTES)
+    encoding = encoding or detect_encoding(head)
+    return io.BufferedReader(S3BodyReader(head, body, digest), buffer_size=STREAM_BUFFER_BYTES), encoding
+
+def read_csv_chunks_from_s3(file_path: str, bucket_name: str = S3_BUCKET, encoding: str = None,
+                            chunk_rows: int = None, digest=None):
+    """Lit un CSV du bucket S3 par DataFrames de chunk_rows lignes au plus, au fil du téléchargement."""
+    stream, encoding = open_csv_from_s3(file_path, bucket_name, encoding, digest)
+    print("Extract", encoding, "data from file:", file_path)
+    with stream, pd.read_csv(stream, dtype=str, encoding=encoding, chunksize=chunk_rows or CSV_CHUNK_ROWS) as reader:
+        yield from reader
+
+def read_csv_from_s3(file_path: str, bucket_name: str = S3_BUCKET, encoding: str = None) -> pd.DataFrame:
+    """Charge un CSV depuis un bucket S3 dans un DataFrame pandas (encodage détecté si non précisé)."""
+    stream, encoding = open_csv_from_s3(file_path, bucket_name, encoding)
+    with stream:
+        return pd.read_csv(stream, dtype=str, encoding=encoding)
+
+def list_bucket_objects(Bucket: str, Folder: str, Ext:str = None) -> dict:
+    """Fichiers du dossier : {nom du fichier: {"key", "etag", "version"}} (version lue dans le nom, '_v459_')."""
     response = s3_client.list_objects_v2(Bucket= Bucket, Prefix= Folder)
-    file_list = []
-    for obj in response["Contents"]:
+    objects = {}
+    for obj in response.get("Contents", []):
         key = obj["Key"]
         if Ext is None or key.lower().endswith(Ext):
-            file_list.append(key.split("/")[-1])
-    return file_list
+            file_name = key.split("/")[-1]
+            objects[file_name] = {"key": key, "etag": obj["ETag"].strip('"'), "version": rome_file_version(file_name)}
+    return objects
+
+def list_bucket_file(Bucket: str, Folder: str, Ext:str = None) -> list: 
+    return list(list_bucket_objects(Bucket, Folder, Ext))
 
 
+def rome_file_name(csv_file: str) -> str:
+    """'unix_domaine_professionnel_v458_utf8.csv' -> 'domaine_professionnel' ('' si le nom n'a pas ce format)."""
+    try:
+        # Remove 'unix_' at beginning and '_v4xx_utf8.csv' at the end of file name
+        return csv_file.split('unix_', 1)[1].rsplit('_v', 1)[0]
+    except Exception as e:
+        print(e)
+        return ''
+
+def rome_file_version(csv_file: str):
+    """'unix_domaine_professionnel_v458_utf8.csv' -> 458 (None si le nom ne porte pas de version)."""
+    match = re.search(r"_v(\d+)_", csv_file)
+    return int(match.group(1)) if match else None
+
 def set_current_file(csv_file):
     global current_file_path
     global current_file_name
@@ -155,19 +271,32 @@ def set_current_file(csv_file):
     current_file_path = os.path.join(data_path, csv_file)
     if __debug__:
         print("Current file path is now:", current_file_path)
-    try:
-        # Remove 'unix_' at beginning and '_v4xx_utf8.csv' at the end of file name
-        current_file_name = csv_file.split('unix_', 1)[1].rsplit('_v', 1)[0] # 'unix_domaine_professionnel_v458_utf8.csv'
-    except Exception as e:
-        current_file_name = ''
-        print(e)
+    current_file_name = rome_file_name(csv_file)
 
 #df_test = read_csv_from_s3("CodeROME/RefRomeCsv/unix_arborescence_centre_interet_v459_utf8.csv")
-print("Test lecture - Nb fichiers=", len(list_bucket_file(S3_BUCKET, S3_ROME_FOLDER, ".csv")))
 
 # =================================================================================
 # 4. Déclaration des fonctions d'accès à la DB
 # =================================================================================
+def connect_db():
+    """Nouvelle connexion psycopg2 à la base (paramètres DB_* du fichier .env)."""
+    return psycopg2.connect(
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"))
+
+db_engine = None
+
+def init_engine(pool_size: int = 1):
+    """Moteur SQLAlchemy partagé par les chargements : une connexion (créée par connect_db) par chargement en cours."""
+    global db_engine
+    if db_engine is None:
+        db_engine = create_engine("postgresql+psycopg2://", creator=connect_db, pool_size=pool_size, max_overflow=0,
+                                  pool_pre_ping=True)
+    return db_engine
+
 def init_db():
     global db_connection
     global db_cursor
@@ -178,12 +307,7 @@ def init_db():
 
     # Connect to an existing database
     try:
-        db_connection = psycopg2.connect(
-            host=os.getenv("DB_HOST"),
-            port=os.getenv("DB_PORT"),
-            database=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"))
+        db_connection = connect_db()
 
     except Exception as e:
         print(e)
@@ -199,69 +323,562 @@ def init_db():
     
     return True # Connection success
 
-def insert_db_data(table_name, data_frame):
+# Types PostgreSQL par type de colonne pandas (les CSV ROME sont lus en str : TEXT, comme avec to_sql)
+PG_TYPES = {"i": "BIGINT", "u": "BIGINT", "f": "DOUBLE PRECISION", "b": "BOOLEAN", "M": "TIMESTAMP"}
+
+def column_types(data_frame) -> list:
+    return [(str(name), PG_TYPES.get(dtype.kind, "TEXT")) for name, dtype in data_frame.dtypes.items()]
+
+def frame_chunks(data_frames, chunk_rows: int):
+    """DataFrame découpé en blocs de chunk_rows lignes, ou itérable de blocs (lecture en flux) passé tel quel."""
+    if isinstance(data_frames, pd.DataFrame):
+        return (data_frames.iloc[start:start + chunk_rows] for start in range(0, max(1, len(data_frames)), chunk_rows))
+    return data_frames
+
+def copy_chunks(cursor, table, data_frames, temporary: bool = False) -> int:
+    """
+    Crée `table` avec les types du premier bloc puis y copie les blocs (COPY ... FROM STDIN au format CSV).
+    La table est créée avant la copie même si aucun bloc n'est lu (table vide, sans colonnes).
+    """
+    copy = sql.SQL("COPY {} FROM STDIN WITH (FORMAT csv)").format(table)
+    create = sql.SQL("CREATE TEMPORARY TABLE {} ({}) ON COMMIT DROP" if temporary else "CREATE TABLE {} ({})")
+    chunks = iter(frame_chunks(data_frames, COPY_CHUNK_ROWS))
+    first = next(chunks, None)
+    columns = sql.SQL(", ").join(sql.SQL("{} {}").format(sql.Identifier(name), sql.SQL(pg_type))
+                                 for name, pg_type in (column_types(first) if first is not None else []))
+    cursor.execute(create.format(table, columns))
+    rows = 0
+    for data_frame in itertools.chain([first] if first is not None else [], chunks):
+        if len(data_frame) == 0:
+            continue
+        buffer = io.StringIO()
+        data_frame.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(copy, buffer)
+        rows += len(data_frame)
+    return rows
+
+def copy_db_data(connection, table_name, data_frames, schema: str = None) -> int:
+    """
+    Recrée la table avec des types explicites (ceux du premier bloc) puis y copie les données bloc par bloc
+    (COPY ... FROM STDIN au format CSV), le tout dans une seule transaction. `data_frames` est un DataFrame,
+    découpé en blocs de COPY_CHUNK_ROWS lignes, ou un itérable de DataFrames consommé au fil de l'eau.
+    Retourne le nombre de lignes copiées.
+    """
+    table = sql.Identifier(schema or db_schema, table_name)
+
+    # Validée à la sortie du bloc, annulée si une commande échoue : la table n'est jamais vue à moitié chargée
+    with connection, connection.cursor() as cursor:
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(table))
+        return copy_chunks(cursor, table, data_frames)
+
+# ---------------------------
+# Manifeste et import incrémental
+# ---------------------------
+
+def read_manifest(cursor, create: bool = True) -> dict:
+    """Dernier chargement de chaque table : {table: ligne du manifeste, avec table_exists}. Crée le manifeste si besoin."""
+    manifest = sql.Identifier(db_schema, MANIFEST_TABLE)
+    if create:
+        cursor.execute(sql.SQL("""CREATE TABLE IF NOT EXISTS {} (
+            table_name TEXT PRIMARY KEY,
+            source_key TEXT NOT NULL,
+            version INTEGER,
+            etag TEXT,
+            content_hash TEXT,
+            row_count BIGINT,
+            loaded_at TIMESTAMPTZ NOT NULL DEFAULT now())""").format(manifest))
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (manifest.as_string(cursor),))
+    if not cursor.fetchone()[0]:
+        return {}
+    cursor.execute(sql.SQL("""SELECT *, to_regclass(format('%%I.%%I', %s, table_name)) IS NOT NULL AS table_exists
+                              FROM {}""").format(manifest), (db_schema,))
+    columns = [column.name for column in cursor.description]
+    return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+def record_manifest(cursor, table_name: str, source: dict, content_hash: str, row_count: int, schema: str = None):
+    cursor.execute(sql.SQL("""INSERT INTO {} (table_name, source_key, version, etag, content_hash, row_count, loaded_at)
+        VALUES (%s, %s, %s, %s, %s, %s, now())
+        ON CONFLICT (table_name) DO UPDATE SET source_key = EXCLUDED.source_key, version = EXCLUDED.version,
+            etag = EXCLUDED.etag, content_hash = EXCLUDED.content_hash, row_count = EXCLUDED.row_count,
+            loaded_at = EXCLUDED.loaded_at""").format(sql.Identifier(schema or db_schema, MANIFEST_TABLE)),
+        (table_name, source["key"], source["version"], source["etag"], content_hash, row_count))
+
+def is_unchanged(source: dict, previous: dict) -> bool:
+    """Même fichier (clé S3) et même ETag que lors du dernier chargement, table toujours présente : rien à télécharger."""
+    return (previous is not None and previous["table_exists"] and previous["source_key"] == source["key"]
+            and previous["etag"] == source["etag"])
+
+def table_columns(cursor, table) -> dict:
+    """Colonnes de la table et leur type SQL ({} si la table n'existe pas)."""
+    cursor.execute("""SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute
+                      WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped ORDER BY attnum""",
+                   (table.as_string(cursor),))
+    return dict(cursor.fetchall())
+
+def keyed_changes(cursor, target, staging, columns: list, types: dict, key: list, derived: dict,
+                  dry_run: bool) -> dict:
+    """Compare la table à la copie du fichier par clé primaire, puis supprime, met à jour et insère les lignes modifiées."""
+    def source(name):
+        return sql.SQL("CAST({} AS {})").format(sql.Identifier("s", name), sql.SQL(types[name]))
+
+    values = [name for name in columns if name not in key]
+    match = sql.SQL(" AND ").join(sql.SQL("{} = {}").format(sql.Identifier("t", name), source(name)) for name in key)
+    differs = sql.SQL("({}) IS DISTINCT FROM ({})").format(
+        sql.SQL(", ").join(sql.Identifier("t", name) for name in values),
+        sql.SQL(", ").join(source(name) for name in values)) if values else sql.SQL("FALSE")
+    new_rows = sql.SQL("NOT EXISTS (SELECT 1 FROM {} t WHERE {})").format(target, match)
+    old_rows = sql.SQL("NOT EXISTS (SELECT 1 FROM {} s WHERE {})").format(staging, match)
+    computed = [sql.SQL("CAST(({}) AS {})").format(sql.SQL(expression), sql.SQL(types[name]))
+                for name, expression in derived.items()]
+
+    cursor.execute(sql.SQL("""SELECT (SELECT count(*) FROM {staging} s WHERE {new_rows}),
+                                     (SELECT count(*) FROM {staging} s JOIN {target} t ON {match} WHERE {differs}),
+                                     (SELECT count(*) FROM {target} t WHERE {old_rows})""").format(
+        staging=staging, target=target, new_rows=new_rows, match=match, differs=differs, old_rows=old_rows))
+    inserted, updated, deleted = cursor.fetchone()
+
+    if not dry_run:
+        if deleted:
+            cursor.execute(sql.SQL("DELETE FROM {} t WHERE {}").format(target, old_rows))
+        if updated:
+            assignments = [sql.SQL("{} = {}").format(sql.Identifier(name), source(name)) for name in values]
+            assignments += [sql.SQL("{} = {}").format(sql.Identifier(name), expression)
+                            for name, expression in zip(derived, computed)]
+            cursor.execute(sql.SQL("UPDATE {} t SET {} FROM {} s WHERE {} AND {}").format(
+                target, sql.SQL(", ").join(assignments), staging, match, differs))
+        if inserted:
+            cursor.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} s WHERE {}").format(
+                target, sql.SQL(", ").join(sql.Identifier(name) for name in [*columns, *derived]),
+                sql.SQL(", ").join([*(source(name) for name in columns), *computed]), staging, new_rows))
+    return {"inserted": inserted, "updated": updated, "deleted": deleted}
+
+def row_changes(cursor, target, staging, columns: list, types: dict, derived: dict, dry_run: bool) -> dict:
+    """Table sans clé primaire : lignes ajoutées et retirées (comparaison des lignes entières), puis remplacement du contenu."""
+    source_rows = sql.SQL("SELECT {} FROM {} s").format(
+        sql.SQL(", ").join(sql.SQL("CAST({} AS {})").format(sql.Identifier("s", name), sql.SQL(types[name]))
+                           for name in columns), staging)
+    target_rows = sql.SQL("SELECT {} FROM {} t").format(
+        sql.SQL(", ").join(sql.Identifier("t", name) for name in columns), target)
+    cursor.execute(sql.SQL("""SELECT (SELECT count(*) FROM ({source} EXCEPT ALL {target}) AS added),
+                                     (SELECT count(*) FROM ({target} EXCEPT ALL {source}) AS removed)""").format(
+        source=source_rows, target=target_rows))
+    inserted, deleted = cursor.fetchone()
+
+    if not dry_run and (inserted or deleted):
+        # Index et clés étrangères de la table conservés ; les lecteurs voient l'ancien contenu jusqu'au commit
+        cursor.execute(sql.SQL("DELETE FROM {}").format(target))
+        cursor.execute(sql.SQL("INSERT INTO {} ({}) {}").format(
+            target, sql.SQL(", ").join(sql.Identifier(name) for name in [*columns, *derived]),
+            sql.SQL("SELECT {} FROM {} s").format(sql.SQL(", ").join(
+                [sql.SQL("CAST({} AS {})").format(sql.Identifier("s", name), sql.SQL(types[name])) for name in columns]
+                + [sql.SQL("CAST(({}) AS {})").format(sql.SQL(expression), sql.SQL(types[name]))
+                   for name, expression in derived.items()]), staging)))
+    return {"inserted": inserted, "updated": 0, "deleted": deleted}
+
+def refresh_db_table(connection, table_name: str, data_frames, source: dict, previous: dict = None,
+                     dry_run: bool = False, schema: str = None) -> dict:
+    """
+    Applique un fichier à sa table, dans une seule transaction : le fichier est copié en flux dans une table
+    temporaire, comparé à la table existante (par clé primaire, ROME_PRIMARY_KEYS, sinon ligne à ligne), puis
+    seules les lignes modifiées sont écrites et le manifeste est mis à jour. Une table absente est créée ; une
+    table dont les colonnes ne correspondent plus au fichier est remplacée. En simulation (dry_run), la
+    transaction est annulée. `schema` : schéma de la table et du manifeste (db_schema par défaut).
+    Retourne le statut et le nombre de lignes insérées, mises à jour et supprimées.
+    """
+    rome_name = table_name[len(table_prefix):] if table_name.startswith(table_prefix) else table_name
+    target = sql.Identifier(schema or db_schema, table_name)
+    staging = sql.Identifier("import_" + table_name)
+
+    with connection, connection.cursor() as cursor:
+        rows = copy_chunks(cursor, staging, data_frames, temporary=True)
+        cursor.execute(sql.SQL("ANALYZE {}").format(staging))
+        content_hash = source["digest"].hexdigest()
+        columns = list(table_columns(cursor, staging))
+        types = table_columns(cursor, target)
+        derived = {name: expression for name, expression in ROME_DERIVED_COLUMNS.get(rome_name, {}).items()
+                   if name in types}
+        key = ROME_PRIMARY_KEYS.get(rome_name)
+
+        if types and previous is not None and previous["content_hash"] == content_hash:
+            changes = {"status": "inchangé", "inserted": 0, "updated": 0, "deleted": 0}
+        elif not types or set(types) - set(derived) != set(columns):
+            deleted = 0
+            if types:
+                cursor.execute(sql.SQL("SELECT count(*) FROM {}").format(target))
+                deleted = cursor.fetchone()[0]
+            changes = {"status": "remplacé" if types else "nouveau", "inserted": rows, "updated": 0, "deleted": deleted}
+            if not dry_run:
+                cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(target))
+                cursor.execute(sql.SQL("CREATE TABLE {} AS TABLE {}").format(target, staging))
+        elif key and set(key) <= set(columns):
+            changes = {"status": "modifié", **keyed_changes(cursor, target, staging, columns, types, key, derived, dry_run)}
+        else:
+            changes = {"status": "modifié", **row_changes(cursor, target, staging, columns, types, derived, dry_run)}
+
+        if dry_run:
+            connection.rollback()
+        else:
+            record_manifest(cursor, table_name, source, content_hash, rows, schema)
+    changes["rows"] = rows
+    return changes
+
+# ---------------------------
+# Schéma de chargement et bascule
+# ---------------------------
+
+def staging_schema() -> str:
+    """Schéma de chargement (DB_STAGING_SCHEMA, db_schema + _staging par défaut), toujours distinct de db_schema."""
+    schema = STAGING_SCHEMA or f"{db_schema}_staging"
+    if schema == db_schema:
+        raise ValueError(f"DB_STAGING_SCHEMA={schema} : le schéma de chargement doit être distinct du schéma en service")
+    return schema
+
+def prepare_staging(cursor, schema: str):
+    """
+    Recrée le schéma de chargement avec une copie du manifeste, mise à jour par l'import et basculée avec les tables.
+    Un schéma existant n'est supprimé que s'il a été créé par l'import (il contient le manifeste).
+    """
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = %s)", (schema,))
+    if cursor.fetchone()[0] and not table_columns(cursor, sql.Identifier(schema, MANIFEST_TABLE)):
+        raise RuntimeError(f"Le schéma {schema} existe mais n'a pas été créé par l'import (pas de {MANIFEST_TABLE}) : "
+                           "non supprimé, corriger DB_STAGING_SCHEMA")
+    cursor.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(schema)))
+    cursor.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(schema)))
+    cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING ALL)").format(
+        sql.Identifier(schema, MANIFEST_TABLE), sql.Identifier(db_schema, MANIFEST_TABLE)))
+    cursor.execute(sql.SQL("INSERT INTO {} SELECT * FROM {}").format(
+        sql.Identifier(schema, MANIFEST_TABLE), sql.Identifier(db_schema, MANIFEST_TABLE)))
+
+def clone_db_table(connection, table_name: str, schema: str) -> bool:
+    """Copie la table en service (données et types, sans index ni contraintes) dans le schéma de chargement."""
+    live = sql.Identifier(db_schema, table_name)
+    with connection, connection.cursor() as cursor:
+        if not table_columns(cursor, live):
+            return False
+        cursor.execute(sql.SQL("CREATE TABLE {} AS TABLE {}").format(sql.Identifier(schema, table_name), live))
+    return True
+
+def transform_statements(path: str = TRANSFORM_SQL) -> list:
+    """Instructions de sql/transform_rome.sql, sans les commentaires ni le choix du schéma (search_path)."""
+    with open(path, encoding="utf-8") as f:
+        script = "".join(line for line in f if not line.lstrip().startswith("--"))
+    statements = [statement.strip() for statement in script.split(";")]
+    return [statement for statement in statements
+            if statement and not re.match(r"SET\s+search_path\b", statement, re.IGNORECASE)]
+
+def transform_db_tables(connection, schema: str, table_names: list) -> list:
+    """
+    Applique sql/transform_rome.sql au schéma de chargement (clés primaires, index, colonnes calculées, clés
+    étrangères), dans une transaction, puis met à jour les statistiques des tables. Comme avec psql, une
+    instruction en erreur est signalée et ignorée (point de sauvegarde) sans arrêter les suivantes.
+    Retourne les erreurs.
+    """
+    errors = []
+    with connection, connection.cursor() as cursor:
+        cursor.execute(sql.SQL("SET LOCAL search_path TO {}").format(sql.Identifier(schema)))
+        for statement in transform_statements():
+            cursor.execute("SAVEPOINT transform")
+            try:
+                cursor.execute(statement)
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT transform")
+                errors.append(f"{statement.splitlines()[0]} -> {str(e).strip().splitlines()[0]}")
+            else:
+                cursor.execute("RELEASE SAVEPOINT transform")
+        for table_name in table_names:
+            cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(schema, table_name)))
+    return errors
+
+def swap_db_tables(connection, schema: str, table_names: list) -> float:
+    """
+    Bascule les tables du schéma de chargement dans db_schema, en une transaction qui ne touche que le catalogue :
+    suppression des versions en service puis ALTER TABLE ... SET SCHEMA des nouvelles (avec leurs index et
+    contraintes). Les API lisent l'ancienne ou la nouvelle version de toutes les tables, jamais une table vide
+    ou à moitié chargée. Retourne la durée de la transaction.
+    """
+    live_tables = sql.SQL(", ").join(sql.Identifier(db_schema, table_name) for table_name in table_names)
+    for attempt in range(1, SWAP_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            with connection, connection.cursor() as cursor:
+                # Le verrou exclusif attend les requêtes en cours et bloque les suivantes : attente bornée
+                cursor.execute("SET LOCAL lock_timeout = %s", (SWAP_LOCK_TIMEOUT,))
+                cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(live_tables))
+                for table_name in table_names:
+                    cursor.execute(sql.SQL("ALTER TABLE {} SET SCHEMA {}").format(
+                        sql.Identifier(schema, table_name), sql.Identifier(db_schema)))
+            return time.perf_counter() - start
+        except psycopg2.errors.LockNotAvailable:
+            print(f"Bascule: tables en cours d'utilisation ({attempt}/{SWAP_RETRIES}), nouvel essai")
+            time.sleep(attempt)
+    raise RuntimeError(f"Bascule impossible: verrous non obtenus après {SWAP_RETRIES} essais")
+
+def insert_db_data(table_name, data_frames, method: str = None, schema: str = None) -> bool:
+    """Charge un DataFrame, ou un itérable de blocs d'un même fichier, dans la table (remplacée)."""
     global db_schema
 
-    url = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}"
-    if len(os.getenv('DB_PORT')) > 0:
-        url += f":{os.getenv('DB_PORT')}"
-    if len(os.getenv("DB_NAME")) > 0:
-        url += f"/{os.getenv("DB_NAME")}"
+    schema = schema or db_schema
+    method = method or LOAD_METHOD
     if __debug__:
-        print("URL=", url)
-        print("DB table:", table_name)
+        print("DB table:", table_name, "- méthode:", method)
     try:
-        engine = create_engine(url)
-        data_frame.to_sql(table_name, engine, schema=db_schema, if_exists='replace', index=False)
-        print("Insertion des données dans la DB: ok")
+        if method == "copy":
+            # Connexion psycopg2 du pool (créée par connect_db, comme celle d'init_db)
+            connection = init_engine().raw_connection()
+            try:
+                copy_db_data(connection.driver_connection, table_name, data_frames, schema)
+            finally:
+                connection.close()
+        else:
+            with init_engine().begin() as conn:
+                for index, data_frame in enumerate(frame_chunks(data_frames, COPY_CHUNK_ROWS)):
+                    data_frame.to_sql(table_name, conn, schema=schema, if_exists='replace' if index == 0 else 'append',
+                                      index=False)
+        print(f"Insertion des données dans la DB ({table_name}): ok")
+        return True
     except Exception as e:
         print(e)
+        return False
 
 # =================================================================================
 # 5. Déclaration des fonctions ETL
 # =================================================================================
 
 def extract(src_file):
+    # Un seul téléchargement : l'encodage (UTF-8 ou ANSI) est détecté sur le début du fichier
     try:
-        print("Extract UTF8 data from file:", src_file)
-        #data_frame = pd.read_csv(src_file, encoding='utf-8')
-        data_frame = read_csv_from_s3(src_file, encoding='utf-8')
-        return data_frame
+        return read_csv_from_s3(src_file)
     except Exception as e:
         print(e)
-        try:
-            print("Extract ANSI data from file:", src_file)
-            #data_frame = pd.read_csv(src_file, encoding='windows-1252')
-            data_frame = read_csv_from_s3(src_file, encoding='windows-1252')
-            return data_frame
-        except Exception as e:
-            print(e)
-            
+
     return None
 
+def extract_chunks(src_file, digest=None):
+    """Comme extract, en flux : DataFrames de CSV_CHUNK_ROWS lignes au plus, lus au fil du téléchargement."""
+    return read_csv_chunks_from_s3(src_file, digest=digest)
+
 
 def transform(data_frame):
     # Conserver les colonnes voulues
     return data_frame
 
 
-def load(data_frame):
+def load(data_frame, table_name=None, schema=None):
     global current_file_name
-    
-    insert_db_data(current_file_name, data_frame)
+
+    return insert_db_data(table_name or current_file_name, data_frame, schema=schema)
+
+
+def refresh(data_frames, table_name, source, previous=None, dry_run=False, schema=None):
+    """Import incrémental d'un fichier dans sa table (refresh_db_table) ; None en cas d'erreur."""
+    connection = init_engine().raw_connection()
+    try:
+        return refresh_db_table(connection.driver_connection, table_name, data_frames, source, previous, dry_run,
+                                schema)
+    except Exception as e:
+        print(e)
+        return None
+    finally:
+        connection.close()
+
+
+def stage(table_name, schema, required: bool = True) -> bool:
+    """
+    Copie la table en service dans le schéma de chargement (table inchangée, ou base de l'import incrémental).
+    Échoue si la copie échoue, ou si la table en service est absente alors qu'elle est `required` (table inchangée) ;
+    sans `required`, une table absente sera créée par l'import.
+    """
+    connection = init_engine().raw_connection()
+    try:
+        if not clone_db_table(connection.driver_connection, table_name, schema) and required:
+            print(f"Table en service absente: {db_schema}.{table_name}")
+            return False
+        return True
+    except Exception as e:
+        print(e)
+        return False
+    finally:
+        connection.close()
+
+
+def record_load(table_name, source, row_count, schema=None) -> bool:
+    """Enregistre dans le manifeste un fichier chargé en entier (--full)."""
+    connection = init_engine().raw_connection()
+    try:
+        with connection.driver_connection as conn, conn.cursor() as cursor:
+            record_manifest(cursor, table_name, source, source["digest"].hexdigest(), row_count, schema)
+        return True
+    except Exception as e:
+        print(e)
+        return False
+    finally:
+        connection.close()
 
 
 # =================================================================================
-# 4. Déclaration de la fonction principale
+# 6. Import en pipeline
 # =================================================================================
-def main():
-    global current_file_path
-    global current_file_name
+# Chaque fichier est importé en flux par l'un des `concurrency` threads, sur sa propre connexion :
+# téléchargement, lecture CSV et COPY avancent bloc par bloc (CSV_CHUNK_ROWS lignes), pendant que
+# les autres threads importent les fichiers suivants. La mémoire ne dépend donc pas de la taille
+# des fichiers : au plus un bloc par thread. Le temps d'extract est celui passé à télécharger et
+# lire les blocs, le temps de load celui passé à les copier dans la base.
+# En import incrémental (par défaut), un fichier dont la clé S3 et l'ETag n'ont pas changé depuis son
+# dernier chargement (manifeste) n'est pas téléchargé ; les autres sont appliqués par refresh_db_table.
+# Hors simulation, les tables ne sont pas modifiées en service : elles sont construites dans le schéma de
+# chargement (copie de la table en service, puis fichier appliqué), transformées, puis basculées ensemble.
+
+def timed_chunks(chunks, timing: dict):
+    """Relaie les blocs d'un fichier en cumulant la durée d'extract et le nombre de lignes dans `timing`."""
+    timing["rows"], timing["extract_s"] = 0, 0.0
+    iterator = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        try:
+            data_frame = next(iterator)
+        except StopIteration:
+            return
+        except Exception:
+            timing["status"] = "erreur extract"
+            raise
+        finally:
+            timing["extract_s"] += time.perf_counter() - start
+        timing["rows"] += len(data_frame)
+        yield transform(data_frame)
+
+def import_file(csv_file: str, timing: dict, source: dict, previous: dict = None, incremental: bool = True,
+                dry_run: bool = False, schema: str = None) -> bool:
+    start = time.perf_counter()
+    source = {**source, "digest": hashlib.sha256()}
+    chunks = timed_chunks(extract_chunks(os.path.join(data_path, csv_file), source["digest"]), timing)
+    if incremental:
+        changes = None
+        if schema is None or stage(timing["table"], schema, required=False):
+            changes = refresh(chunks, timing["table"], source, previous, dry_run, schema)
+        ok = changes is not None
+        if ok:
+            timing["status"] = changes["status"] if changes["status"] != "inchangé" else "inchangé (contenu)"
+            timing["changes"] = changes
+    else:
+        ok = load(chunks, timing["table"], schema) and record_load(timing["table"], source, timing["rows"], schema)
+    timing["load_s"] = time.perf_counter() - start - timing["extract_s"]
+    if not ok:
+        if timing["status"] == "ok":
+            timing["status"] = "erreur load"
+        print(f"Error during {timing['status'].split()[-1]} statement:", timing["file"])
+    return ok
+
+def stage_unchanged(timing: dict, schema: str) -> bool:
+    start = time.perf_counter()
+    ok = stage(timing["table"], schema)
+    timing["load_s"] = time.perf_counter() - start
+    if not ok:
+        timing["status"] = "erreur copie"
+    return ok
+
+def import_files(csv_files: list, concurrency: int = IMPORT_CONCURRENCY, sources: dict = None, manifest: dict = None,
+                 incremental: bool = True, dry_run: bool = False, schema: str = None) -> list:
+    """
+    Importe les fichiers ROME en flux et en parallèle ; retourne une mesure par fichier (table, lignes, durées,
+    statut, lignes modifiées). `sources` : fichiers du bucket (list_bucket_objects), `manifest` : read_manifest,
+    `schema` : schéma de chargement (prepare_staging) où construire toutes les tables, inchangées comprises.
+    """
+    concurrency = max(1, concurrency)
+    init_engine(pool_size=concurrency)
+    sources = sources or {}
+    manifest = manifest or {}
+    timings = []
+
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="import") as pool:
+        imports = []
+        for csv_file in csv_files:
+            table_name = table_prefix + rome_file_name(csv_file)
+            source = sources.get(csv_file) or {"key": os.path.join(data_path, csv_file), "etag": None,
+                                               "version": rome_file_version(csv_file)}
+            previous = manifest.get(table_name)
+            timing = {"file": csv_file, "table": table_name, "rows": None, "extract_s": None, "load_s": None,
+                      "status": "ok", "changes": None}
+            timings.append(timing)
+            if incremental and is_unchanged(source, previous):
+                timing["rows"], timing["status"] = previous["row_count"], "inchangé"
+                if schema is not None:
+                    imports.append(pool.submit(stage_unchanged, timing, schema))
+                continue
+            imports.append(pool.submit(import_file, csv_file, timing, source, previous, incremental, dry_run, schema))
+        for future in as_completed(imports):
+            future.result()
+    return timings
+
+def publish_tables(timings: list, schema: str) -> bool:
+    """
+    Si toutes les tables ont été construites dans le schéma de chargement, y applique sql/transform_rome.sql puis,
+    si toutes ses instructions ont réussi, les bascule (avec le manifeste) dans db_schema et supprime le schéma de
+    chargement. Sinon, ou si la bascule échoue, les tables en service restent inchangées et le schéma de chargement
+    est conservé pour analyse.
+    """
+    failed = [timing["table"] for timing in timings if timing["status"].startswith("erreur")]
+    if failed:
+        print(f"Bascule annulée, tables en erreur: {', '.join(failed)} (tables en service inchangées, schéma {schema} conservé)")
+        return False
+    table_names = [timing["table"] for timing in timings] + [MANIFEST_TABLE]
+    connection = init_engine().raw_connection()
+    try:
+        start = time.perf_counter()
+        errors = transform_db_tables(connection.driver_connection, schema, table_names)
+        for error in errors:
+            print("transform_rome.sql:", error)
+        print(f"Transformation dans {schema}: {time.perf_counter() - start:.2f} s, {len(errors)} instruction(s) en erreur")
+        if errors:
+            # Tables sans leurs clés primaires, index ou clés étrangères : jamais basculées en service
+            print(f"Bascule annulée, transform_rome.sql en erreur (tables en service inchangées, schéma {schema} conservé)")
+            return False
+
+        swap_s = swap_db_tables(connection.driver_connection, schema, table_names)
+        print(f"Bascule dans {db_schema}: {len(table_names)} tables en {swap_s * 1000:.0f} ms")
+        with connection.driver_connection as conn, conn.cursor() as cursor:
+            cursor.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(schema)))
+        return True
+    except Exception as e:
+        print(e)
+        print(f"Bascule annulée (tables en service inchangées, schéma {schema} conservé)")
+        return False
+    finally:
+        connection.close()
+
+def print_timings(timings: list, elapsed: float):
+    def seconds(value):
+        return "-" if value is None else f"{value:.2f}"
+
+    def changes(value):
+        return "-" if value is None else f"+{value['inserted']} ~{value['updated']} -{value['deleted']}"
+
+    print(f"\n{'Table':<40} {'Lignes':>9} {'Extract (s)':>12} {'Load (s)':>9} {'Changements':>22}  Statut")
+    for timing in sorted(timings, key=lambda t: t["table"]):
+        rows = "-" if timing["rows"] is None else timing["rows"]
+        print(f"{timing['table']:<40} {rows:>9} {seconds(timing['extract_s']):>12} {seconds(timing['load_s']):>9} "
+              f"{changes(timing['changes']):>22}  {timing['status']}")
+    sequential = sum((t["extract_s"] or 0) + (t["load_s"] or 0) for t in timings)
+    print(f"Durée totale: {elapsed:.2f} s (somme des étapes: {sequential:.2f} s)")
+
+
+# =================================================================================
+# 7. Déclaration de la fonction principale
+# =================================================================================
+def main(concurrency: int = IMPORT_CONCURRENCY, load_method: str = LOAD_METHOD, full: bool = False,
+         dry_run: bool = False):
+    global LOAD_METHOD
 
     print("--- Insert ROME data ---")
+    if dry_run:
+        print("Simulation (--dry-run) : aucune table ni le manifeste ne sont modifiés")
+    LOAD_METHOD = load_method
 
     # Init database connection and cursor
     if init_db():
+        # Refus de démarrer si DB_STAGING_SCHEMA désigne le schéma en service (supprimé par prepare_staging)
+        staging = staging_schema()
+
         # Liste des fichiers à intégrer dans la base de données
         load_file_list = [
             'grand_domaine',
@@ -279,44 +896,60 @@ def main():
             'item',
             'descriptif_rubrique']
 
-        bucket_file_list = list_bucket_file(S3_BUCKET, S3_ROME_FOLDER, ".csv")
-        
+        bucket_objects = list_bucket_objects(S3_BUCKET, S3_ROME_FOLDER, ".csv")
+        bucket_file_list = list(bucket_objects)
+        print("Test lecture - Nb fichiers=", len(bucket_file_list))
+
         # List all CSV files from ROME folder
+        csv_files = []
         for csv_file in bucket_file_list:
-            print("Read file:", csv_file)
-            set_current_file(csv_file)
-
-            if current_file_name in load_file_list:
-                current_file_name = table_prefix + current_file_name # Add prefix
-                # Extract
-                data_frame = extract(current_file_path)
-                if data_frame is None:
-                    print("Error during extract statement")
-                    break
-
-                # Transform
-                data_frame = transform(data_frame)
-                if data_frame is None:
-                    print("Error during transform statement")
-                    break
-
-                #Load
-                load(data_frame)
-                if data_frame is None:
-                    print("Error during load statement")
-                    break
+            if rome_file_name(csv_file) in load_file_list:
+                csv_files.append(csv_file)
             else:
-                print(f"File '{current_file_name}' is exclude")
+                print(f"File '{rome_file_name(csv_file)}' is exclude")
+
+        manifest = read_manifest(db_cursor, create=not dry_run)
+        db_connection.commit()
+
+        start = time.perf_counter()
+        pending = [csv_file for csv_file in csv_files
+                   if full or not is_unchanged(bucket_objects[csv_file], manifest.get(table_prefix + rome_file_name(csv_file)))]
+        if dry_run or not pending:
+            # Simulation (comparée aux tables en service) ou aucun fichier publié depuis le dernier import
+            timings = import_files(csv_files, concurrency, bucket_objects, manifest, incremental=not full, dry_run=dry_run)
+            print_timings(timings, time.perf_counter() - start)
+            if not dry_run:
+                print("Aucun fichier modifié : tables en service inchangées")
+        else:
+            prepare_staging(db_cursor, staging)
+            db_connection.commit()
+            timings = import_files(csv_files, concurrency, bucket_objects, manifest, incremental=not full, schema=staging)
+            print_timings(timings, time.perf_counter() - start)
+            publish_tables(timings, staging)
 
     # Close database cursor and connection
     if db_cursor is not None:
         db_cursor.close()
     if db_connection is not None:
         db_connection.close()
+    if db_engine is not None:
+        db_engine.dispose()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Import des fichiers ROME du data lake (S3) dans la base PostgreSQL")
+    parser.add_argument("--concurrency", type=int, default=IMPORT_CONCURRENCY,
+                        help="Fichiers téléchargés et tables chargées en parallèle (IMPORT_CONCURRENCY, 4 par défaut)")
+    parser.add_argument("--load-method", choices=["copy", "to_sql"], default=LOAD_METHOD,
+                        help="COPY ... FROM STDIN (par défaut) ou INSERT de DataFrame.to_sql (LOAD_METHOD)")
+    parser.add_argument("--full", action="store_true",
+                        help="Recharge toutes les tables en entier, sans comparer au manifeste")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Affiche les lignes qui seraient insérées, mises à jour ou supprimées, sans rien modifier")
+    args = parser.parse_args()
+    if args.full and args.dry_run:
+        parser.error("--dry-run compare les fichiers au manifeste : incompatible avec --full")
+    main(args.concurrency, args.load_method, args.full, args.dry_run)
 
 # =================================================================================
 # End
@@ -84,3 +84,15 @@ CREATE TABLE IF NOT EXISTS utilisateur_formulaire(
 	formations_recherchees JSON,
 	projets_professionnel JSON
 	);
+
+-- Manifeste de l'import ROME (import_rome.py) : dernier fichier chargé dans chaque table rome_*
+-- (créé aussi par le script s'il n'existe pas)
+CREATE TABLE IF NOT EXISTS rome_import_manifest(
+	table_name TEXT PRIMARY KEY,
+	source_key TEXT NOT NULL,
+	version INTEGER,
+	etag TEXT,
+	content_hash TEXT,
+	row_count BIGINT,
+	loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -55,6 +55,8 @@ ALTER TABLE rome_referentiel_code_rome ADD PRIMARY KEY (code_rome);
 CREATE INDEX IF NOT EXISTS rome_referentiel_code_rome_code_ogr_idx ON rome_referentiel_code_rome (code_ogr);
 
 -- Alter table 'rome_item'
+-- Change 'code_ogr' column type to INT8 to matching with 'rome_referentiel_competence.code_ogr_macro_comp' column (foreign key)
+ALTER TABLE rome_item ALTER COLUMN code_ogr TYPE int8 USING code_ogr::int8;
 -- Add primary key
 ALTER TABLE rome_item ADD PRIMARY KEY (code_ogr);
 -- Change 'code_rubrique' column type to INT8 to matching with 'code_item.code_rubrique' column
@@ -77,6 +79,8 @@ CREATE INDEX IF NOT EXISTS rome_arborescence_centre_interet_code_centre_interet_
 CREATE INDEX IF NOT EXISTS rome_arborescence_centre_interet_code_rome_idx ON rome_arborescence_centre_interet (code_rome);
 
 -- Alter table 'rome_descriptif_rubrique'
+-- Change 'code_rubrique' column type to INT8 to matching with 'rome_item.code_rubrique' column (foreign key)
+ALTER TABLE rome_descriptif_rubrique ALTER COLUMN code_rubrique TYPE int8 USING code_rubrique::int8;
 -- Add primary key
 ALTER TABLE rome_descriptif_rubrique ADD PRIMARY KEY (code_rubrique);
 